@@ -0,0 +1,85 @@
+import numpy as np
+
+from source.board import Board
+
+N = 15
+PAD = N  # 边界填充宽度，保证任意方向偏移 14 格的切片都不越界
+DIRECTIONS = ((0, 1), (1, 0), (1, 1), (1, -1))  # 水平、垂直、两个对角线
+EMPTY, BLACK, WHITE, BORDER = 0, 1, 2, 3
+COLORS = {'black': 0, 'white': 1}
+
+
+def board_to_array(board):
+    """
+    'black'/'white'/'' 棋盘转换为 15x15 的 int8 数组（0 空 / 1 黑 / 2 白）。
+    Board 的编码相同，直接返回其字节数组上的只读视图，不复制。
+    """
+    if isinstance(board, Board):
+        grid = np.frombuffer(board.cells, dtype=np.int8).reshape(N, N)
+        grid.flags.writeable = False
+        return grid
+    return np.array([[BLACK if cell == 'black' else WHITE if cell == 'white' else EMPTY for cell in row]
+                     for row in board], dtype=np.int8)
+
+
+class BoardFeatures:
+    """
+    一次性向量化计算整个棋盘的连线特征，颜色下标 0 为黑、1 为白，方向下标对应 DIRECTIONS：
+
+    count[c, d, i, j]  在 (i, j) 落 c 色棋子后沿方向 d 的连子数（包括 (i, j) 本身）
+    alive[c, d, i, j]  该连线两端是否没有同时被对手堵住（棋盘边界不算堵住）
+    near[c, d, i, j]   方向 d 上距离 (i, j) 两格以内的 c 色棋子数
+
+    每个方向只在带边界填充的数组上取偏移切片（视图，不复制），逐步延伸连子长度。
+    """
+
+    def __init__(self, board):
+        grid = np.array(board_to_array(board))  # 增量更新会修改 grid，必须是副本
+        padded = np.full((N + 2 * PAD, N + 2 * PAD), BORDER, dtype=np.int8)
+        padded[PAD:PAD + N, PAD:PAD + N] = grid
+        rows, cols = np.indices((N, N))
+
+        self.grid = grid
+        self.empty = grid == EMPTY
+        self.count = np.ones((2, 4, N, N), dtype=np.int8)
+        self.alive = np.empty((2, 4, N, N), dtype=bool)
+        self.near = np.zeros((2, 4, N, N), dtype=np.int8)
+
+        for d, (dx, dy) in enumerate(DIRECTIONS):
+            # views[k] 的 (i, j) 即棋盘上 (i + dx * k, j + dy * k) 的值
+            views = {k: padded[PAD + dx * k:PAD + dx * k + N, PAD + dy * k:PAD + dy * k + N]
+                     for k in range(-(N - 1), N)}
+            for c in (0, 1):
+                own, opponent = c + 1, 2 - c
+                blocked = np.ones((N, N), dtype=bool)
+                for sign in (1, -1):
+                    run = np.zeros((N, N), dtype=np.int8)
+                    still = np.ones((N, N), dtype=bool)
+                    for k in range(1, N):
+                        still &= views[sign * k] == own
+                        if not still.any():
+                            break
+                        run += still
+                    self.count[c, d] += run
+                    # 连线末端之后的一格是否为对手棋子（棋盘边界不算堵住）
+                    end = padded[PAD + rows + dx * sign * (run + 1), PAD + cols + dy * sign * (run + 1)]
+                    blocked &= end == opponent
+                self.alive[c, d] = ~blocked
+                self.near[c, d] = sum(views[k] == own for k in (-2, -1, 1, 2))
+        self.derive()
+
+    def derive(self):
+        """由 count / alive / near 计算各种价值图，局部更新这三个数组后需要重新调用"""
+        count = self.count.astype(np.int32)
+        # 进攻价值：连子数 × (活 10 / 死 5) + 附近己方棋子数 × 2（与 _evaluate_attack_value 相同）
+        self.attack = (np.where(self.alive, count * 10, count * 5) + self.near * 2).sum(axis=1)
+        # 防守价值：对手在该点的连子数 × (活 15 / 死 8)，按防守方颜色索引（与 _evaluate_defense_value 相同）
+        self.defense = np.where(self.alive, count * 15, count * 8).sum(axis=1)[::-1]
+        self.live_three = (self.count == 3) & self.alive & self.empty
+        self.live_four = (self.count == 4) & self.alive & self.empty
+        # 能形成三连以上活连的方向数（_evaluate_tactical_value 中的多重威胁）
+        self.threats = ((self.count >= 3) & self.alive).sum(axis=1)
+
+    def tactical(self, c):
+        """残局战术价值（与 _evaluate_tactical_value 相同）"""
+        return np.maximum(self.attack[c], self.defense[c]) * 1.5 + self.threats[c] * 20
@@ -1,16 +1,28 @@
-import requests
 import json
 import os
+import logging
 import re
 from dotenv import load_dotenv
+from source.threat_search import find_forced_move
+from source.opening_book import default_book
+from source.board import Board
+from source.line_runs import LineRuns
+from ai import http_pool
+from ai.streaming import sse_pieces, read_move
+from ai.fallback import note_fallback
+from utils.log_util import lazy
+
+logger = logging.getLogger(__name__)
 
 # 加载环境变量
 load_dotenv()
 
 class DeepSeekAI:
-    def __init__(self):
+    def __init__(self, stream=True):
+        self.stream = stream  # 流式接收，解析出坐标后立即停止生成
         self.api_key = os.getenv('DEEPSEEK_API_KEY')
         self.api_url = "https://api.deepseek.com/v1/chat/completions"
+        self.fallbacks = 0  # 使用 _find_valid_position 兜底的次数（单次调用是否兜底见 ai/fallback.py）
         self.headers = {
             "Authorization": f"Bearer {self.api_key}",
             "Content-Type": "application/json"
@@ -19,10 +31,11 @@ class DeepSeekAI:
     def _create_prompt(self, board, current_player):
         """创建发送给 DeepSeek 的提示"""
         # 生成二维数组
-        arr = [[0 if cell == '' else 1 if cell == 'black' else 2 for cell in row] for row in board]
+        board = Board.of(board)
+        arr = board.intRows()
         arr_str = "\n".join([f"{i}: {row}" for i, row in enumerate(arr)])
         # 生成空位坐标列表
-        empty = [(i, j) for i in range(15) for j in range(15) if board[i][j] == '']
+        empty = board.emptyCells()
         prompt = f"""
 你是一个五子棋AI。规则：15x15棋盘，连成5子获胜。你执{'黑' if current_player == 'black' else '白'}。
 
@@ -36,38 +49,13 @@ class DeepSeekAI:
         return prompt
 
     def _board_to_string(self, board):
-        """将棋盘转换为字符串表示，并标注关键位置"""
-        # 定义关键位置（天元和星位）
-        key_positions = {
-            (7, 7): '*',  # 天元
-            (3, 3): '*', (3, 7): '*', (3, 11): '*',  # 左上、中上、右上星位
-            (7, 3): '*', (7, 11): '*',  # 左中、右中星位
-            (11, 3): '*', (11, 7): '*', (11, 11): '*'  # 左下、中下、右下星位
-        }
-        
-        board_str = "   " + " ".join([f"{i:2d}" for i in range(15)]) + "\n"
-        for i, row in enumerate(board):
-            row_str = f"{i:2d} "
-            for j, cell in enumerate(row):
-                if (i, j) in key_positions:
-                    if cell == 'black':
-                        row_str += ' B'
-                    elif cell == 'white':
-                        row_str += ' W'
-                    else:
-                        row_str += ' *'
-                else:
-                    if cell == 'black':
-                        row_str += ' B'
-                    elif cell == 'white':
-                        row_str += ' W'
-                    else:
-                        row_str += ' .'
-            board_str += row_str + "\n"
-        return board_str
+        """将棋盘转换为字符串表示，并标注关键位置（天元和星位）"""
+        return Board.of(board).text(stars=True)
 
     def _find_valid_position(self, board):
         """智能寻找一个有效的落子位置"""
+        self.fallbacks += 1
+        note_fallback()
         # 定义优先级区域（从中心向外扩展）
         priority_areas = [
             (7, 7),  # 天元
@@ -83,11 +71,12 @@ class DeepSeekAI:
         
         # 检查对手的威胁
         opponent = 'white' if any('black' in row for row in board) else 'black'
+        runs = LineRuns(board)
         for i in range(15):
             for j in range(15):
                 if board[i][j] == '':
                     # 检查这个位置是否能形成威胁
-                    if self._is_threatening_position(board, i, j, opponent):
+                    if self._is_threatening_position(runs, i, j, opponent):
                         return i, j
         
         # 如果找不到威胁位置，从中心向外寻找空位
@@ -100,35 +89,29 @@ class DeepSeekAI:
         
         return 7, 7  # 默认返回中心位置
 
-    def _is_threatening_position(self, board, x, y, player):
-        """检查位置是否具有威胁性"""
-        # 临时放置棋子
-        board[x][y] = player
-        
-        # 检查是否能形成活四、冲四或活三
-        directions = [(0, 1), (1, 0), (1, 1), (1, -1)]
-        for dx, dy in directions:
-            count = 1
-            # 向一个方向检查
-            i, j = x + dx, y + dy
-            while 0 <= i < 15 and 0 <= j < 15 and board[i][j] == player:
-                count += 1
-                i += dx
-                j += dy
-            
-            # 向相反方向检查
-            i, j = x - dx, y - dy
-            while 0 <= i < 15 and 0 <= j < 15 and board[i][j] == player:
-                count += 1
-                i -= dx
-                j -= dy
-            
-            if count >= 3:  # 如果能形成活三或更多
-                board[x][y] = ''  # 恢复棋盘状态
-                return True
-        
-        board[x][y] = ''  # 恢复棋盘状态
-        return False
+    def _is_threatening_position(self, runs, x, y, player):
+        """检查位置是否具有威胁性：落子后能形成三连或更长"""
+        return runs.longestIfPlaced(x, y, player) >= 3
+
+    def _chat_stream(self, data, board, cancel_event=None):
+        """
+        以 SSE 流的方式请求，收到完整坐标时立即断开（服务端随之停止生成）。
+        返回 (与非流式响应相同结构的 result, 坐标或 None)；流结束仍没有坐标时由 get_move 按原来的方式解析 result
+        """
+        response = http_pool.get_session('deepseek').post(
+            self.api_url,
+            headers=self.headers,
+            json=dict(data, stream=True, stream_options={"include_usage": True}),
+            timeout=http_pool.timeout(),
+            stream=True
+        )
+        response.raise_for_status()
+        last = {}
+        content, move = read_move(response, sse_pieces(response, last), board, cancel_event)
+        result = {'choices': [{'message': {'content': content}}]}
+        if 'usage' in last:
+            result['usage'] = last['usage']
+        return result, move
 
     def _create_few_shot_examples(self):
         """创建 Few-shot 示例，用于提高缓存命中率"""
@@ -225,12 +208,27 @@ class DeepSeekAI:
             }
         ]
 
-    def get_move(self, board, current_player):
-        """获取 DeepSeek AI 的下一步移动"""
+    def get_move(self, board, current_player, cancel_event=None):
+        """获取 DeepSeek AI 的下一步移动；cancel_event 被设置时尽快放弃流式请求"""
         try:
+            # 统一为 Board：各种序列化结果在同一局面内只生成一次
+            board = Board.of(board)
+            # 开局库：前几手直接查表，不调用模型
+            book_move = default_book().probe(board, current_player)
+            if book_move is not None:
+                logger.info("✅ 开局库: %s", book_move)
+                return book_move
+
+            # 威胁空间搜索（VCF/VCT）：必胜或必须防守的局面直接落子，不再调用模型
+            forced = find_forced_move(board, current_player)
+            if forced is not None and forced.move is not None:
+                x, y = forced.move
+                logger.info("✅ 威胁空间搜索(%s): (%s, %s)", forced.kind, x, y)
+                return x, y
+
             prompt = self._create_prompt(board, current_player)
-            print(f"\n当前棋盘状态：\n{self._board_to_string(board)}")
-            print(f"当前玩家：{current_player}")
+            logger.debug("当前棋盘状态：\n%s", lazy(self._board_to_string, board))
+            logger.debug("当前玩家：%s", current_player)
             
             # 构建包含 Few-shot 示例的消息列表
             messages = [
@@ -263,22 +261,28 @@ class DeepSeekAI:
                 "return_reasoning": False  # 禁用推理过程返回
             }
 
-            # 设置连接超时和读取超时
-            response = requests.post(
-                self.api_url, 
-                headers=self.headers, 
-                json=data, 
-                timeout=(10, 60)  # (连接超时, 读取超时)
-            )
-            response.raise_for_status()
-            
-            # 获取原始响应文本
-            response_text = response.text
-            print(f"API 原始响应: {response_text}")
+            if self.stream:
+                result, move = self._chat_stream(data, board, cancel_event)
+                if move is not None:
+                    logger.info("✅ 流式解析坐标: %s", move)
+                    return move
+            else:
+                # 复用连接池中的长连接；(连接超时, 读取超时) 来自 Config
+                response = http_pool.get_session('deepseek').post(
+                    self.api_url, 
+                    headers=self.headers, 
+                    json=data, 
+                    timeout=http_pool.timeout()
+                )
+                response.raise_for_status()
+                
+                # 获取原始响应文本
+                response_text = response.text
+                logger.debug("API 原始响应: %s", response_text)
+                result = response.json()
             
             # 检查缓存命中情况
             try:
-                result = response.json()
                 if 'usage' in result:
                     usage = result['usage']
                     cache_hit = usage.get('prompt_cache_hit_tokens', 0)
@@ -287,20 +291,19 @@ class DeepSeekAI:
                     
                     if cache_hit > 0:
                         cache_rate = (cache_hit / total_prompt) * 100 if total_prompt > 0 else 0
-                        print(f"缓存命中: {cache_hit} tokens, 未命中: {cache_miss} tokens, 命中率: {cache_rate:.1f}%")
+                        logger.debug("缓存命中: %s tokens, 未命中: %s tokens, 命中率: %.1f%%", cache_hit, cache_miss, cache_rate)
                     else:
-                        print(f"无缓存命中, 总输入: {total_prompt} tokens")
+                        logger.debug("无缓存命中, 总输入: %s tokens", total_prompt)
             except:
                 pass
             
             # 尝试解析JSON响应
             try:
-                result = response.json()
                 if 'choices' in result and result['choices']:
                     message = result['choices'][0].get('message', {})
                     content = message.get('content', '').strip()
                     
-                    print(f"DeepSeek AI 响应内容: {content}")
+                    logger.debug("DeepSeek AI 响应内容: %s", content)
                     
                     # 尝试解析JSON内容
                     if content:
@@ -310,48 +313,44 @@ class DeepSeekAI:
                                 x, y = int(move_data['x']), int(move_data['y'])
                                 analysis = move_data.get('analysis', '无分析')
                                 
-                                print(f"解析出的坐标: ({x}, {y})")
-                                print(f"AI 分析: {analysis}")
+                                logger.debug("解析出的坐标: (%s, %s)", x, y)
+                                logger.debug("AI 分析: %s", analysis)
                                 
                                 # 验证坐标
                                 if not (0 <= x <= 14 and 0 <= y <= 14):
-                                    print(f"坐标超出范围：x={x}, y={y}")
+                                    logger.warning("坐标超出范围：x=%s, y=%s", x, y)
                                     new_x, new_y = self._find_valid_position(board)
-                                    print(f"找到替代位置: ({new_x}, {new_y})")
+                                    logger.info("找到替代位置: (%s, %s)", new_x, new_y)
                                     return new_x, new_y
                                 
                                 if board[x][y] != '':
-                                    print(f"位置已被占用：board[{x}][{y}]={board[x][y]}")
+                                    logger.warning("位置已被占用：board[%s][%s]=%s", x, y, board[x][y])
                                     new_x, new_y = self._find_valid_position(board)
-                                    print(f"找到替代位置: ({new_x}, {new_y})")
+                                    logger.info("找到替代位置: (%s, %s)", new_x, new_y)
                                     return new_x, new_y
                                 
                                 return x, y
                             else:
-                                print("JSON中缺少必要的x和y字段")
+                                logger.warning("JSON中缺少必要的x和y字段")
                         except json.JSONDecodeError as e:
-                            print(f"JSON解析失败: {e}")
-                            print(f"清理后的内容: {content}")
+                            logger.warning("JSON解析失败: %s", e)
+                            logger.debug("清理后的内容: %s", content)
                     else:
-                        print("没有找到有效的响应内容")
+                        logger.warning("没有找到有效的响应内容")
             except Exception as e:
-                print(f"响应解析失败: {e}")
-                print(f"错误类型: {type(e).__name__}")
-                import traceback
-                print(f"错误堆栈: {traceback.format_exc()}")
+                logger.warning("响应解析失败: %s", e)
+                logger.debug("错误堆栈", exc_info=True)
             
             # 如果没有找到有效坐标，使用智能寻找替代位置
-            print("未找到有效坐标，使用智能寻找替代位置...")
+            logger.warning("未找到有效坐标，使用智能寻找替代位置...")
             new_x, new_y = self._find_valid_position(board)
-            print(f"找到替代位置: ({new_x}, {new_y})")
+            logger.info("找到替代位置: (%s, %s)", new_x, new_y)
             return new_x, new_y
             
         except Exception as e:
-            print(f"Error in get_move: {str(e)}")
-            print(f"错误类型: {type(e).__name__}")
-            import traceback
-            print(f"错误堆栈: {traceback.format_exc()}")
+            logger.error("Error in get_move: %s", e)
+            logger.debug("错误堆栈", exc_info=True)
             # 发生错误时也使用智能寻找替代位置
             new_x, new_y = self._find_valid_position(board)
-            print(f"发生错误，使用替代位置: ({new_x}, {new_y})")
+            logger.info("发生错误，使用替代位置: (%s, %s)", new_x, new_y)
             return new_x, new_y 
\ No newline at end of file
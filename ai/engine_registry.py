@@ -0,0 +1,49 @@
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class EngineRegistry:
+    """
+    每个会话独立的 AI 引擎：factories 把模型名映射到创建引擎的无参函数，
+    同一会话同一模型第一次使用时创建，之后一直复用（引擎自己的增量状态、缓存随之保留），
+    会话结束（断开连接、登出）或重置对局时通过 release 丢弃并关闭。
+    不同会话的引擎互不共享，并发的对局之间没有竞争。
+    """
+
+    def __init__(self, factories):
+        self._factories = dict(factories)
+        self._sessions = {}  # session_id -> {model: engine}
+        self._lock = threading.Lock()
+
+    @property
+    def models(self):
+        return tuple(self._factories)
+
+    def __contains__(self, model):
+        return model in self._factories
+
+    def __len__(self):
+        return sum(len(engines) for engines in self._sessions.values())
+
+    def get(self, session_id, model):
+        """返回该会话的 model 引擎，不存在时创建；未知的模型抛出 KeyError"""
+        factory = self._factories[model]
+        with self._lock:
+            engines = self._sessions.setdefault(session_id, {})
+            engine = engines.get(model)
+            if engine is None:
+                logger.debug("Creating %s engine for session ID: %s", model, session_id)
+                engine = engines[model] = factory()
+            return engine
+
+    def release(self, session_id):
+        """丢弃该会话的全部引擎并关闭它们，返回释放的个数"""
+        with self._lock:
+            engines = self._sessions.pop(session_id, {})
+        for engine in engines.values():
+            close = getattr(engine, 'close', None)
+            if close is not None:
+                close()
+        return len(engines)
@@ -0,0 +1,34 @@
+import threading
+from contextlib import contextmanager
+
+# 当前线程上正在进行的 get_move 调用（外层包装在前），引擎用兜底着法时标记它们
+_local = threading.local()
+
+
+class Call:
+    def __init__(self):
+        self.fallback = False
+
+
+@contextmanager
+def track_fallback():
+    """
+    记录本线程上这次调用中引擎是否使用了兜底着法（_find_valid_position）：
+    with track_fallback() as call: move = engine.get_move(...)，之后 call.fallback 为真表示着法是兜底的。
+    只看本次调用自己的线程，同一引擎上并发的其他调用不影响结果；嵌套的包装（缓存、对冲）各自得到标记。
+    """
+    stack = getattr(_local, 'calls', None)
+    if stack is None:
+        stack = _local.calls = []
+    call = Call()
+    stack.append(call)
+    try:
+        yield call
+    finally:
+        stack.remove(call)
+
+
+def note_fallback():
+    """引擎在 _find_valid_position 中调用：标记本线程上所有正在进行的调用"""
+    for call in getattr(_local, 'calls', ()):
+        call.fallback = True
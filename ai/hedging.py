@@ -0,0 +1,184 @@
+import bisect
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from source.board import Board, N
+from ai.fallback import track_fallback
+
+logger = logging.getLogger(__name__)
+
+
+def _bucket_bounds(low=0.001, high=300.0, factor=1.25):
+    bounds, bound = [], low
+    while bound < high:
+        bounds.append(bound)
+        bound *= factor
+    bounds.append(high)
+    return tuple(bounds)
+
+
+BUCKETS = _bucket_bounds()  # 直方图各桶的上界（秒），按 1.25 倍递增
+
+
+class LatencyHistogram:
+    """
+    单个 AI 后端的延迟直方图：对数分桶，quantile 返回所在桶的上界。
+    样本数超过 window 时所有计数减半，较早的样本逐渐失去权重，延迟分布变化后分位数随之调整。
+    """
+
+    def __init__(self, window=1000):
+        self.window = window
+        self.counts = [0] * len(BUCKETS)
+        self.total = 0
+        self._lock = threading.Lock()
+
+    def record(self, seconds):
+        index = min(bisect.bisect_left(BUCKETS, seconds), len(BUCKETS) - 1)
+        with self._lock:
+            self.counts[index] += 1
+            self.total += 1
+            if self.total > self.window:
+                self.counts = [count // 2 for count in self.counts]
+                self.total = sum(self.counts)
+
+    def quantile(self, q):
+        """q 分位数（秒），没有样本时返回 None"""
+        with self._lock:
+            if not self.total:
+                return None
+            target = q * self.total
+            seen = 0
+            for bound, count in zip(BUCKETS, self.counts):
+                seen += count
+                if seen >= target:
+                    return bound
+            return BUCKETS[-1]
+
+
+_histograms = {}
+_histograms_lock = threading.Lock()
+
+
+def histogram(backend):
+    """backend 的延迟直方图，所有会话共用"""
+    with _histograms_lock:
+        if backend not in _histograms:
+            _histograms[backend] = LatencyHistogram()
+        return _histograms[backend]
+
+
+# 主引擎和备用引擎的请求分别在两个线程池里执行，调用方（AI 落子线程）只等待先完成的一个。
+# LLM 请求无法中断，负载高时慢请求会占满主引擎的线程池；备用引擎有自己的线程，不会排在它们后面
+_primary_executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix='ai-primary')
+_hedge_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix='ai-hedge')
+
+
+def _is_valid(board, move):
+    try:
+        x, y = move
+        return 0 <= x < N and 0 <= y < N and board.isEmpty(x, y)
+    except (TypeError, ValueError):
+        return False
+
+
+class HedgedEngine:
+    """
+    对冲请求：先调用主引擎，超过主引擎历史延迟的 p95（样本不足时用 delay）仍未返回时同时启动备用引擎，
+    先得到的有效着法胜出，另一个通过 cancel_event（以及引擎的 cancel 方法）取消。
+    主引擎请求失败或这次调用只给出兜底着法时不算有效，会立即启动备用引擎并等待它的结果。
+    """
+
+    def __init__(self, primary, primary_name, secondary, secondary_name,
+                 delay=8.0, min_delay=0.5, max_delay=30.0, quantile=0.95, min_samples=20):
+        self.primary = primary
+        self.primary_name = primary_name
+        self.secondary = secondary
+        self.secondary_name = secondary_name
+        self.delay = delay  # 秒
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.quantile = quantile
+        self.min_samples = min_samples
+
+    @property
+    def fallbacks(self):
+        return getattr(self.primary, 'fallbacks', 0)
+
+    def hedge_delay(self):
+        """启动备用引擎之前等待主引擎的时间（秒）"""
+        latencies = histogram(self.primary_name)
+        if latencies.total < self.min_samples:
+            return self.delay
+        return min(max(latencies.quantile(self.quantile), self.min_delay), self.max_delay)
+
+    @staticmethod
+    def _run(engine, board, current_player, cancel_event):
+        with track_fallback() as call:
+            move = engine.get_move(board, current_player, cancel_event=cancel_event)
+        return move, call.fallback
+
+    def _start(self, tasks, name, engine, board, current_player, executor):
+        event = threading.Event()
+        future = executor.submit(self._run, engine, board.copy(), current_player, event)
+        tasks[future] = (name, engine, event, time.monotonic())
+        return future
+
+    def get_move(self, board, current_player):
+        board = Board.of(board)
+        tasks = {}
+        primary = self._start(tasks, self.primary_name, self.primary, board, current_player, _primary_executor)
+        delay = self.hedge_delay()
+        wait([primary], timeout=delay)
+
+        results = {}  # future -> (move, 是否兜底)，抛出异常时为 None
+        winner = secondary = None
+        pending = {primary}
+        while pending:
+            if secondary is None and (not primary.done() or not self._usable(board, primary, results)):
+                logger.info("%s has no valid move after %.2fs, hedging with %s", self.primary_name, delay, self.secondary_name)
+                secondary = self._start(tasks, self.secondary_name, self.secondary, board, current_player, _hedge_executor)
+                pending.add(secondary)
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                name, _, _, started = tasks[future]
+                histogram(name).record(time.monotonic() - started)
+                if winner is None and self._usable(board, future, results):
+                    winner = future
+            if winner is not None:
+                break
+
+        for future in pending:
+            # 输掉的请求：取消。它的真实延迟未知，不记入直方图，否则分位数会偏向对冲等待的时间
+            name, engine, event, started = tasks[future]
+            event.set()
+            cancel = getattr(engine, 'cancel', None)
+            if cancel is not None:
+                cancel()
+            logger.debug("Cancelled %s after %s answered", name, tasks[winner][0])
+
+        if winner is None:
+            # 两个引擎都没有有效着法：用任何一个合法的兜底着法
+            winner = next((f for f in (primary, *tasks) if results.get(f) and _is_valid(board, results[f][0])), None)
+            if winner is None:
+                raise RuntimeError("No AI backend returned a valid move")
+        logger.debug("Hedged move from %s: %s", tasks[winner][0], results[winner][0])
+        return results[winner][0]
+
+    @staticmethod
+    def _usable(board, future, results):
+        """future 已完成且给出了非兜底的合法着法"""
+        if future not in results:
+            try:
+                results[future] = future.result()
+            except Exception as e:
+                logger.warning("AI backend failed: %s", e)
+                results[future] = None
+        result = results[future]
+        return result is not None and not result[1] and _is_valid(board, result[0])
+
+    def close(self):
+        for engine in (self.primary, self.secondary):
+            close = getattr(engine, 'close', None)
+            if close is not None:
+                close()
@@ -0,0 +1,69 @@
+import logging
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+# 默认值与 Config 中的 AI_HTTP_* 相同；应用启动时由 configure_http_pools(app.config) 覆盖
+_settings = {
+    'pool_size': 8,  # 每个后端保持的长连接数，一般与 AI_WORKERS 相同
+    'keep_alive': True,
+    'connect_timeout': 10,
+    'read_timeout': 60,
+}
+_sessions = {}  # backend -> requests.Session
+_lock = threading.Lock()
+
+
+def configure_http_pools(config):
+    """根据应用配置设置连接池大小、长连接和超时；已经创建的会话关闭后按新配置重建"""
+    with _lock:
+        _settings.update(
+            pool_size=config.get('AI_HTTP_POOL_SIZE', _settings['pool_size']),
+            keep_alive=config.get('AI_HTTP_KEEP_ALIVE', _settings['keep_alive']),
+            connect_timeout=config.get('AI_HTTP_CONNECT_TIMEOUT', _settings['connect_timeout']),
+            read_timeout=config.get('AI_HTTP_READ_TIMEOUT', _settings['read_timeout']),
+        )
+    close_all()
+
+
+def _new_session(backend):
+    session = requests.Session()
+    # 连接池按主机保存连接，同一后端只有一个主机；池满时不阻塞，多出的连接用完即关闭
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=_settings['pool_size'])
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    if not _settings['keep_alive']:
+        session.headers['Connection'] = 'close'
+    logger.debug("Created HTTP session for %s (pool size %s)", backend, _settings['pool_size'])
+    return session
+
+
+def get_session(backend):
+    """
+    backend（'deepseek'、'llama3' 等）共用的 requests.Session：
+    所有会话、所有线程的请求复用同一个连接池，只有第一次请求需要建立 TCP 连接和 TLS 握手。
+    urllib3 的连接池是线程安全的，只要不在请求之间修改 session 的属性（请求头通过参数传入）。
+    """
+    session = _sessions.get(backend)
+    if session is None:
+        with _lock:
+            session = _sessions.get(backend)
+            if session is None:
+                session = _sessions[backend] = _new_session(backend)
+    return session
+
+
+def timeout():
+    """requests 的 (连接超时, 读取超时)"""
+    return _settings['connect_timeout'], _settings['read_timeout']
+
+
+def close_all():
+    """关闭全部连接池（进程退出或测试时调用）"""
+    with _lock:
+        sessions = list(_sessions.values())
+        _sessions.clear()
+    for session in sessions:
+        session.close()
@@ -1,70 +1,71 @@
 import requests
 import json
+import logging
 import re
 import random
+import numpy as np
+from source.threat_search import find_forced_move
+from source.opening_book import default_book
+from source.board import Board
+from ai.board_features import COLORS
+from ai.position_analysis import PositionAnalysis
+from ai import http_pool
+from ai.streaming import ndjson_pieces, read_move
+from ai.fallback import note_fallback
+from utils.log_util import lazy
+
+logger = logging.getLogger(__name__)
 
 class Llama3AI:
-    def __init__(self):
+    def __init__(self, stream=True):
+        self.stream = stream  # 流式接收，解析出坐标后立即停止生成
         self.api_url = "http://100.96.21.95:11435/api/generate"
         self.model = "llama3"
+        self.fallbacks = 0  # 使用 _find_valid_position 兜底的次数（单次调用是否兜底见 ai/fallback.py）
+        self.analysis = None  # 本会话最近一次分析的局面，下一步棋只增量更新对手和自己新下的棋子
         self.headers = {
             "Content-Type": "application/json"
         }
 
+    def _get_analysis(self, board):
+        """与 board 同步后的局面分析：同一步棋内的各个策略函数、以及对手落子后的下一步棋都复用同一个对象"""
+        if self.analysis is None:
+            self.analysis = PositionAnalysis(board)
+        else:
+            self.analysis.sync(board)
+        return self.analysis
+
     def _validate_move(self, board, x, y):
         """验证移动是否有效"""
-        print(f"验证坐标 ({x}, {y})...")
-        
         # 检查坐标范围
         if not (0 <= x <= 14 and 0 <= y <= 14):
-            print(f"❌ 坐标超出范围：x={x}, y={y}，有效范围是0-14")
+            logger.warning("❌ 坐标超出范围：x=%s, y=%s，有效范围是0-14", x, y)
             return False
         
         # 检查位置是否为空
         current_cell = board[x][y]
         if current_cell != '':
-            print(f"❌ 位置已被占用：board[{x}][{y}]='{current_cell}'")
-            print(f"当前棋盘第{x}行: {[board[x][j] if board[x][j] != '' else '.' for j in range(15)]}")
-            
-            # 显示可用的空位
-            empty_positions = [(i, j) for i in range(15) for j in range(15) if board[i][j] == '']
-            print(f"可用空位数量: {len(empty_positions)}")
-            if len(empty_positions) > 0:
-                print(f"前5个可用空位: {empty_positions[:5]}")
+            logger.warning("❌ 位置已被占用：board[%s][%s]='%s'", x, y, current_cell)
             return False
         
-        print(f"✅ 坐标验证通过: ({x}, {y})")
         return True
 
     def _analyze_threats(self, board, player_color):
         """分析威胁和机会"""
-        threats = []
-        opportunities = []
+        analysis = self._get_analysis(board)
+        me = COLORS[player_color]
         
-        directions = [(0, 1), (1, 0), (1, 1), (1, -1)]  # 水平、垂直、两个对角线
-        opponent_color = 'white' if player_color == 'black' else 'black'
+        def collect(c, prefix):
+            # 所有空位 × 4 个方向中连子数 >= 2 的点，按 (i, j, 方向) 的顺序
+            result = []
+            for i, j, n, is_alive in analysis.line_points(c):
+                line_type = "活" if is_alive else "死"
+                result.append((i, j, n, f"{prefix}{line_type}{n}连", is_alive))
+            return result
         
-        # 检查每个空位
-        for i in range(15):
-            for j in range(15):
-                if board[i][j] == '':  # 只检查空位
-                    # 检查在这个位置下棋后能形成的连子数
-                    for dx, dy in directions:
-                        # 检查我方机会
-                        my_count = self._count_line(board, i, j, dx, dy, player_color)
-                        if my_count >= 2:  # 降低阈值，检测更多机会
-                            # 检查是否为活连（两端都没有被堵）
-                            is_alive = self._is_alive_line(board, i, j, dx, dy, player_color)
-                            line_type = "活" if is_alive else "死"
-                            opportunities.append((i, j, my_count, f"我方{line_type}{my_count}连", is_alive))
-                        
-                        # 检查对手威胁
-                        opponent_count = self._count_line(board, i, j, dx, dy, opponent_color)
-                        if opponent_count >= 2:  # 降低阈值，检测更多威胁
-                            # 检查是否为活连
-                            is_alive = self._is_alive_line(board, i, j, dx, dy, opponent_color)
-                            line_type = "活" if is_alive else "死"
-                            threats.append((i, j, opponent_count, f"对手{line_type}{opponent_count}连", is_alive))
+        # 检查我方机会和对手威胁
+        opportunities = collect(me, "我方")
+        threats = collect(1 - me, "对手")
         
         # 按威胁程度排序（连子数越多越危险，活连优先于死连）
         threats.sort(key=lambda x: (x[2], x[4]), reverse=True)
@@ -72,63 +73,14 @@ class Llama3AI:
         
         return threats, opportunities
     
-    def _count_line(self, board, x, y, dx, dy, color):
-        """计算在(x,y)位置下棋后，沿(dx,dy)方向能形成的连子数"""
-        count = 1  # 包括当前位置
-        
-        # 向正方向计数
-        nx, ny = x + dx, y + dy
-        while 0 <= nx < 15 and 0 <= ny < 15 and board[nx][ny] == color:
-            count += 1
-            nx += dx
-            ny += dy
-        
-        # 向负方向计数
-        nx, ny = x - dx, y - dy
-        while 0 <= nx < 15 and 0 <= ny < 15 and board[nx][ny] == color:
-            count += 1
-            nx -= dx
-            ny -= dy
-        
-        return count
-
-    def _is_alive_line(self, board, x, y, dx, dy, color):
-        """检查连线是否为活连（两端都没有被对手棋子堵住）"""
-        # 向正方向找到连线的末端
-        end_x, end_y = x, y
-        while 0 <= end_x + dx < 15 and 0 <= end_y + dy < 15 and board[end_x + dx][end_y + dy] == color:
-            end_x += dx
-            end_y += dy
-        
-        # 向负方向找到连线的起始端
-        start_x, start_y = x, y
-        while 0 <= start_x - dx < 15 and 0 <= start_y - dy < 15 and board[start_x - dx][start_y - dy] == color:
-            start_x -= dx
-            start_y -= dy
-        
-        # 检查两端是否都是空位或边界
-        opponent_color = 'white' if color == 'black' else 'black'
-        
-        # 检查正方向端点
-        pos_end_x, pos_end_y = end_x + dx, end_y + dy
-        pos_blocked = (0 <= pos_end_x < 15 and 0 <= pos_end_y < 15 and 
-                      board[pos_end_x][pos_end_y] == opponent_color)
-        
-        # 检查负方向端点
-        neg_end_x, neg_end_y = start_x - dx, start_y - dy
-        neg_blocked = (0 <= neg_end_x < 15 and 0 <= neg_end_y < 15 and 
-                      board[neg_end_x][neg_end_y] == opponent_color)
-        
-        # 如果两端都没有被对手堵住，则为活连
-        return not (pos_blocked and neg_blocked)
-
     def _create_prompt(self, board, current_player):
         """创建发送给 Llama3 的提示"""
         # 生成二维数组
-        arr = [[0 if cell == '' else 1 if cell == 'black' else 2 for cell in row] for row in board]
+        board = Board.of(board)
+        arr = board.intRows()
         
         # 生成空位坐标列表
-        empty = [(i, j) for i in range(15) for j in range(15) if board[i][j] == '']
+        empty = board.emptyCells()
         
         # 分析当前局势
         my_color = 1 if current_player == 'black' else 2
@@ -179,21 +131,12 @@ Response:"""
 
     def _board_to_string(self, board):
         """将棋盘转换为字符串表示"""
-        board_str = "   " + " ".join([f"{i:2d}" for i in range(15)]) + "\n"
-        for i, row in enumerate(board):
-            row_str = f"{i:2d} "
-            for j, cell in enumerate(row):
-                if cell == 'black':
-                    row_str += ' B'
-                elif cell == 'white':
-                    row_str += ' W'
-                else:
-                    row_str += ' .'
-            board_str += row_str + "\n"
-        return board_str
+        return Board.of(board).text()
 
     def _find_valid_position(self, board):
         """智能寻找一个有效的落子位置"""
+        self.fallbacks += 1
+        note_fallback()
         # 首先寻找能形成连子的位置
         for i in range(15):
             for j in range(15):
@@ -244,30 +187,31 @@ Response:"""
         threats, opportunities = self._analyze_threats(board, current_player)
         opponent_color = 'white' if current_player == 'black' else 'black'
         
-        print(f"=== 策略分析 ===")
-        print(f"发现威胁: {len(threats)} 个")
-        for i, (x, y, count, desc, is_alive) in enumerate(threats[:5]):
-            alive_str = "活" if is_alive else "死"
-            print(f"  威胁{i+1}: ({x},{y}) - {desc} ({alive_str})")
-        
-        print(f"发现机会: {len(opportunities)} 个")
-        for i, (x, y, count, desc, is_alive) in enumerate(opportunities[:5]):
-            alive_str = "活" if is_alive else "死"
-            print(f"  机会{i+1}: ({x},{y}) - {desc} ({alive_str})")
+        # 逐条列出威胁和机会只在 DEBUG 级别开启时进行
+        debug = logger.isEnabledFor(logging.DEBUG)
+        if debug:
+            logger.debug("=== 策略分析 ===")
+            logger.debug("发现威胁: %d 个", len(threats))
+            for i, (x, y, count, desc, is_alive) in enumerate(threats[:5]):
+                logger.debug("  威胁%d: (%d,%d) - %s (%s)", i + 1, x, y, desc, "活" if is_alive else "死")
+
+            logger.debug("发现机会: %d 个", len(opportunities))
+            for i, (x, y, count, desc, is_alive) in enumerate(opportunities[:5]):
+                logger.debug("  机会%d: (%d,%d) - %s (%s)", i + 1, x, y, desc, "活" if is_alive else "死")
         
         # 寻找叉攻机会
         fork_opportunities = self._find_fork_opportunities(board, current_player)
-        if fork_opportunities:
-            print(f"发现叉攻机会: {len(fork_opportunities)} 个")
+        if fork_opportunities and debug:
+            logger.debug("发现叉攻机会: %d 个", len(fork_opportunities))
             for i, (x, y, count, desc) in enumerate(fork_opportunities[:3]):
-                print(f"  叉攻{i+1}: ({x},{y}) - {desc}")
+                logger.debug("  叉攻%d: (%d,%d) - %s", i + 1, x, y, desc)
         
         # 寻找封堵位置
         blocking_positions = self._find_blocking_positions(board, opponent_color)
-        if blocking_positions:
-            print(f"需要封堵: {len(blocking_positions)} 个位置")
+        if blocking_positions and debug:
+            logger.debug("需要封堵: %d 个位置", len(blocking_positions))
             for i, (x, y, count, desc) in enumerate(blocking_positions[:3]):
-                print(f"  封堵{i+1}: ({x},{y}) - {desc}")
+                logger.debug("  封堵%d: (%d,%d) - %s", i + 1, x, y, desc)
 
         # 计算当前局面的空位数量，用于判断游戏阶段
         empty_count = sum(1 for i in range(15) for j in range(15) if board[i][j] == '')
@@ -280,28 +224,28 @@ Response:"""
         winning_moves = [(x, y) for x, y, count, desc, is_alive in opportunities if count >= 5]
         if winning_moves:
             x, y = random.choice(winning_moves)  # 如果有多个制胜点，随机选择
-            print(f"🎉 立即获胜: ({x},{y})")
+            logger.debug("🎉 立即获胜: (%s,%s)", x, y)
             return x, y
         
         # 2. 如果对手能立即获胜（5连），必须封堵
         critical_threats = [(x, y) for x, y, count, desc, is_alive in threats if count >= 5]
         if critical_threats:
             x, y = random.choice(critical_threats)  # 如果有多个威胁点，随机选择
-            print(f"🚨 紧急封堵: ({x},{y})")
+            logger.debug("🚨 紧急封堵: (%s,%s)", x, y)
             return x, y
         
         # 3. 如果我方能形成活四，优先考虑
         alive_four_moves = [(x, y) for x, y, count, desc, is_alive in opportunities if count == 4 and is_alive]
         if alive_four_moves:
             x, y = random.choice(alive_four_moves)
-            print(f"⚡ 活四必胜: ({x},{y})")
+            logger.debug("⚡ 活四必胜: (%s,%s)", x, y)
             return x, y
         
         # 4. 如果对手能形成活四，必须封堵
         alive_four_threats = [(x, y) for x, y, count, desc, is_alive in threats if count == 4 and is_alive]
         if alive_four_threats:
             x, y = random.choice(alive_four_threats)
-            print(f"🛡️ 封堵活四: ({x},{y})")
+            logger.debug("🛡️ 封堵活四: (%s,%s)", x, y)
             return x, y
         
         # 5. 双活三叉攻（非常强的进攻手段）
@@ -309,7 +253,7 @@ Response:"""
             # 在开局和中局更倾向于选择叉攻
             if is_early_game or is_mid_game:
                 x, y = random.choice(fork_opportunities[:3])[:2]  # 从前三个叉攻中随机选择
-                print(f"🗡️ 双活三叉攻: ({x},{y})")
+                logger.debug("🗡️ 双活三叉攻: (%s,%s)", x, y)
                 return x, y
         
         # 6. 如果对手有活三，必须封堵
@@ -327,7 +271,7 @@ Response:"""
                 best_blocking_moves.sort(key=lambda x: x[2], reverse=True)
                 top_moves = [move for move in best_blocking_moves if move[2] >= best_blocking_moves[0][2] * 0.8]
                 x, y, _ = random.choice(top_moves)  # 从最好的几个中随机选择
-                print(f"🛡️ 封堵活三: ({x},{y})")
+                logger.debug("🛡️ 封堵活三: (%s,%s)", x, y)
                 return x, y
         
         # 7. 我方活三进攻
@@ -344,7 +288,7 @@ Response:"""
                 attack_moves.sort(key=lambda x: x[2], reverse=True)
                 top_moves = [move for move in attack_moves if move[2] >= attack_moves[0][2] * 0.8]
                 x, y, _ = random.choice(top_moves)
-                print(f"⚔️ 活三进攻: ({x},{y})")
+                logger.debug("⚔️ 活三进攻: (%s,%s)", x, y)
                 return x, y
         
         # 8. 在没有明显战术机会时，进行位置评估
@@ -353,21 +297,21 @@ Response:"""
             center_moves = self._get_center_control_moves(board)
             if center_moves:
                 x, y = random.choice(center_moves[:3])  # 从最好的三个位置中随机选择
-                print(f"🎯 布局控制中心: ({x},{y})")
+                logger.debug("🎯 布局控制中心: (%s,%s)", x, y)
                 return x, y
         elif is_mid_game:
             # 中局注重发展和防守平衡
             balanced_moves = self._get_balanced_moves(board, current_player)
             if balanced_moves:
                 x, y = random.choice(balanced_moves[:3])
-                print(f"⚖️ 均衡发展: ({x},{y})")
+                logger.debug("⚖️ 均衡发展: (%s,%s)", x, y)
                 return x, y
         else:
             # 残局更注重具体战术
             tactical_moves = self._get_tactical_moves(board, current_player)
             if tactical_moves:
                 x, y = random.choice(tactical_moves[:3])
-                print(f"📊 战术选择: ({x},{y})")
+                logger.debug("📊 战术选择: (%s,%s)", x, y)
                 return x, y
         
         # 如果上述策略都没有找到合适的位置，使用综合评估
@@ -385,41 +329,16 @@ Response:"""
             # 从最高分值的前几个位置中随机选择
             top_positions = [pos for pos in best_positions if pos[2] >= best_positions[0][2] * 0.9]
             x, y, value = random.choice(top_positions[:5])  # 从前5个最佳位置中随机选择
-            print(f"🎯 综合评估位置: ({x},{y}) - 价值{value:.2f}")
+            logger.debug("🎯 综合评估位置: (%s,%s) - 价值%.2f", x, y, value)
             return x, y
         
-        print("📊 无明显策略，使用AI分析")
+        logger.debug("📊 无明显策略，使用AI分析")
         return None  # 没有明显策略，让AI自己分析
 
     def _evaluate_attack_value(self, board, x, y, player_color):
         """评估某个位置的进攻价值"""
-        value = 0
-        directions = [(0, 1), (1, 0), (1, 1), (1, -1)]
-        
-        # 模拟在此位置下棋
-        board_copy = [row[:] for row in board]
-        board_copy[x][y] = player_color
-        
-        # 计算在各个方向上的发展潜力
-        for dx, dy in directions:
-            # 检查连子数量
-            count = self._count_line(board_copy, x, y, dx, dy, player_color)
-            # 检查是否为活子
-            is_alive = self._is_alive_line(board_copy, x, y, dx, dy, player_color)
-            
-            # 根据连子数量和活度给分
-            if is_alive:
-                value += count * 10  # 活子价值更高
-            else:
-                value += count * 5   # 死子也有一定价值
-            
-            # 检查周围是否有己方棋子（有助于形成更复杂的局面）
-            for d in range(-2, 3):
-                nx, ny = x + dx * d, y + dy * d
-                if 0 <= nx < 15 and 0 <= ny < 15 and board[nx][ny] == player_color:
-                    value += 2
-        
-        return value
+        # 各方向连子数 × (活 10 / 死 5)，加上两格以内己方棋子数 × 2，见 BoardFeatures.attack
+        return int(self._get_analysis(board).features.attack[COLORS[player_color]][x, y])
 
     def _get_center_control_moves(self, board):
         """获取控制中心的最佳位置"""
@@ -444,101 +363,60 @@ Response:"""
 
     def _get_balanced_moves(self, board, player_color):
         """获取平衡发展的位置"""
-        moves = []
-        for i in range(15):
-            for j in range(15):
-                if board[i][j] == '':
-                    attack_value = self._evaluate_attack_value(board, i, j, player_color)
-                    defense_value = self._evaluate_defense_value(board, i, j, player_color)
-                    # 在中局，我们希望找到攻防都不错的位置
-                    balance_value = min(attack_value, defense_value) * 2 + max(attack_value, defense_value)
-                    moves.append((i, j, balance_value))
-        
-        moves.sort(key=lambda x: x[2], reverse=True)
-        return [(x, y) for x, y, _ in moves]
+        analysis = self._get_analysis(board)
+        c = COLORS[player_color]
+        attack, defense = analysis.features.attack[c], analysis.features.defense[c]
+        # 在中局，我们希望找到攻防都不错的位置
+        balance = np.minimum(attack, defense) * 2 + np.maximum(attack, defense)
+        return analysis.ranked('balanced', c, balance)
 
     def _get_tactical_moves(self, board, player_color):
         """获取战术位置（主要用于残局）"""
-        moves = []
-        for i in range(15):
-            for j in range(15):
-                if board[i][j] == '':
-                    # 在残局，我们更关注直接的战术价值
-                    tactical_value = self._evaluate_tactical_value(board, i, j, player_color)
-                    moves.append((i, j, tactical_value))
-        
-        moves.sort(key=lambda x: x[2], reverse=True)
-        return [(x, y) for x, y, _ in moves]
+        analysis = self._get_analysis(board)
+        c = COLORS[player_color]
+        # 在残局，我们更关注直接的战术价值
+        return analysis.ranked('tactical', c, analysis.features.tactical(c))
 
     def _evaluate_defense_value(self, board, x, y, player_color):
         """评估某个位置的防守价值"""
-        value = 0
-        opponent_color = 'white' if player_color == 'black' else 'black'
-        
-        # 模拟在此位置下棋
-        board_copy = [row[:] for row in board]
-        board_copy[x][y] = player_color
-        
-        # 检查是否能阻止对手的连线
-        directions = [(0, 1), (1, 0), (1, 1), (1, -1)]
-        for dx, dy in directions:
-            # 检查对手在这个位置的潜在威胁
-            opponent_count = self._count_line(board, x, y, dx, dy, opponent_color)
-            is_alive = self._is_alive_line(board, x, y, dx, dy, opponent_color)
-            
-            # 根据威胁程度给分
-            if is_alive:
-                value += opponent_count * 15  # 阻止活子威胁
-            else:
-                value += opponent_count * 8   # 阻止死子威胁
-        
-        return value
+        # 对手在此位置各方向的连子数 × (活 15 / 死 8)，见 BoardFeatures.defense
+        return int(self._get_analysis(board).features.defense[COLORS[player_color]][x, y])
 
     def _evaluate_tactical_value(self, board, x, y, player_color):
         """评估某个位置的战术价值（主要用于残局）"""
-        value = 0
-        opponent_color = 'white' if player_color == 'black' else 'black'
-        
-        # 攻击价值
-        attack_value = self._evaluate_attack_value(board, x, y, player_color)
-        # 防守价值
-        defense_value = self._evaluate_defense_value(board, x, y, player_color)
-        
-        # 在残局，我们更重视能形成直接威胁的位置
-        value = max(attack_value, defense_value) * 1.5
-        
-        # 检查是否能形成多重威胁
-        board_copy = [row[:] for row in board]
-        board_copy[x][y] = player_color
-        
-        # 计算此位置能形成的威胁数量
-        threats_count = 0
-        for dx, dy in [(0, 1), (1, 0), (1, 1), (1, -1)]:
-            count = self._count_line(board_copy, x, y, dx, dy, player_color)
-            is_alive = self._is_alive_line(board_copy, x, y, dx, dy, player_color)
-            if count >= 3 and is_alive:
-                threats_count += 1
-        
-        # 多重威胁的价值很高
-        value += threats_count * 20
-        
-        return value
+        # 攻防价值较大者 × 1.5，加上能形成活三以上的方向数 × 20，见 BoardFeatures.tactical
+        return float(self._get_analysis(board).features.tactical(COLORS[player_color])[x, y])
 
-    def get_move(self, board, current_player):
-        """获取 Llama3 AI 的下一步移动"""
+    def get_move(self, board, current_player, cancel_event=None):
+        """获取 Llama3 AI 的下一步移动；cancel_event 被设置时尽快放弃流式请求"""
         try:
-            print(f"\n当前棋盘状态：\n{self._board_to_string(board)}")
-            print(f"当前玩家：{current_player}")
+            # 统一为 Board：各种序列化结果在同一局面内只生成一次
+            board = Board.of(board)
+            logger.debug("当前棋盘状态：\n%s", lazy(self._board_to_string, board))
+            logger.debug("当前玩家：%s", current_player)
             
+            # 开局库：前几手直接查表，不调用模型
+            book_move = default_book().probe(board, current_player)
+            if book_move is not None:
+                logger.info("✅ 开局库: %s", book_move)
+                return book_move
+
+            # 威胁空间搜索（VCF/VCT）：必胜或必须防守的局面直接落子，不再调用模型
+            forced = find_forced_move(board, current_player)
+            if forced is not None and forced.move is not None:
+                x, y = forced.move
+                logger.info("✅ 威胁空间搜索(%s): (%s, %s)", forced.kind, x, y)
+                return x, y
+
             # 首先进行策略分析，处理紧急情况
             strategic_move = self._get_best_move_by_strategy(board, current_player)
             if strategic_move:
                 x, y = strategic_move
                 if self._validate_move(board, x, y):
-                    print(f"✅ 使用策略决策: ({x}, {y})")
+                    logger.info("✅ 使用策略决策: (%s, %s)", x, y)
                     return x, y
                 else:
-                    print(f"❌ 策略决策位置无效: ({x}, {y})，继续AI分析")
+                    logger.warning("❌ 策略决策位置无效: (%s, %s)，继续AI分析", x, y)
             
             # 如果没有紧急情况，使用AI分析
             prompt = self._create_prompt(board, current_player)
@@ -557,67 +435,73 @@ Response:"""
                 }
             }
 
-            print(f"发送请求到 Llama3...")
-            print(f"请求参数: {json.dumps(data['options'], indent=2, ensure_ascii=False)}")
+            logger.debug("发送请求到 Llama3...")
+            logger.debug("请求参数: %s", lazy(json.dumps, data['options']))
             
-            response = requests.post(
-                self.api_url, 
-                headers=self.headers, 
-                json=data, 
-                timeout=60
-            )
-            response.raise_for_status()
-            
-            # 解析响应
-            result = response.json()
-            response_text = result.get('response', '').strip()
+            if self.stream:
+                response_text, result, move = self._generate_stream(data, board, cancel_event)
+                if move is not None:
+                    logger.info("✅ 流式解析坐标: %s", move)
+                    return move
+            else:
+                response = http_pool.get_session('llama3').post(
+                    self.api_url, 
+                    headers=self.headers, 
+                    json=data, 
+                    timeout=http_pool.timeout()
+                )
+                response.raise_for_status()
+                
+                # 解析响应
+                result = response.json()
+                response_text = result.get('response', '').strip()
             
             # 打印详细的响应信息
-            print(f"=== Llama3 响应详情 ===")
-            print(f"原始响应长度: {len(response_text)} 字符")
-            print(f"原始响应: {response_text}")
+            logger.debug("=== Llama3 响应详情 ===")
+            logger.debug("原始响应长度: %s 字符", len(response_text))
+            logger.debug("原始响应: %s", response_text)
             
             # 检查是否有其他响应字段
             if 'done' in result:
-                print(f"生成完成状态: {result['done']}")
+                logger.debug("生成完成状态: %s", result['done'])
             if 'total_duration' in result:
-                print(f"总耗时: {result['total_duration']} 纳秒")
+                logger.debug("总耗时: %s 纳秒", result['total_duration'])
             if 'load_duration' in result:
-                print(f"加载耗时: {result['load_duration']} 纳秒")
+                logger.debug("加载耗时: %s 纳秒", result['load_duration'])
             if 'prompt_eval_count' in result:
-                print(f"输入 token 数: {result['prompt_eval_count']}")
+                logger.debug("输入 token 数: %s", result['prompt_eval_count'])
             if 'prompt_eval_duration' in result:
-                print(f"输入处理耗时: {result['prompt_eval_duration']} 纳秒")
+                logger.debug("输入处理耗时: %s 纳秒", result['prompt_eval_duration'])
             if 'eval_count' in result:
-                print(f"生成 token 数: {result['eval_count']}")
+                logger.debug("生成 token 数: %s", result['eval_count'])
             if 'eval_duration' in result:
-                print(f"生成耗时: {result['eval_duration']} 纳秒")
+                logger.debug("生成耗时: %s 纳秒", result['eval_duration'])
             
             # 计算速度
             if 'eval_count' in result and 'eval_duration' in result and result['eval_duration'] > 0:
                 tokens_per_second = result['eval_count'] / (result['eval_duration'] / 1e9)
-                print(f"生成速度: {tokens_per_second:.2f} tokens/秒")
+                logger.debug("生成速度: %.2f tokens/秒", tokens_per_second)
             
-            print(f"========================")
+            logger.debug("========================")
             
             # 如果响应太短或不包含数字，直接使用备用策略
             if len(response_text.strip()) < 10 or not re.search(r'\d', response_text):
-                print("=== 响应过短分析 ===")
-                print(f"响应长度: {len(response_text.strip())} 字符 (阈值: 10)")
-                print(f"响应内容: '{response_text}'")
+                logger.debug("=== 响应过短分析 ===")
+                logger.debug("响应长度: %s 字符 (阈值: 10)", len(response_text.strip()))
+                logger.debug("响应内容: '%s'", response_text)
                 
                 # 检查是否因为停止词而提前结束
                 if 'eval_count' in result:
-                    print(f"实际生成了 {result['eval_count']} 个 token")
+                    logger.debug("实际生成了 %s 个 token", result['eval_count'])
                     if result['eval_count'] < 50:
-                        print("⚠️ 生成的 token 数量很少，可能是停止词过早触发")
+                        logger.debug("⚠️ 生成的 token 数量很少，可能是停止词过早触发")
                     elif result['eval_count'] >= 8000:
-                        print("⚠️ 生成的 token 数量接近上限，可能被截断")
+                        logger.debug("⚠️ 生成的 token 数量接近上限，可能被截断")
                 
-                print("使用智能备用策略")
-                print("===================")
+                logger.warning("响应过短，使用智能备用策略")
+                logger.debug("===================")
                 new_x, new_y = self._find_valid_position(board)
-                print(f"找到替代位置: ({new_x}, {new_y})")
+                logger.info("找到替代位置: (%s, %s)", new_x, new_y)
                 return new_x, new_y
             
             # 尝试从响应中提取JSON或坐标
@@ -636,7 +520,7 @@ Response:"""
                     json_match = re.search(pattern, response_text)
                     if json_match:
                         json_str = json_match.group()
-                        print(f"提取的JSON: {json_str}")
+                        logger.debug("提取的JSON: %s", json_str)
                         break
                 else:  # 坐标提取模式
                     coords = re.findall(pattern, response_text)
@@ -645,7 +529,7 @@ Response:"""
                             if len(coords[0]) == 2:  # 确保有两个数字
                                 x, y = int(coords[0][0]), int(coords[0][1])
                                 extracted_coords = (x, y)
-                                print(f"提取坐标 (模式{i+1}): ({x}, {y})")
+                                logger.debug("提取坐标 (模式%s): (%s, %s)", i + 1, x, y)
                                 break
                         except (ValueError, IndexError):
                             continue
@@ -658,44 +542,59 @@ Response:"""
                         x, y = int(move_data['x']), int(move_data['y'])
                         analysis = move_data.get('analysis', '无分析')
                         
-                        print(f"解析出的坐标: ({x}, {y})")
-                        print(f"AI 分析: {analysis}")
+                        logger.debug("解析出的坐标: (%s, %s)", x, y)
+                        logger.debug("AI 分析: %s", analysis)
                         
                         # 详细验证坐标
                         if self._validate_move(board, x, y):
                             return x, y
                     else:
-                        print("JSON中缺少必要的x和y字段")
+                        logger.warning("JSON中缺少必要的x和y字段")
                 except json.JSONDecodeError as e:
-                    print(f"JSON解析失败: {e}")
+                    logger.warning("JSON解析失败: %s", e)
             elif extracted_coords:
                 x, y = extracted_coords
-                print(f"使用直接提取的坐标: ({x}, {y})")
+                logger.debug("使用直接提取的坐标: (%s, %s)", x, y)
                 if self._validate_move(board, x, y):
                     return x, y
             
             # 如果没有找到有效坐标，使用智能寻找替代位置
-            print("未找到有效坐标，使用智能寻找替代位置...")
+            logger.warning("未找到有效坐标，使用智能寻找替代位置...")
             new_x, new_y = self._find_valid_position(board)
-            print(f"找到替代位置: ({new_x}, {new_y})")
+            logger.info("找到替代位置: (%s, %s)", new_x, new_y)
             return new_x, new_y
             
         except requests.exceptions.RequestException as e:
-            print(f"网络请求错误: {str(e)}")
-            print("使用智能寻找替代位置...")
+            logger.warning("网络请求错误: %s", e)
+            logger.debug("使用智能寻找替代位置...")
             new_x, new_y = self._find_valid_position(board)
-            print(f"找到替代位置: ({new_x}, {new_y})")
+            logger.info("找到替代位置: (%s, %s)", new_x, new_y)
             return new_x, new_y
         except Exception as e:
-            print(f"Error in get_move: {str(e)}")
-            print(f"错误类型: {type(e).__name__}")
-            import traceback
-            print(f"错误堆栈: {traceback.format_exc()}")
+            logger.error("Error in get_move: %s", e)
+            logger.debug("错误堆栈", exc_info=True)
             # 发生错误时也使用智能寻找替代位置
             new_x, new_y = self._find_valid_position(board)
-            print(f"发生错误，使用替代位置: ({new_x}, {new_y})")
+            logger.info("发生错误，使用替代位置: (%s, %s)", new_x, new_y)
             return new_x, new_y 
 
+    def _generate_stream(self, data, board, cancel_event=None):
+        """
+        以 NDJSON 流的方式请求 Ollama，收到完整坐标时立即断开（Ollama 随之停止生成）。
+        返回 (已收到的文本, 最后一条 NDJSON 消息, 坐标或 None)
+        """
+        response = http_pool.get_session('llama3').post(
+            self.api_url,
+            headers=self.headers,
+            json=dict(data, stream=True),
+            timeout=http_pool.timeout(),
+            stream=True
+        )
+        response.raise_for_status()
+        last = {}
+        text, move = read_move(response, ndjson_pieces(response, last), board, cancel_event)
+        return text.strip(), last, move
+
     def _evaluate_position_value(self, board, x, y):
         """评估位置价值"""
         value = 0
@@ -725,37 +624,18 @@ Response:"""
     
     def _find_fork_opportunities(self, board, player_color):
         """寻找双活三（叉攻）机会"""
+        # 在每个空位下棋后能形成两个以上活三的位置
         fork_opportunities = []
-        
-        for i in range(15):
-            for j in range(15):
-                if board[i][j] == '':
-                    # 检查在这个位置下棋后能形成多少个活三
-                    alive_threes = 0
-                    directions = [(0, 1), (1, 0), (1, 1), (1, -1)]
-                    
-                    for dx, dy in directions:
-                        count = self._count_line(board, i, j, dx, dy, player_color)
-                        if count == 3 and self._is_alive_line(board, i, j, dx, dy, player_color):
-                            alive_threes += 1
-                    
-                    if alive_threes >= 2:  # 双活三或更多
-                        fork_opportunities.append((i, j, alive_threes, f"双活三叉攻"))
+        for i, j, alive_threes in self._get_analysis(board).fork_points(COLORS[player_color]):
+            fork_opportunities.append((i, j, alive_threes, f"双活三叉攻"))
         
         return fork_opportunities
     
     def _find_blocking_positions(self, board, opponent_color):
         """寻找需要封堵的关键位置"""
+        # 寻找对手的活三，每个方向一条记录
         blocking_positions = []
-        
-        # 寻找对手的活三
-        for i in range(15):
-            for j in range(15):
-                if board[i][j] == '':
-                    directions = [(0, 1), (1, 0), (1, 1), (1, -1)]
-                    for dx, dy in directions:
-                        count = self._count_line(board, i, j, dx, dy, opponent_color)
-                        if count == 3 and self._is_alive_line(board, i, j, dx, dy, opponent_color):
-                            blocking_positions.append((i, j, count, f"封堵对手活三"))
+        for i, j in self._get_analysis(board).live_three_points(COLORS[opponent_color]):
+            blocking_positions.append((i, j, 3, f"封堵对手活三"))
         
         return blocking_positions 
\ No newline at end of file
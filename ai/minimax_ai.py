@@ -0,0 +1,208 @@
+import logging
+import threading
+
+from source.AI import GomokuAI, N
+from source.board import Board, CELL_OF, EMPTY, NAMES
+from ai.ponder import Ponderer
+
+logger = logging.getLogger(__name__)
+
+
+class MinimaxAI:
+    """
+    本地 alpha-beta 引擎（source/AI.py 的 GomokuAI）的适配器，接口与 LLM 客户端相同：get_move(board, current_player)。
+    每个对局使用一个实例：引擎的局面（位棋盘、nextBound 候选点、局面估值、滚动哈希、置换表）在多步之间保留，
+    每次只把对手新下的棋子增量同步进引擎；执子颜色改变或棋盘不是上次局面的延续（重置、悔棋）时才重建引擎。
+    ponderMs > 0 时在对手思考期间预先计算对手最可能的几个应手的回答（见 ai/ponder.py）：每个应手与正常落子一样搜索 timeBudgetMs，
+    每轮最多用 ponderMs 毫秒，因此预测 min(ponderMoves, ponderMs // timeBudgetMs) 个应手。
+    给出 pool（ai/search_pool.SearchPool）时引擎在池中的一个 worker 进程里（局面和置换表同样在各步之间保留），
+    这里只转发调用、等待结果，不持有 GIL；eventlet 协程服务器中必须这样做，否则一次搜索期间所有连接的收发都会停住。
+    """
+
+    def __init__(self, depth=4, timeBudgetMs=1000, ponderMs=0, ponderMoves=3, pool=None):
+        self.depth = depth
+        self.timeBudgetMs = timeBudgetMs
+        self.pool = pool
+        self.handle = pool.register() if pool is not None else None
+        self.lastStats = {}  # 池中引擎最近一次调用后的统计
+        self.ponderer = None
+        replies = min(ponderMoves, ponderMs // max(1, timeBudgetMs)) if ponderMs > 0 else 0
+        if replies > 0:
+            self.ponderer = Ponderer(MinimaxAI(depth=depth, timeBudgetMs=timeBudgetMs, pool=pool), replies)
+        self.engine = None
+        self.builds = 0
+        self.board = None  # 引擎当前同步到的局面
+        self.color = None  # 引擎执子的颜色，引擎内部总是以 1 表示自己
+        self.own = None  # 该颜色在 Board 中的取值
+        self._lock = threading.Lock()  # 被取消的搜索可能还没退出，下一次 get_move 等它结束
+        self._stop = threading.Event()  # 当前（或最近一次）搜索的取消标记，cancel 设置它
+
+    def _new_engine(self, color):
+        self.engine = GomokuAI(depth=self.depth, timeBudgetMs=self.timeBudgetMs)
+        self.builds += 1
+        self.board = Board()
+        self.color = color
+        self.own = CELL_OF[color]
+
+    def _play(self, i, j, cell):
+        # 与开局库自我对弈相同的落子方式：增量估值、落子、更新候选点
+        engine = self.engine
+        state = 1 if cell == self.own else -1
+        engine.boardValue = engine.evaluate(i, j, engine.boardValue, state, engine.nextBound)
+        engine.setState(i, j, state)
+        engine.updateBound(i, j, engine.nextBound)
+        engine.nextBound.commit()  # 落下的棋子不会撤销，撤销记录不必保留
+        self.board.make(i, j, NAMES[cell])
+
+    def _sync(self, board, color):
+        """让引擎与 board 一致：只多了棋子时逐个补上，否则重建"""
+        if self.engine is None or color != self.color or any(
+                old != EMPTY and old != new for old, new in zip(self.board.cells, board.cells)):
+            if self.engine is not None:
+                logger.debug("Rebuilding minimax engine (%s)", color)
+                self.engine.close()
+            self._new_engine(color)
+        added = [p for p, (old, new) in enumerate(zip(self.board.cells, board.cells)) if old != new]
+        for p in added:
+            i, j = divmod(p, N)
+            self._play(i, j, board.cells[p])
+        self.engine.emptyCells = N * N - board.stoneCount()
+
+    def get_move(self, board, current_player, cancel_event=None, answer=None):
+        """
+        搜索 current_player 的下一步，并把这一步记入引擎局面；cancel_event 已被设置时不再搜索，被取消时这一步不记入。
+        answer 为已经算好的着法（ponder 命中）时不搜索，直接记入。引擎在池中且调用在开始前被取消时返回 None
+        """
+        with self._lock:
+            self._stop = cancel_event if cancel_event is not None else threading.Event()
+            cancel_event = self._stop
+            board = Board.of(board)
+            # 先取 ponder 的结果：命中时不用搜索，未命中时它会立刻停止后台计算
+            if answer is None and self.ponderer is not None:
+                answer = self.ponderer.take(board, current_player)
+            if self.pool is None:
+                move = self._get_move(board, current_player, cancel_event, answer)
+            else:
+                move = self._remote('get_move', (board, current_player), {'answer': answer}, cancel_event)
+            if move is not None and self.ponderer is not None and not cancel_event.is_set():
+                after = board.copy()
+                after.make(*move, current_player)
+                self.ponderer.start(after, current_player)
+            return move
+
+    def _remote(self, method, args, kwargs=None, cancel_event=None):
+        result, stats = self.pool.call(self.handle, {'depth': self.depth, 'timeBudgetMs': self.timeBudgetMs},
+                                       method, args, kwargs, cancel_event)
+        if stats is not None:
+            self.lastStats = stats
+        return result
+
+    def searchStats(self):
+        """引擎的统计：重建次数、最近一次搜索完成的深度和节点数、置换表中的条目数"""
+        if self.pool is not None:
+            return self.lastStats
+        engine = self.engine
+        if engine is None:
+            return {'builds': self.builds}
+        return {'builds': self.builds, 'depth': engine.completedDepth, 'nodes': engine.nodes,
+                'ttEntries': len(engine.TTable)}
+
+    def cancel(self):
+        """
+        让正在进行的搜索在下一个节点结束（迭代加深返回已完成的最深一轮的着法）。
+        取消标记一直保持：搜索还没开始时，它一开始就会结束
+        """
+        self._stop.set()
+
+    def candidates(self, board, color, count):
+        """与 board 同步后候选分值最高的 count 个空位"""
+        if self.pool is not None:
+            return self._remote('candidates', (Board.of(board), color, count))
+        with self._lock:
+            board = Board.of(board)
+            self._sync(board, color)
+            return [pos for pos in self.engine.nextBound.ordered() if board.isEmpty(*pos)][:count]
+
+    def ponder(self, board, reply, color, cancel_event=None):
+        """
+        board 为 color 刚落子后的局面：假设对手下在 reply，搜索 color 的回答，返回后引擎恢复到 board，
+        同一轮的下一个预测应手以及下一轮（board 的延续）都只需增量同步。被取消时返回 None。
+        """
+        opponent = 'white' if color == 'black' else 'black'
+        with self._lock:
+            self._stop = cancel_event if cancel_event is not None else threading.Event()
+            cancel_event = self._stop
+            board = Board.of(board)
+            if self.pool is not None:
+                return self._remote('ponder', (board, reply, color), None, cancel_event)
+            self._sync(board, color)
+            engine = self.engine
+            root = (engine.boardValue, engine.nextBound.copy(), self.board.copy(), engine.emptyCells)
+            self._play(*reply, CELL_OF[opponent])
+            try:
+                after = self.board.copy()
+                engine.turn = after.stoneCount()
+                engine.emptyCells -= 1
+                move = self._search(after, cancel_event)
+            finally:
+                engine.setState(*reply, 0)
+                engine.boardValue, engine.nextBound, self.board, engine.emptyCells = root
+        if cancel_event.is_set():
+            return None
+        if move is None or not (0 <= move[0] < N and 0 <= move[1] < N) or not after.isEmpty(*move):
+            return None
+        return move
+
+    def _get_move(self, board, current_player, cancel_event, pondered):
+        self._sync(board, current_player)
+        engine = self.engine
+        engine.turn = board.stoneCount()
+
+        # 搜索结束后引擎的根节点状态是搜索得到的（超时回退时甚至没有包含这一步），
+        # 这里恢复搜索前的状态，再和对手的棋子一样按静态估值把这一步记入引擎，保证增量状态与重建完全一致
+        root = (engine.boardValue, engine.nextBound)
+        if pondered is not None:
+            logger.debug("Ponder hit: %s", pondered)
+            move = pondered
+        elif engine.turn == 0:
+            # 空棋盘：开局库或天元，不需要搜索
+            move = engine.bookMove() or (N // 2, N // 2)
+        elif cancel_event.is_set():
+            # 已被取消（对冲请求中另一个后端先给出了着法）：不再搜索
+            move = self._best_candidate(board)
+        else:
+            move = self._search(board, cancel_event)
+        engine.boardValue, engine.nextBound = root
+        i, j = move if move is not None else (-1, -1)
+
+        if not (0 <= i < N and 0 <= j < N) or not board.isEmpty(i, j):
+            # 搜索没有给出有效着法（例如没有候选点）：取候选分值最高的空位
+            logger.warning("Minimax search returned invalid move (%s, %s), using best candidate", i, j)
+            i, j = self._best_candidate(board)
+
+        if cancel_event.is_set():
+            # 被取消的搜索（对冲请求中另一个后端先给出了着法）：这一步不会被采用，引擎停留在搜索前的局面，
+            # 下一步棋的局面仍是它的延续，只需增量同步，不必重建
+            logger.debug("Minimax search cancelled, keeping the root position")
+            return i, j
+        self._play(i, j, self.own)
+        logger.info("Minimax move (%s, %s), depth %s, %s nodes", i, j, engine.completedDepth, engine.nodes)
+        return i, j
+
+    def _search(self, board, cancel_event):
+        engine = self.engine
+        if cancel_event.is_set():
+            return self._best_candidate(board)
+        return engine.get_action(stop=cancel_event)
+
+    def _best_candidate(self, board):
+        """候选分值最高的空位"""
+        return next((pos for pos in self.engine.nextBound.ordered() if board.isEmpty(*pos)), None) or board.emptyCells()[0]
+
+    def close(self):
+        if self.ponderer is not None:
+            self.ponderer.close()
+        if self.pool is not None:
+            self.pool.release(self.handle)
+        if self.engine is not None:
+            self.engine.close()
@@ -0,0 +1,162 @@
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from operator import itemgetter
+from source.board import Board, N
+from source.symmetry import INVERSE, MAPS
+from ai.fallback import track_fallback
+
+logger = logging.getLogger(__name__)
+
+
+# source/symmetry.py 中 8 种对称变换的格子序号形式：FORWARD[t][p] 为格子 p 经变换 t 后的位置，BACKWARD[t] 为其逆变换
+FORWARD = tuple(tuple(i * N + j for row in maps for i, j in row) for maps in MAPS)
+BACKWARD = tuple(FORWARD[INVERSE[t]] for t in range(len(MAPS)))
+# 变换后的局面：第 q 格取原局面的 BACKWARD[t][q] 格，itemgetter 在 C 层完成整张棋盘的重排
+_GATHER = tuple(itemgetter(*inv) for inv in BACKWARD)
+
+
+def canonical(board):
+    """8 种对称局面中字节序最小的一个，返回 (局面字节, 变换编号)"""
+    cells = Board.of(board).cells
+    return min((bytes(gather(cells)), t) for t, gather in enumerate(_GATHER))
+
+
+class MoveCache:
+    """
+    局面 -> 着法的缓存：键为对称归一化后的局面、执子方和模型名，
+    内存中按 LRU 淘汰并带 TTL；给定 path 时同时写入 SQLite，进程重启后仍然有效。
+    着法按归一化后的坐标保存，命中时再变换回当前局面的坐标，旋转、翻转后的相同局面共用一条记录。
+    """
+
+    def __init__(self, maxsize=10000, ttl=86400, path=None, clock=time.time):
+        self.maxsize = maxsize
+        self.ttl = ttl  # 秒，None 表示不过期
+        self.clock = clock
+        self.entries = OrderedDict()  # key -> (x, y, 写入时间)，按最近使用排序
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._db = None
+        if path:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute("CREATE TABLE IF NOT EXISTS moves (key BLOB PRIMARY KEY, x INTEGER, y INTEGER, created REAL)")
+            if ttl is not None:
+                self._db.execute("DELETE FROM moves WHERE created < ?", (clock() - ttl,))
+            self._db.commit()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def _expired(self, created):
+        return self.ttl is not None and self.clock() - created > self.ttl
+
+    @staticmethod
+    def _key(cells, current_player, model):
+        return f"{model}|{current_player}|".encode() + cells
+
+    def get(self, board, current_player, model):
+        """命中时返回当前局面坐标下的 (x, y)，否则返回 None"""
+        board = Board.of(board)
+        cells, t = canonical(board)
+        key = self._key(cells, current_player, model)
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is not None and self._expired(entry[2]):
+                del self.entries[key]
+                entry = None
+            if entry is None and self._db is not None:
+                row = self._db.execute("SELECT x, y, created FROM moves WHERE key = ?", (key,)).fetchone()
+                if row is not None and not self._expired(row[2]):
+                    entry = self._put(key, row)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+        x, y = divmod(BACKWARD[t][entry[0] * N + entry[1]], N)
+        if not board.isEmpty(x, y):
+            # 不应发生（同一局面的着法必然是空位），保险起见当作未命中
+            logger.warning("Cached move (%s, %s) is occupied, ignoring", x, y)
+            return None
+        return x, y
+
+    def put(self, board, current_player, model, move):
+        cells, t = canonical(board)
+        key = self._key(cells, current_player, model)
+        x, y = divmod(FORWARD[t][move[0] * N + move[1]], N)
+        with self._lock:
+            entry = self._put(key, (x, y, self.clock()))
+            if self._db is not None:
+                self._db.execute("INSERT OR REPLACE INTO moves VALUES (?, ?, ?, ?)", (key, *entry))
+                self._db.commit()
+
+    def _put(self, key, entry):
+        entry = tuple(entry)
+        self.entries[key] = entry
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+        return entry
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+
+class CachedEngine:
+    """
+    在 AI 引擎前加一层 MoveCache，接口与被包装的引擎相同。
+    命中时直接返回，不调用模型；引擎因为请求失败、解析失败而使用 _find_valid_position 兜底的着法不写入缓存
+    （见 ai/fallback.py），被取消的请求也不写入。
+    """
+
+    def __init__(self, engine, model, cache=None):
+        self.engine = engine
+        self.model = model
+        self.cache = cache
+
+    @property
+    def fallbacks(self):
+        return getattr(self.engine, 'fallbacks', 0)
+
+    def get_move(self, board, current_player, cancel_event=None):
+        board = Board.of(board)
+        cache = self.cache or get_cache()
+        move = cache.get(board, current_player, self.model)
+        if move is not None:
+            logger.info("✅ 局面缓存(%s): %s", self.model, move)
+            return move
+        with track_fallback() as call:
+            move = self.engine.get_move(board, current_player, cancel_event=cancel_event)
+        # 被取消的请求可能只解析了部分输出，不写入缓存
+        if not call.fallback and not (cancel_event and cancel_event.is_set()):
+            cache.put(board, current_player, self.model, move)
+        return move
+
+    def close(self):
+        close = getattr(self.engine, 'close', None)
+        if close is not None:
+            close()
+
+
+# 进程内共用的缓存，应用启动时由 configure_move_cache(app.config) 按配置重建
+_cache = MoveCache()
+
+
+def configure_move_cache(config):
+    """根据应用配置设置缓存大小、TTL 和持久化文件（MOVE_CACHE_PATH 为空时只在内存中缓存）"""
+    global _cache
+    old, _cache = _cache, MoveCache(
+        maxsize=config.get('MOVE_CACHE_SIZE', 10000),
+        ttl=config.get('MOVE_CACHE_TTL', 86400),
+        path=config.get('MOVE_CACHE_PATH') or None,
+    )
+    old.close()
+
+
+def get_cache():
+    return _cache
@@ -1,16 +1,26 @@
 import os
 from dotenv import load_dotenv
 from openai import OpenAI
+import logging
 import re
+from source.threat_search import find_forced_move
+from source.opening_book import default_book
+from source.board import Board
+from source.line_runs import LineRuns
+from ai.fallback import note_fallback
+from utils.log_util import lazy
+
+logger = logging.getLogger(__name__)
 
 # 加载环境变量
 load_dotenv()
 
 class OpenAIAI:
     def __init__(self):
-        print("DEBUG: OPENAI_API_KEY =", os.getenv('OPENAI_API_KEY'))
+        logger.debug("OPENAI_API_KEY configured: %s", bool(os.getenv('OPENAI_API_KEY')))
         self.client = OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
         self.model = "gpt-4"  # 使用 gpt-4 模型，因为 gpt-4.1 目前不可用
+        self.fallbacks = 0  # 使用 _find_valid_position 兜底的次数（单次调用是否兜底见 ai/fallback.py）
 
     def _create_prompt(self, board, current_player):
         """创建发送给 OpenAI 的提示"""
@@ -30,38 +40,13 @@ class OpenAIAI:
         return prompt
 
     def _board_to_string(self, board):
-        """将棋盘转换为字符串表示，并标注关键位置"""
-        # 定义关键位置（天元和星位）
-        key_positions = {
-            (7, 7): '*',  # 天元
-            (3, 3): '*', (3, 7): '*', (3, 11): '*',  # 左上、中上、右上星位
-            (7, 3): '*', (7, 11): '*',  # 左中、右中星位
-            (11, 3): '*', (11, 7): '*', (11, 11): '*'  # 左下、中下、右下星位
-        }
-        
-        board_str = "   " + " ".join([f"{i:2d}" for i in range(15)]) + "\n"
-        for i, row in enumerate(board):
-            row_str = f"{i:2d} "
-            for j, cell in enumerate(row):
-                if (i, j) in key_positions:
-                    if cell == 'black':
-                        row_str += ' B'
-                    elif cell == 'white':
-                        row_str += ' W'
-                    else:
-                        row_str += ' *'
-                else:
-                    if cell == 'black':
-                        row_str += ' B'
-                    elif cell == 'white':
-                        row_str += ' W'
-                    else:
-                        row_str += ' .'
-            board_str += row_str + "\n"
-        return board_str
+        """将棋盘转换为字符串表示，并标注关键位置（天元和星位）"""
+        return Board.of(board).text(stars=True)
 
     def _find_valid_position(self, board):
         """智能寻找一个有效的落子位置"""
+        self.fallbacks += 1
+        note_fallback()
         # 定义优先级区域（从中心向外扩展）
         priority_areas = [
             (7, 7),  # 天元
@@ -77,11 +62,12 @@ class OpenAIAI:
         
         # 检查对手的威胁
         opponent = 'white' if any('black' in row for row in board) else 'black'
+        runs = LineRuns(board)
         for i in range(15):
             for j in range(15):
                 if board[i][j] == '':
                     # 检查这个位置是否能形成威胁
-                    if self._is_threatening_position(board, i, j, opponent):
+                    if self._is_threatening_position(runs, i, j, opponent):
                         return i, j
         
         # 如果找不到威胁位置，从中心向外寻找空位
@@ -94,42 +80,31 @@ class OpenAIAI:
         
         return 7, 7  # 默认返回中心位置
 
-    def _is_threatening_position(self, board, x, y, player):
-        """检查位置是否具有威胁性"""
-        # 临时放置棋子
-        board[x][y] = player
-        
-        # 检查是否能形成活四、冲四或活三
-        directions = [(0, 1), (1, 0), (1, 1), (1, -1)]
-        for dx, dy in directions:
-            count = 1
-            # 向一个方向检查
-            i, j = x + dx, y + dy
-            while 0 <= i < 15 and 0 <= j < 15 and board[i][j] == player:
-                count += 1
-                i += dx
-                j += dy
-            
-            # 向相反方向检查
-            i, j = x - dx, y - dy
-            while 0 <= i < 15 and 0 <= j < 15 and board[i][j] == player:
-                count += 1
-                i -= dx
-                j -= dy
-            
-            if count >= 3:  # 如果能形成活三或更多
-                board[x][y] = ''  # 恢复棋盘状态
-                return True
-        
-        board[x][y] = ''  # 恢复棋盘状态
-        return False
+    def _is_threatening_position(self, runs, x, y, player):
+        """检查位置是否具有威胁性：落子后能形成三连或更长"""
+        return runs.longestIfPlaced(x, y, player) >= 3
 
-    def get_move(self, board, current_player):
-        """获取 OpenAI AI 的下一步移动"""
+    def get_move(self, board, current_player, cancel_event=None):
+        """获取 OpenAI AI 的下一步移动（非流式请求，cancel_event 只为接口一致）"""
         try:
+            # 统一为 Board：各种序列化结果在同一局面内只生成一次
+            board = Board.of(board)
+            # 开局库：前几手直接查表，不调用模型
+            book_move = default_book().probe(board, current_player)
+            if book_move is not None:
+                logger.info("✅ 开局库: %s", book_move)
+                return book_move
+
+            # 威胁空间搜索（VCF/VCT）：必胜或必须防守的局面直接落子，不再调用模型
+            forced = find_forced_move(board, current_player)
+            if forced is not None and forced.move is not None:
+                x, y = forced.move
+                logger.info("✅ 威胁空间搜索(%s): (%s, %s)", forced.kind, x, y)
+                return x, y
+
             prompt = self._create_prompt(board, current_player)
-            print(f"\n当前棋盘状态：\n{self._board_to_string(board)}")
-            print(f"当前玩家：{current_player}")
+            logger.debug("当前棋盘状态：\n%s", lazy(self._board_to_string, board))
+            logger.debug("当前玩家：%s", current_player)
             
             response = self.client.chat.completions.create(
                 model=self.model,
@@ -143,25 +118,25 @@ class OpenAIAI:
             
             # 从响应中提取坐标
             move_text = response.choices[0].message.content.strip()
-            print(f"AI返回的原始文本: {move_text}")
+            logger.debug("AI返回的原始文本: %s", move_text)
             
             # 使用正则表达式提取坐标
             match = re.search(r'\((\d+),\s*(\d+)\)', move_text)
             if match:
                 x, y = map(int, match.groups())
-                print(f"解析出的坐标: ({x}, {y})")
+                logger.debug("解析出的坐标: (%s, %s)", x, y)
                 
                 # 验证坐标是否有效
                 if 0 <= x < 15 and 0 <= y < 15 and board[x][y] == '':
                     return x, y
                 else:
-                    print(f"坐标 ({x}, {y}) 无效或已被占用，寻找替代位置")
+                    logger.warning("坐标 (%s, %s) 无效或已被占用，寻找替代位置", x, y)
                     return self._find_valid_position(board)
             else:
-                print("无法从AI响应中解析出有效坐标，使用替代位置")
+                logger.warning("无法从AI响应中解析出有效坐标，使用替代位置")
                 return self._find_valid_position(board)
                 
         except Exception as e:
-            print(f"Error in get_move: {str(e)}")
-            print("发生错误，使用替代位置")
+            logger.error("Error in get_move: %s", e)
+            logger.warning("发生错误，使用替代位置")
             return self._find_valid_position(board) 
\ No newline at end of file
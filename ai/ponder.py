@@ -0,0 +1,118 @@
+import logging
+import threading
+from concurrent.futures import CancelledError, Future, ThreadPoolExecutor, wait
+
+logger = logging.getLogger(__name__)
+
+# 所有会话共用的 ponder 名额：同时进行的 ponder 轮数不超过 max_rounds，名额用完时这一轮直接跳过（不排队），
+# ponder 最多占用这么多个搜索进程 / CPU，其余留给正常落子；由 configure_pondering 设置
+_slots = threading.BoundedSemaphore(1)
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='ponder')
+_config_lock = threading.Lock()
+
+
+def configure_pondering(max_rounds):
+    """设置所有会话合计同时进行的 ponder 轮数上限（正在进行的轮次不受影响）"""
+    global _slots, _executor
+    with _config_lock:
+        old = _executor
+        _slots = threading.BoundedSemaphore(max(1, max_rounds))
+        _executor = ThreadPoolExecutor(max_workers=max(1, max_rounds), thread_name_prefix='ponder')
+    old.shutdown(wait=False)
+
+
+class Ponderer:
+    """
+    利用对手思考的时间预先计算：AI 落子后，按候选分值取对手最可能的 moves 个应手，
+    在后台依次计算 AI 对每个应手的回答，结果按应手后的局面保存。
+    对手真的下了其中一步时 take 直接返回已算好的回答（正在计算这一步时等待它完成）；
+    否则取消剩余的计算，让出 CPU 给正常搜索。
+    各个应手都在同一个引擎上搜索（MinimaxAI.ponder 搜索后恢复到 AI 落子后的局面），引擎不会因为预测的局面而重建。
+    """
+
+    def __init__(self, engine, moves=3):
+        self.engine = engine  # 独立的 MinimaxAI（不 ponder），与会话的主引擎互不影响
+        self.moves = moves
+        self.color = None
+        self.futures = {}  # 应手后的局面键 -> Future(AI 的回答)
+        self.cancelEvent = threading.Event()
+        self.task = None  # 当前一轮 ponder 的后台任务
+        self._lock = threading.Lock()
+
+    def start(self, board, color):
+        """board 为 color（AI）刚落子后的局面，开始预测对手应手并计算回答；所有会话的 ponder 名额都在使用时跳过这一轮"""
+        self.cancel()
+        cancel = threading.Event()
+        with self._lock:
+            self.color = color
+            self.futures = {}
+            self.cancelEvent = cancel
+        if self.task is not None:
+            # 上一轮刚被取消，等它让出名额
+            wait([self.task], timeout=0.1)
+        slots, executor = _slots, _executor
+        if not slots.acquire(blocking=False):
+            logger.debug("No pondering slot free, skipping this round")
+            self.task = None
+            return
+        try:
+            self.task = executor.submit(self._run, board, color, cancel, slots)
+        except RuntimeError:
+            # configure_pondering 刚刚替换了线程池
+            slots.release()
+            self.task = None
+
+    def _run(self, board, color, cancel, slots):
+        opponent = 'white' if color == 'black' else 'black'
+        futures = {}  # 只处理这一轮的结果，start 可能已经换上了新一轮的 futures
+        try:
+            predictions = self.engine.candidates(board, color, self.moves)
+            queued = []
+            for move in predictions:
+                after = board.copy()
+                after.make(*move, opponent)
+                future = futures[after.key()] = Future()
+                queued.append((move, future))
+            with self._lock:
+                if cancel.is_set():
+                    return
+                self.futures = futures
+            for move, future in queued:
+                if cancel.is_set() or not future.set_running_or_notify_cancel():
+                    break
+                # 被取消而提前结束的搜索不完整，ponder 返回 None
+                future.set_result(self.engine.ponder(board, move, color, cancel_event=cancel))
+            logger.debug("Pondered %s replies", len(queued))
+        except Exception as e:
+            logger.warning("Pondering failed: %s", e)
+        finally:
+            for future in futures.values():
+                if future.running():
+                    future.set_result(None)
+                elif not future.done():
+                    future.cancel()
+            slots.release()
+
+    def take(self, board, color):
+        """对手应手后的局面 board：命中时返回 AI 的回答，否则返回 None；无论是否命中，之后的 ponder 都会被取消"""
+        with self._lock:
+            future = self.futures.get(board.key()) if color == self.color else None
+        answer = None
+        # 已经算完，或者正在计算的就是这一步时等它完成；还没轮到的预测与未命中一样直接取消
+        if future is not None and (future.done() or future.running()):
+            try:
+                answer = future.result()
+            except CancelledError:
+                pass
+        self.cancel()
+        logger.debug("Ponder %s", "hit" if answer is not None else "miss")
+        return answer
+
+    def cancel(self):
+        """停止当前一轮 ponder（包括正在进行的搜索）"""
+        self.cancelEvent.set()
+        self.engine.cancel()
+
+    def close(self):
+        self.cancel()
+        self.engine.close()
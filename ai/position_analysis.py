@@ -0,0 +1,104 @@
+import numpy as np
+
+from ai.board_features import DIRECTIONS, EMPTY, N, BoardFeatures, board_to_array
+
+# 与缓存局面相差超过这么多颗新棋子时直接整盘重算
+MAX_INCREMENTAL = 8
+
+
+def _line_cells(x, y, dx, dy):
+    # cells of the whole board line through (x, y) in direction (dx, dy), in order
+    while 0 <= x - dx < N and 0 <= y - dy < N:
+        x, y = x - dx, y - dy
+    cells = []
+    while 0 <= x < N and 0 <= y < N:
+        cells.append((x, y))
+        x, y = x + dx, y + dy
+    return cells
+
+
+class PositionAnalysis:
+    """
+    一个棋盘局面的分析结果：BoardFeatures 的连线特征，加上按 (查询, 颜色) 缓存的策略查询结果。
+    新增一颗棋子时只重算经过该点的 4 条线（其他格子的连线特征不受影响），并清空查询缓存。
+    """
+
+    def __init__(self, board):
+        self.features = BoardFeatures(board)
+        self.memo = {}
+
+    def sync(self, board):
+        """与新的棋盘同步：只多了几颗棋子时增量更新，否则整盘重算"""
+        grid = board_to_array(board)
+        changed = np.argwhere(grid != self.features.grid)
+        if len(changed) == 0:
+            return
+        if len(changed) > MAX_INCREMENTAL or (self.features.grid[tuple(changed.T)] != EMPTY).any():
+            self.features = BoardFeatures(board)
+        else:
+            for x, y in changed:
+                self._place(int(x), int(y), int(grid[x, y]))
+            self.features.derive()
+        self.memo = {}
+
+    def _place(self, x, y, value):
+        f = self.features
+        f.grid[x, y] = value
+        f.empty[x, y] = False
+        for d, (dx, dy) in enumerate(DIRECTIONS):
+            cells = _line_cells(x, y, dx, dy)
+            line = [int(f.grid[i, j]) for i, j in cells]
+            length = len(line)
+            for c in (0, 1):
+                own, opponent = c + 1, 2 - c
+                # forward[k] / backward[k]: own stones directly after / before cell k
+                forward, backward = [0] * length, [0] * length
+                for k in range(length - 2, -1, -1):
+                    forward[k] = forward[k + 1] + 1 if line[k + 1] == own else 0
+                for k in range(1, length):
+                    backward[k] = backward[k - 1] + 1 if line[k - 1] == own else 0
+                for k, (i, j) in enumerate(cells):
+                    after, before = k + forward[k] + 1, k - backward[k] - 1
+                    blocked_after = after < length and line[after] == opponent
+                    blocked_before = before >= 0 and line[before] == opponent
+                    f.count[c, d, i, j] = 1 + forward[k] + backward[k]
+                    f.alive[c, d, i, j] = not (blocked_after and blocked_before)
+                    f.near[c, d, i, j] = sum(1 for n in (k - 2, k - 1, k + 1, k + 2)
+                                             if 0 <= n < length and line[n] == own)
+
+    def cached(self, name, c, compute):
+        key = (name, c)
+        if key not in self.memo:
+            self.memo[key] = compute()
+        return self.memo[key]
+
+    def line_points(self, c, min_count=2):
+        """空位 × 方向中连子数 >= min_count 的 (i, j, 连子数, 是否活连)，按 (i, j, 方向) 顺序"""
+        def compute():
+            count = self.features.count[c].transpose(1, 2, 0)
+            alive = self.features.alive[c].transpose(1, 2, 0)
+            mask = (count >= min_count) & self.features.empty[:, :, None]
+            return [(int(i), int(j), int(count[i, j, d]), bool(alive[i, j, d])) for i, j, d in zip(*mask.nonzero())]
+        return self.cached(('line_points', min_count), c, compute)
+
+    def fork_points(self, c):
+        """落子后能形成两个以上活三的空位 (i, j, 活三数)"""
+        def compute():
+            alive_threes = self.features.live_three[c].sum(axis=0)
+            return [(int(i), int(j), int(alive_threes[i, j])) for i, j in zip(*(alive_threes >= 2).nonzero())]
+        return self.cached('fork_points', c, compute)
+
+    def live_three_points(self, c):
+        """能形成活三的 (i, j)，每个方向一条记录"""
+        def compute():
+            live_three = self.features.live_three[c].transpose(1, 2, 0)
+            return [(int(i), int(j)) for i, j, _ in zip(*live_three.nonzero())]
+        return self.cached('live_three_points', c, compute)
+
+    def ranked(self, name, c, values):
+        """按 values 图从高到低排列的空位（分值相同保持 (i, j) 顺序）"""
+        def compute():
+            moves = [(int(i), int(j), values[i, j]) for i, j in zip(*self.features.empty.nonzero())]
+            moves.sort(key=lambda x: x[2], reverse=True)
+            return [(x, y) for x, y, _ in moves]
+        return self.cached(name, c, compute)
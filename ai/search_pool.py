@@ -0,0 +1,127 @@
+import itertools
+import logging
+import multiprocessing
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, wait
+
+logger = logging.getLogger(__name__)
+
+# 每个 worker 进程最多保留的引擎数，超过时丢弃最久未用的（对应的会话下一步重建引擎）
+MAX_ENGINES = 256
+
+# worker 进程中的状态：引擎 id -> 本进程内搜索的 MinimaxAI，以及主进程写入的被取消的任务号
+_engines = OrderedDict()
+_cancelled = None
+
+
+def _init(cancelled):
+    global _cancelled
+    _cancelled = cancelled
+
+
+class _Cancelled:
+    """worker 中一次调用的取消标记：主进程把这次调用的任务号写入共享内存后 is_set 为真"""
+
+    def __init__(self, task):
+        self.task = task
+
+    def is_set(self):
+        return _cancelled.value == self.task
+
+    def set(self):
+        _cancelled.value = self.task
+
+
+def _call(engineId, config, method, args, kwargs, task):
+    from ai.minimax_ai import MinimaxAI
+
+    engine = _engines.get(engineId)
+    if engine is None:
+        engine = _engines[engineId] = MinimaxAI(**config)
+        while len(_engines) > MAX_ENGINES:
+            _, old = _engines.popitem(last=False)
+            old.close()
+    else:
+        _engines.move_to_end(engineId)
+    if method != 'candidates':
+        kwargs = dict(kwargs, cancel_event=_Cancelled(task))
+    result = getattr(engine, method)(*args, **kwargs)
+    return result, engine.searchStats()
+
+
+def _drop(engineId):
+    engine = _engines.pop(engineId, None)
+    if engine is not None:
+        engine.close()
+
+
+class SearchPool:
+    """
+    minimax 引擎所在的进程池：workers 个单进程的 worker，每个会话的引擎创建时固定在其中一个 worker 中，
+    引擎的局面和置换表留在 worker 进程里，在对局的各步之间保留，主进程中的 MinimaxAI 只转发调用。
+    搜索不占用服务器进程的 GIL，eventlet 的事件循环在搜索期间不会被卡住。
+    由创建它的一方持有（websocket 服务器按 MINIMAX_PROCESSES 创建一个），引擎通过 release 释放，close 结束所有 worker。
+    """
+
+    def __init__(self, workers):
+        self.workers = workers
+        self._slots = []  # [(executor, 共享的被取消任务号)]
+        self._load = [0] * workers  # 每个 worker 上的引擎数
+        self._ids = itertools.count(1)
+        self._tasks = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def _start(self):
+        if not self._slots:
+            for _ in range(self.workers):
+                cancelled = multiprocessing.RawValue('q', 0)
+                executor = ProcessPoolExecutor(max_workers=1, initializer=_init, initargs=(cancelled,))
+                self._slots.append((executor, cancelled))
+        return self._slots
+
+    def register(self):
+        """为一个新引擎分配 worker（引擎最少的一个），返回 (worker 序号, 引擎 id)"""
+        with self._lock:
+            self._start()
+            slot = self._load.index(min(self._load))
+            self._load[slot] += 1
+            return slot, next(self._ids)
+
+    def call(self, handle, config, method, args, kwargs=None, cancel_event=None):
+        """
+        在引擎所在的 worker 中调用 MinimaxAI(**config) 的 method（第一次调用时创建引擎），返回 (结果, 引擎统计)。
+        cancel_event 被设置时：调用还没开始就撤回，返回 (None, None)；已经开始则让 worker 中的搜索在下一个节点结束。
+        """
+        slot, engineId = handle
+        with self._lock:
+            executor, cancelled = self._start()[slot]
+            task = next(self._tasks)
+        future = executor.submit(_call, engineId, config, method, args, kwargs or {}, task)
+        while not wait([future], timeout=0.05).done:
+            if cancel_event is not None and cancel_event.is_set():
+                if future.cancel():
+                    return None, None
+                cancelled.value = task
+                cancel_event = None
+        return future.result()
+
+    def release(self, handle):
+        """丢弃引擎（会话结束），不等待"""
+        slot, engineId = handle
+        with self._lock:
+            if not self._slots:
+                return
+            self._load[slot] -= 1
+            executor, _ = self._slots[slot]
+        try:
+            executor.submit(_drop, engineId)
+        except RuntimeError:
+            pass  # 进程池已经关闭
+
+    def close(self):
+        with self._lock:
+            slots, self._slots = self._slots, []
+            self._load = [0] * self.workers
+        for executor, _ in slots:
+            executor.shutdown(cancel_futures=True)
@@ -0,0 +1,82 @@
+import json
+import logging
+import re
+from source.board import Board, N
+
+logger = logging.getLogger(__name__)
+
+# 流式输出中已经完整的坐标：y 的数字后面必须跟着 ',' 或 '}'，避免把 "1" 当成还没收完的 "12"
+MOVE_PATTERN = re.compile(r'"x"\s*:\s*(\d+)\s*,\s*"y"\s*:\s*(\d+)\s*[,}]')
+
+
+def extract_move(text, board):
+    """text 中第一个落在棋盘空位上的 {"x": .., "y": ..}，没有时返回 None"""
+    board = Board.of(board)
+    for match in MOVE_PATTERN.finditer(text):
+        x, y = int(match.group(1)), int(match.group(2))
+        if 0 <= x < N and 0 <= y < N and board.isEmpty(x, y):
+            return x, y
+    return None
+
+
+def ndjson_pieces(response, last):
+    """
+    Ollama 的 NDJSON 流：逐行产生 response 文本片段。
+    最后一行（done 为 true，带 eval_count 等统计）保存到 last 字典中。
+    """
+    for line in response.iter_lines():
+        if not line:
+            continue
+        chunk = json.loads(line.decode('utf-8'))
+        last.clear()
+        last.update(chunk)
+        yield chunk.get('response', '')
+        if chunk.get('done'):
+            return
+
+
+def sse_pieces(response, last):
+    """
+    OpenAI 兼容接口的 SSE 流（data: {...}）：逐条产生 choices[0].delta.content 片段。
+    带 usage 的最后一条保存到 last 字典中。
+    """
+    for line in response.iter_lines():
+        if not line.startswith(b'data:'):
+            continue
+        payload = line[5:].strip()
+        if payload == b'[DONE]':
+            return
+        chunk = json.loads(payload.decode('utf-8'))
+        if chunk.get('usage'):
+            last['usage'] = chunk['usage']
+        choices = chunk.get('choices') or []
+        if choices:
+            yield choices[0].get('delta', {}).get('content') or ''
+
+
+def read_move(response, pieces, board, cancel_event=None):
+    """
+    边接收边解析：一旦收到的文本中出现了落在空位上的完整坐标就停止读取并关闭连接
+    （服务端随之停止生成剩余的分析文字），返回 (已收到的文本, (x, y))；
+    流结束仍没有坐标时返回 (完整文本, None)，由调用方按原来的方式解析。
+    cancel_event 被设置（例如对冲请求中另一个后端先给出了着法）时同样立即断开，返回 (已收到的文本, None)。
+    """
+    text = ''
+    try:
+        for piece in pieces:
+            if cancel_event is not None and cancel_event.is_set():
+                logger.debug("Stream cancelled after %s characters", len(text))
+                return text, None
+            if not piece:
+                continue
+            text += piece
+            # 只有新片段里出现了 '}' 或 ',' 时坐标才可能刚刚完整
+            if ('}' in piece or ',' in piece) and '"y"' in text:
+                move = extract_move(text, board)
+                if move is not None:
+                    logger.debug("Move parsed from stream after %s characters", len(text))
+                    return text, move
+        return text, None
+    finally:
+        # 没有读完的响应在这里中断连接，不会被放回连接池
+        response.close()
@@ -1,23 +1,25 @@
 from flask import Flask, render_template, request
 from flask_cors import CORS
 from flask_jwt_extended import JWTManager
-from flask_socketio import SocketIO
 from config import Config
 from models import db
 from model.user import User  # 从原有的位置导入 User 模型
-import logging
+from utils.log_util import configure_logging
+from ai.http_pool import configure_http_pools
+from ai.move_cache import configure_move_cache
+from service.game_record_service import game_records
+from websocket import socketio
 from websocket.MyWebsocket import (
     handle_connect, 
     handle_disconnect, 
     handle_ai_first_move, 
     handle_player_move, 
     handle_reset_game, 
+    handle_request_snapshot,
+    handle_switch_ai_model,
     handle_logout
 )
 
-# 创建 SocketIO 实例
-socketio = SocketIO()
-
 def create_app():
     """创建Flask应用实例"""
     app = Flask(__name__, static_folder='frontend/build/static', template_folder='frontend/build')
@@ -31,6 +33,13 @@ def create_app():
     
     # 加载配置
     app.config.from_object(Config)
+
+    # 配置日志：根级别、各组件级别和 DEBUG 采样都来自 Config
+    configure_logging(app.config)
+    # AI 后端的 HTTP 连接池大小和超时
+    configure_http_pools(app.config)
+    # LLM 着法的局面缓存
+    configure_move_cache(app.config)
     
 
     ALLOWED_ORIGINS = [
@@ -41,14 +50,16 @@ def create_app():
 ]
     # 初始化扩展
     db.init_app(app)
+    # 结束的对局（含落子序列）写入 game_records
+    game_records.init_app(app)
     JWTManager(app)
     socketio.init_app(app, 
                      cors_allowed_origins=ALLOWED_ORIGINS,  # 允许所有来源
                      cors_credentials=True,
                      allow_upgrades=True,
                      transports=['websocket', 'polling'],
-                     logger=True,
-                     engineio_logger=True)
+                     logger=app.config['SOCKETIO_LOGGER'],
+                     engineio_logger=app.config['ENGINEIO_LOGGER'])
 
     # 添加全局CORS处理 - 确保AWS ELB环境下正常工作
     @app.after_request
@@ -89,19 +100,6 @@ def create_app():
     app.register_blueprint(game_controller, url_prefix='/game')
     app.register_blueprint(user_controller, url_prefix='/user')
 
-    # 配置日志
-    logging.basicConfig(
-        filename='app.log', 
-        level=app.config.get('LOG_LEVEL', logging.DEBUG),
-        format=app.config.get('LOG_FORMAT', '%(asctime)s %(levelname)s: %(message)s')
-    )
-    
-    console_handler = logging.StreamHandler()
-    console_handler.setLevel(logging.DEBUG)
-    formatter = logging.Formatter('%(asctime)s %(levelname)s: %(message)s')
-    console_handler.setFormatter(formatter)
-    logging.getLogger().addHandler(console_handler)
-
     @app.route('/')
     def index():
         """主页路由"""
@@ -115,6 +113,8 @@ socketio.on_event('disconnect', handle_disconnect)
 socketio.on_event('aiFirstMove', handle_ai_first_move)
 socketio.on_event('playerMove', handle_player_move)
 socketio.on_event('resetGame', handle_reset_game)
+socketio.on_event('requestSnapshot', handle_request_snapshot)
+socketio.on_event('switchAiModel', handle_switch_ai_model)
 socketio.on_event('logout', handle_logout)
 
 # 让 gunicorn 能 import 到 Flask 实例和 socketio 实例
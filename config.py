@@ -95,5 +95,23 @@ class Config:
     PORT = int(os.getenv('PORT', 5000))
 
     # Logging Configuration
-    LOG_LEVEL = getattr(logging, os.getenv('LOG_LEVEL', 'DEBUG'))
+    LOG_LEVEL = getattr(logging, os.getenv('LOG_LEVEL', 'INFO'))
     LOG_FORMAT = os.getenv('LOG_FORMAT', '%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    # 各组件单独的日志级别，按 logger 名称前缀设置，例如 "ai=DEBUG,websocket=WARNING"
+    LOG_LEVELS = os.getenv('LOG_LEVELS', '')
+    # DEBUG 日志采样比例（0~1），排查线上问题时只输出一部分调试日志
+    LOG_DEBUG_SAMPLE_RATE = float(os.getenv('LOG_DEBUG_SAMPLE_RATE', 1.0))
+    # Socket.IO / Engine.IO 自身的逐包日志，默认关闭
+    SOCKETIO_LOGGER = os.getenv('SOCKETIO_LOGGER', 'False').lower() == 'true'
+    ENGINEIO_LOGGER = os.getenv('ENGINEIO_LOGGER', 'False').lower() == 'true'
+
+    # AI 后端（DeepSeek / Llama3）的 HTTP 连接池：每个后端的长连接数、是否保持连接、(连接, 读取) 超时秒数
+    AI_HTTP_POOL_SIZE = int(os.getenv('AI_HTTP_POOL_SIZE', 8))
+    AI_HTTP_KEEP_ALIVE = os.getenv('AI_HTTP_KEEP_ALIVE', 'True').lower() == 'true'
+    AI_HTTP_CONNECT_TIMEOUT = float(os.getenv('AI_HTTP_CONNECT_TIMEOUT', 10))
+    AI_HTTP_READ_TIMEOUT = float(os.getenv('AI_HTTP_READ_TIMEOUT', 60))
+
+    # LLM 着法的局面缓存：最多条数、有效期（秒），MOVE_CACHE_PATH 非空时同时持久化到该 SQLite 文件
+    MOVE_CACHE_SIZE = int(os.getenv('MOVE_CACHE_SIZE', 10000))
+    MOVE_CACHE_TTL = int(os.getenv('MOVE_CACHE_TTL', 86400))
+    MOVE_CACHE_PATH = os.getenv('MOVE_CACHE_PATH', '')
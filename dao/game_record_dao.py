@@ -0,0 +1,23 @@
+import json
+from models import db, GameRecord
+
+
+class GameRecordDAO:
+    def __init__(self):
+        pass
+
+    def add_record(self, user_id, winner, moves, game_duration, ai_type):
+        """
+        Save a finished game; moves is the ordered list of (x, y), stored as JSON.
+        """
+        record = GameRecord(user_id=user_id, winner=winner, moves_count=len(moves), game_duration=game_duration,
+                            ai_type=ai_type, moves=json.dumps([list(move) for move in moves]))
+        db.session.add(record)
+        db.session.commit()
+        return record
+
+    def get_records_with_moves(self):
+        """
+        All games that have their move list saved.
+        """
+        return GameRecord.query.filter(GameRecord.moves.isnot(None)).all()
@@ -4,6 +4,14 @@ import "./Game.css";
 import WinnerModal from "./WinnerModal"; // 引入 WinnerModal 组件
 import config from '../config/config'; // 引入统一配置
 
+// 快照中每格一个字符：'.' 空，'b' 黑，'w' 白
+const CELL_COLORS = {b: "black", w: "white"};
+
+const decodeBoard = (encoded) =>
+    Array.from({length: 15}, (_, row) =>
+        Array.from({length: 15}, (_, col) => CELL_COLORS[encoded[row * 15 + col]] || null)
+    );
+
 const Game = React.memo(() => {
     const [board, setBoard] = useState(Array(15).fill(null).map(() => Array(15).fill(null)));
     const [currentPlayer, setCurrentPlayer] = useState("black");
@@ -17,6 +25,8 @@ const Game = React.memo(() => {
     const [isWaitingForAI, setIsWaitingForAI] = useState(false);
     const [socketConnected, setSocketConnected] = useState(false);
     const [showWinnerModal, setShowWinnerModal] = useState(false); // 控制弹窗显示
+    const seqRef = useRef(0); // 最近一次应用的落子序号
+    const playerColorRef = useRef(null); // 供 socket 事件处理器读取，避免重新绑定
 
     const renderCount = useRef(0);
 
@@ -105,6 +115,12 @@ const Game = React.memo(() => {
             setSocketConnected(false);
         });
 
+        // AI 没能落子（例如棋盘已满）：不再等待 AI
+        socketRef.current.on("aiError", (error) => {
+            console.error("AI error:", error.message);
+            setIsWaitingForAI(false);
+        });
+
         // 使用ref来绑定事件处理器，避免依赖问题
         const handleGameOverEvent = (message) => {
             console.log("Game Over - Winner:", message.winner);
@@ -115,21 +131,45 @@ const Game = React.memo(() => {
             setIsWaitingForAI(false);
         };
 
-        const handleUpdateBoardEvent = ({board: newBoard, next_turn}) => {
-            console.log("Board updated - Next turn:", next_turn);
+        // 增量落子：序号必须正好接上一步，否则请求完整快照
+        const handleMoveEvent = ({x, y, color, seq, next_turn}) => {
+            if (seq <= seqRef.current) {
+                return; // 已经应用过（例如快照之后才到达的旧消息）
+            }
+            if (seq !== seqRef.current + 1) {
+                console.log("Move sequence gap:", seqRef.current, "->", seq, ", requesting snapshot");
+                socketRef.current.emit("requestSnapshot");
+                return;
+            }
+            seqRef.current = seq;
+            setBoard(prev => prev.map((row, rowIndex) =>
+                rowIndex === x ? row.map((cell, colIndex) => (colIndex === y ? color : cell)) : row
+            ));
+            setCurrentPlayer(next_turn);
+            if (color !== playerColorRef.current) {
+                setIsWaitingForAI(false);
+            }
+        };
+
+        // 完整快照：连接（重连）、重置或请求后收到
+        const handleSnapshotEvent = ({board: encoded, seq, next_turn}) => {
+            console.log("Board snapshot - seq:", seq, "Next turn:", next_turn);
+            seqRef.current = seq;
+            setBoard(decodeBoard(encoded));
             setCurrentPlayer(next_turn);
-            setBoard(newBoard);
             setIsWaitingForAI(false);
         };
 
         socketRef.current.on("gameOver", handleGameOverEvent);
-        socketRef.current.on("updateBoard", handleUpdateBoardEvent);
+        socketRef.current.on("move", handleMoveEvent);
+        socketRef.current.on("snapshot", handleSnapshotEvent);
 
         return () => {
             if (socketRef.current) {
                 console.log("Cleaning up WebSocket connection");
                 socketRef.current.off("gameOver");
-                socketRef.current.off("updateBoard");
+                socketRef.current.off("move");
+                socketRef.current.off("snapshot");
                 socketRef.current.off("connect");
                 socketRef.current.off("disconnect");
                 socketRef.current.off("connect_error");
@@ -137,6 +177,7 @@ const Game = React.memo(() => {
                 socketRef.current.off("reconnect_error");
                 socketRef.current.off("reconnect_failed");
                 socketRef.current.off("error");
+                socketRef.current.off("aiError");
                 socketRef.current.disconnect();
             }
         };
@@ -244,6 +285,7 @@ const Game = React.memo(() => {
         // 重置游戏状态
         setBoard(Array(15).fill(null).map(() => Array(15).fill(null)));
         setPlayerColor(null);  // 重置玩家颜色，显示选择页面
+        playerColorRef.current = null;
         setCurrentPlayer(null);
         setGameOver(false);
         setWinner(null);
@@ -253,6 +295,7 @@ const Game = React.memo(() => {
 
     const handleColorSelection = (color) => {
         setPlayerColor(color);
+        playerColorRef.current = color;
         if (color === "black") {
             // 玩家选择黑子，自己先下
             setCurrentPlayer("black");
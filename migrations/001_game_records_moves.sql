@@ -0,0 +1,2 @@
+-- game_records.moves：按顺序的落子 JSON [[x, y], ...]，对局结束时写入，供 python -m source.opening_book --records 构建开局库
+ALTER TABLE game_records ADD COLUMN moves TEXT NULL;
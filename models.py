@@ -14,6 +14,7 @@ class GameRecord(db.Model):
     moves_count = db.Column(db.Integer, nullable=False)
     game_duration = db.Column(db.Integer)  # 游戏时长（秒）
     ai_type = db.Column(db.String(50), default='deepseek')  # AI 类型
+    moves = db.Column(db.Text, nullable=True)  # 按顺序的落子 JSON：[[x, y], ...]，用于构建开局库（migrations/001_game_records_moves.sql）
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
     # 建立与用户的关系（User 模型在 model/user.py 中定义）
@@ -31,5 +32,6 @@ class GameRecord(db.Model):
             'moves_count': self.moves_count,
             'game_duration': self.game_duration,
             'ai_type': self.ai_type,
+            'moves': self.moves,
             'created_at': self.created_at.isoformat()
         } 
\ No newline at end of file
@@ -0,0 +1,46 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from dao.game_record_dao import GameRecordDAO
+from dao.user_dao import UserDAO
+
+logger = logging.getLogger(__name__)
+
+
+class GameRecordService:
+    """
+    对局结束时把对局写入 game_records（包括按顺序的落子，供离线构建开局库）。
+    websocket 的事件处理和 AI 落子线程都没有应用上下文，写入在自己的线程中、在 init_app 给定的应用的上下文里进行，
+    调用方不等待数据库。
+    """
+
+    def __init__(self):
+        self.app = None
+        self.game_record_dao = GameRecordDAO()
+        self.user_dao = UserDAO()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='game-record')
+
+    def init_app(self, app):
+        self.app = app
+
+    def save_game(self, email, winner, moves, game_duration, ai_type):
+        """
+        Queue a finished game for saving; returns a Future of the new record id, or None before init_app.
+        """
+        if self.app is None:
+            return None
+        return self._executor.submit(self._save, email, winner, list(moves), game_duration, ai_type)
+
+    def _save(self, email, winner, moves, game_duration, ai_type):
+        try:
+            with self.app.app_context():
+                user = self.user_dao.get_user_by_email(email)
+                if user is None:
+                    logger.warning("No user for session ID: %s, game record not saved", email)
+                    return None
+                return self.game_record_dao.add_record(user.id, winner, moves, game_duration, ai_type).id
+        except Exception as e:
+            logger.error("Failed to save game record for session ID: %s: %s", email, e)
+            return None
+
+
+game_records = GameRecordService()
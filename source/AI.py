@@ -1,26 +1,50 @@
 import math
 import sys
+import time
 import source.utils as utils
+from source.bitboard import BitBoard, AXES, LINE_CELLS
+from source.pattern_table import shared_table, REACH
+from source.transposition import TranspositionTable, EXACT, LOWER, UPPER
+from source.candidates import CandidateMoves
+from source.threat_search import find_forced_move
+from source.opening_book import default_book
 
 sys.setrecursionlimit(1500)
 N = 15  # board size 15x15
 
 
+class SearchTimeout(Exception):
+    """搜索超出时间预算时在 alphaBetaPruning 内部抛出，由迭代加深驱动捕获"""
+    pass
+
+
 class GomokuAI():
-    def __init__(self, depth=3):
-        self.depth = depth  # default depth set to 3
+    def __init__(self, depth=3, ttSize=1 << 16, timeBudgetMs=None, workers=1, threatMs=50, useBook=True):
+        self.depth = depth  # default depth set to 3; maximum depth when searching on a time budget
+        self.timeBudgetMs = timeBudgetMs  # None -> always search to self.depth
+        self.deadline = None  # wall-clock deadline of the running search
+        self.stop = None  # event of the running get_action; once set, the search ends at the next node
+        self.nodes = 0
+        self.completedDepth = 0
+        self.workers = workers  # > 1 -> root-parallel search over that many processes
+        self.parallel = None
+        self.threatMs = threatMs  # time of the VCF/VCT pre-pass before each search; None -> skip it
+        self.useBook = useBook  # play from the opening book during the first plies
+        self.rootMoves = None  # defences found by the threat pre-pass; the next search only tries these at the root
         self.boardMap = [[0 for j in range(N)] for i in range(N)]
         self.currentI = -1
         self.currentJ = -1
-        self.nextBound = {}  # to store possible moves to be checked (i,j)
+        self.nextBound = CandidateMoves()  # to store possible moves to be checked (i,j)
         self.boardValue = 0
         self.turn = 0
         self.lastPlayed = 0
         self.emptyCells = N * N
         self.patternDict = utils.create_pattern_dict()  # dictionary containing all patterns with corresponding score
+        self.patternTable = shared_table(self.patternDict)  # line window -> summed pattern score
+        self.bitboard = BitBoard()  # search state; boardMap only mirrors it for drawing
         self.zobristTable = utils.init_zobrist()
         self.rollingHash = 0
-        self.TTable = {}
+        self.TTable = TranspositionTable(ttSize)  # bounded, reused across moves of one game
 
     def drawBoard(self):
         for i in range(N):
@@ -39,159 +63,163 @@ class GomokuAI():
         if i < 0 or i >= N or j < 0 or j >= N:
             return False
         if state:
-            if self.boardMap[i][j] != 0:
-                return False
-            else:
-                return True
+            return self.bitboard.isEmpty(i, j)
         else:
             return True
 
     def setState(self, i, j, state):
         assert state in (-1, 0, 1), 'The state inserted is not -1, 0 or 1'
+        if self.boardMap[i][j] != 0:
+            self.bitboard.remove(i, j, self.boardMap[i][j])
+            self.rollingHash ^= self.zobristTable[i][j][0 if self.boardMap[i][j] == 1 else 1]
+        if state != 0:
+            self.bitboard.place(i, j, state)
+            self.rollingHash ^= self.zobristTable[i][j][0 if state == 1 else 1]
         self.boardMap[i][j] = state
         self.lastPlayed = state
 
     def countDirection(self, i, j, xdir, ydir, state):
-        count = 0
-        for step in range(1, 5):
-            if xdir != 0 and (j + xdir * step < 0 or j + xdir * step >= N):
-                break
-            if ydir != 0 and (i + ydir * step < 0 or i + ydir * step >= N):
-                break
-            if self.boardMap[i + ydir * step][j + xdir * step] == state:
-                count += 1
-            else:
-                break
-        return count
+        return self.bitboard.countDirection(i, j, xdir, ydir, state)
 
     def isFive(self, i, j, state):
-        directions = [[(-1, 0), (1, 0)], [(0, -1), (0, 1)], [(-1, 1), (1, -1)], [(-1, -1), (1, 1)]]
-        for axis in directions:
-            axis_count = 1
-            for (xdir, ydir) in axis:
-                axis_count += self.countDirection(i, j, xdir, ydir, state)
-                if axis_count >= 5:
-                    return True
-        return False
-
-    def childNodes(self, bound):
-        for pos in sorted(bound.items(), key=lambda el: el[1], reverse=True):
-            yield pos[0]
+        if state not in (-1, 1):
+            return False
+        return self.bitboard.isFive(i, j, state)
+
+    def childNodes(self, bound, first=None, root=False):
+        # the transposition table's best move (if still a candidate) is tried first
+        if root and self.rootMoves:
+            ordered = [move for move in bound.ordered(first) if move in self.rootMoves]
+            return ordered + [move for move in self.rootMoves if move not in ordered and self.isValid(*move)]
+        return bound.ordered(first)
 
     def updateBound(self, new_i, new_j, bound):
-        played = (new_i, new_j)
-        if played in bound:
-            bound.pop(played)
+        bound.discard((new_i, new_j))
         directions = [(-1, 0), (1, 0), (0, -1), (0, 1), (-1, 1), (1, -1), (-1, -1), (1, 1)]
         for dir in directions:
             new_col = new_j + dir[0]
             new_row = new_i + dir[1]
             if self.isValid(new_row, new_col) and (new_row, new_col) not in bound:
-                bound[(new_row, new_col)] = 0
-
-    def countPattern(self, i_0, j_0, pattern, score, bound, flag):
-        directions = [(1, 0), (1, 1), (0, 1), (-1, 1)]
-        length = len(pattern)
-        count = 0
-        for dir in directions:
-            steps_back = min(5, j_0, i_0) if dir[0] == 1 else min(5, N - 1 - j_0, i_0)
-            i_start = i_0 - steps_back * dir[1]
-            j_start = j_0 - steps_back * dir[0]
-            z = 0
-            while z <= steps_back:
-                i_new = i_start + z * dir[1]
-                j_new = j_start + z * dir[0]
-                index = 0
-                remember = []
-                while index < length and self.isValid(i_new, j_new, state=False) and self.boardMap[i_new][j_new] == \
-                        pattern[index]:
-                    if self.isValid(i_new, j_new):
-                        remember.append((i_new, j_new))
-                    i_new = i_new + dir[1]
-                    j_new = j_new + dir[0]
-                    index += 1
-                if index == length:
-                    count += 1
-                    for pos in remember:
-                        if pos not in bound:
-                            bound[pos] = 0
-                        bound[pos] += flag * score
-                    z += index
-                else:
-                    z += 1
-        return count
+                bound.add((new_row, new_col), 0)
 
     def evaluate(self, new_i, new_j, board_value, turn, bound):
-        value_before = 0
-        value_after = 0
-        for pattern in self.patternDict:
-            score = self.patternDict[pattern]
-            value_before += self.countPattern(new_i, new_j, pattern, abs(score), bound, -1) * score
-            self.boardMap[new_i][new_j] = turn
-            value_after += self.countPattern(new_i, new_j, pattern, abs(score), bound, 1) * score
-            self.boardMap[new_i][new_j] = 0
-        return board_value + value_after - value_before
-
-    def alphaBetaPruning(self, depth, board_value, bound, alpha, beta, maximizingPlayer):
-        if depth <= 0 or (self.checkResult() != None):
+        value = board_value
+        for axis in AXES:
+            black, white, pos, length = self.bitboard.line(axis, new_i, new_j)
+            before, after = self.patternTable.lookup(black, white, pos, length, turn)
+            value += after[0] - before[0]
+            cells = LINE_CELLS[axis][self.bitboard.lineIndex(axis, new_i, new_j)]
+            offset = pos - REACH
+            for rel, weight in before[1]:
+                bound.add(cells[offset + rel], -weight)
+            for rel, weight in after[1]:
+                bound.add(cells[offset + rel], weight)
+        return value
+
+    def alphaBetaPruning(self, depth, board_value, bound, alpha, beta, maximizingPlayer, ply=0):
+        self.nodes += 1
+        # a node costs far more than a clock read, so check every node
+        if self.deadline is not None and time.time() >= self.deadline:
+            raise SearchTimeout()
+        if self.stop is not None and self.stop.is_set():
+            raise SearchTimeout()
+
+        if depth <= 0:
             return board_value
+        if ply == 0:
+            # everything played before the root is permanent
+            bound.commit()
 
-        if self.rollingHash in self.TTable and self.TTable[self.rollingHash][1] >= depth:
-            return self.TTable[self.rollingHash][0]
+        alpha_orig, beta_orig = alpha, beta
+        tt_move = None
+        entry = self.TTable.probe(self.rollingHash)
+        if entry is not None:
+            tt_move = entry.move
+            # the root must always search so that currentI/currentJ get set
+            if ply > 0 and entry.depth >= depth:
+                if entry.flag == EXACT:
+                    return entry.score
+                if entry.flag == LOWER:
+                    alpha = max(alpha, entry.score)
+                else:
+                    beta = min(beta, entry.score)
+                if beta <= alpha:
+                    return entry.score
 
+        best_move = None
         if maximizingPlayer:
             max_val = -math.inf
-            for child in self.childNodes(bound):
+            for child in self.childNodes(bound, tt_move, ply == 0):
                 i, j = child[0], child[1]
-                new_bound = dict(bound)
-                new_val = self.evaluate(i, j, board_value, 1, new_bound)
-                self.boardMap[i][j] = 1
+                mark = bound.mark()
+                new_val = self.evaluate(i, j, board_value, 1, bound)
+                self.bitboard.place(i, j, 1)
                 self.rollingHash ^= self.zobristTable[i][j][0]
-                self.updateBound(i, j, new_bound)
-                eval = self.alphaBetaPruning(depth - 1, new_val, new_bound, alpha, beta, False)
+                self.updateBound(i, j, bound)
+                # a five ends the game: the child is a leaf
+                if self.bitboard.isFive(i, j, 1):
+                    eval = new_val
+                else:
+                    eval = self.alphaBetaPruning(depth - 1, new_val, bound, alpha, beta, False, ply + 1)
                 if eval > max_val:
                     max_val = eval
-                    if depth == self.depth:
+                    best_move = child
+                    if ply == 0:
                         self.currentI = i
                         self.currentJ = j
                         self.boardValue = eval
-                        self.nextBound = new_bound
+                        self.nextBound = bound.copy()
                 alpha = max(alpha, eval)
-                self.boardMap[i][j] = 0
+                bound.undo(mark)
+                self.bitboard.remove(i, j, 1)
                 self.rollingHash ^= self.zobristTable[i][j][0]
-                del new_bound
                 if beta <= alpha:
                     break
-            utils.update_TTable(self.TTable, self.rollingHash, max_val, depth)
+            self.storeResult(depth, max_val, alpha_orig, beta_orig, best_move)
             return max_val
         else:
             min_val = math.inf
-            for child in self.childNodes(bound):
+            for child in self.childNodes(bound, tt_move, ply == 0):
                 i, j = child[0], child[1]
-                new_bound = dict(bound)
-                new_val = self.evaluate(i, j, board_value, -1, new_bound)
-                self.boardMap[i][j] = -1
+                mark = bound.mark()
+                new_val = self.evaluate(i, j, board_value, -1, bound)
+                self.bitboard.place(i, j, -1)
                 self.rollingHash ^= self.zobristTable[i][j][1]
-                self.updateBound(i, j, new_bound)
-                eval = self.alphaBetaPruning(depth - 1, new_val, new_bound, alpha, beta, True)
+                self.updateBound(i, j, bound)
+                if self.bitboard.isFive(i, j, -1):
+                    eval = new_val
+                else:
+                    eval = self.alphaBetaPruning(depth - 1, new_val, bound, alpha, beta, True, ply + 1)
                 if eval < min_val:
                     min_val = eval
-                    if depth == self.depth:
+                    best_move = child
+                    if ply == 0:
                         self.currentI = i
                         self.currentJ = j
                         self.boardValue = eval
-                        self.nextBound = new_bound
+                        self.nextBound = bound.copy()
                 beta = min(beta, eval)
-                self.boardMap[i][j] = 0
+                bound.undo(mark)
+                self.bitboard.remove(i, j, -1)
                 self.rollingHash ^= self.zobristTable[i][j][1]
-                del new_bound
                 if beta <= alpha:
                     break
-            utils.update_TTable(self.TTable, self.rollingHash, min_val, depth)
+            self.storeResult(depth, min_val, alpha_orig, beta_orig, best_move)
             return min_val
 
+    def storeResult(self, depth, value, alpha, beta, best_move):
+        # a score outside the (alpha, beta) window is only a bound on the true value
+        if value <= alpha:
+            flag = UPPER
+        elif value >= beta:
+            flag = LOWER
+        else:
+            flag = EXACT
+        self.TTable.store(self.rollingHash, depth, value, flag, best_move)
+
     def firstMove(self):
-        self.currentI, self.currentJ = 7, 7
+        move = default_book().probe(self.boardMap, 1) if self.useBook else None
+        self.currentI, self.currentJ = move if move is not None else (7, 7)
         self.setState(self.currentI, self.currentJ, 1)
 
     def checkResult(self):
@@ -210,16 +238,154 @@ class GomokuAI():
         else:
             return 'No winner yet'
 
-    def get_action(self):
+    def get_action(self, timeBudgetMs=None, stop=None):
         """
         获取 AI 的下一步动作，并返回落子坐标。
+        给定 timeBudgetMs（或构造时的 timeBudgetMs）时按时间预算迭代加深，否则固定搜索 self.depth 层。
+        stop 为 threading.Event 一类的对象：搜索开始前或搜索中被设置时立即结束，返回已完成的最深一轮的着法
+        （一轮都没有完成时为排序第一的候选点）。
         """
+        self.stop = stop
+        try:
+            return self._action(timeBudgetMs)
+        finally:
+            self.stop = None
+
+    def _action(self, timeBudgetMs):
         if self.turn == 0:  # 如果是第一次走棋
             self.firstMove()  # 在中心点下第一颗棋子
             self.turn += 1
             return self.currentI, self.currentJ
-        else:
-            # 调用 alphaBetaPruning 来计算最佳落子点
-            self.alphaBetaPruning(self.depth, self.boardValue, self.nextBound, -math.inf, math.inf, True)
+        elif self.bookMove() is not None:
+            # 开局库中的局面直接查表
+            self.turn += 1
+            return self.currentI, self.currentJ
+        elif self.forcedMove() is not None:
+            # 成五、堵四或己方已证明的 VCF/VCT 取胜，不需要完整搜索
             self.turn += 1
             return self.currentI, self.currentJ
+        elif self.rootMoves:
+            # 必须防守对方的活三或 VCF：只在可行的防守点中搜索
+            try:
+                return self.searchAction(timeBudgetMs)
+            finally:
+                self.rootMoves = None
+        elif not self.nextBound:
+            # 没有候选点（空棋盘或邻域已经下满）：天元为空时下天元，否则没有可下的位置，返回 None
+            if self.boardMap[N // 2][N // 2] != 0:
+                return None
+            self.turn += 1
+            return self.playRootMove(N // 2, N // 2)
+        else:
+            return self.searchAction(timeBudgetMs)
+
+    def searchAction(self, timeBudgetMs=None):
+        """完整搜索：给定 timeBudgetMs（或构造时的 timeBudgetMs）时按时间预算迭代加深，否则固定搜索 self.depth 层"""
+        if timeBudgetMs is not None or self.timeBudgetMs is not None:
+            # 在时间预算内迭代加深
+            self.iterativeDeepening(timeBudgetMs if timeBudgetMs is not None else self.timeBudgetMs)
+        elif self.stop is not None:
+            # 可以被取消的搜索：不限时间地迭代加深，被取消时返回已完成的最深一轮
+            self.iterativeDeepening(None)
+        else:
+            # 调用 alphaBetaPruning 来计算最佳落子点
+            self.TTable.newSearch()
+            self.nodes = 0
+            self.searchRoot(self.depth)
+        self.turn += 1
+        return self.currentI, self.currentJ
+
+    def forcedMove(self):
+        """
+        威胁空间预搜索（VCF/VCT）：可以直接成五、必须堵对方的四或者己方有已证明的 VCF/VCT 时直接落子，
+        与根节点搜索一样更新 currentI/currentJ、boardValue 和 nextBound，并返回坐标。
+        必须防守对方的活三或 VCF 时不直接落子：可行的防守点记入 rootMoves，由接下来的搜索从中选择，返回 None。
+        """
+        self.rootMoves = None
+        if self.threatMs is None:
+            return None
+        result = find_forced_move(self.bitboard, 1, self.threatMs)
+        if result is None or result.move is None:
+            # 没有强制着法，或者预算内没有结论：交给完整搜索
+            return None
+        if result.defences is not None and len(result.defences) > 1:
+            # 有多个防守点：交给搜索选择
+            self.rootMoves = list(result.defences)
+            return None
+        return self.playRootMove(*result.move)
+
+    def bookMove(self):
+        """前几手查询开局库，命中时直接落子并返回坐标；否则返回 None"""
+        if not self.useBook:
+            return None
+        move = default_book().probe(self.boardMap, 1)
+        if move is None:
+            return None
+        return self.playRootMove(*move)
+
+    def playRootMove(self, i, j):
+        # choose (i, j) without searching, leaving the same state behind as a root search would
+        bound = self.nextBound.copy()
+        self.boardValue = self.evaluate(i, j, self.boardValue, 1, bound)
+        self.updateBound(i, j, bound)
+        self.nextBound = bound
+        self.currentI, self.currentJ = i, j
+        return i, j
+
+    def searchRoot(self, depth):
+        """从当前局面 (boardValue, nextBound) 搜索 depth 层，设置 currentI/currentJ 并返回估值"""
+        if self.workers > 1 and depth > 1:
+            if self.parallel is None:
+                from source.parallel_search import ParallelSearch
+                self.parallel = ParallelSearch(self.workers)
+            return self.parallel.search(self, depth)
+        return self.alphaBetaPruning(depth, self.boardValue, self.nextBound, -math.inf, math.inf, True)
+
+    def close(self):
+        # release the worker processes of a parallel search
+        if self.parallel is not None:
+            self.parallel.close()
+            self.parallel = None
+
+    def iterativeDeepening(self, timeBudgetMs, maxDepth=None):
+        """
+        依次搜索深度 1, 2, 3 …，直到 maxDepth（默认 self.depth）、时间用完（timeBudgetMs 为 None 时不限时间）或 self.stop 被设置。
+        每一轮的最佳着法记录在置换表中，下一轮在根节点和各层节点优先尝试。
+        超时的那一轮结果被丢弃，返回最后一轮完整搜索的 (i, j)。
+        """
+        maxDepth = maxDepth or self.depth
+        self.deadline = time.time() + timeBudgetMs / 1000.0 if timeBudgetMs is not None else None
+        self.nodes = 0
+        self.completedDepth = 0
+        self.TTable.newSearch()
+
+        root_value = self.boardValue
+        root_bound = self.nextBound
+        root_hash = self.rollingHash
+        root_lines = self.bitboard.snapshot()
+        best = None
+        try:
+            for depth in range(1, maxDepth + 1):
+                if self.stop is not None and self.stop.is_set():
+                    # cancelled before this depth started
+                    break
+                self.boardValue, self.nextBound = root_value, root_bound
+                try:
+                    self.searchRoot(depth)
+                except SearchTimeout:
+                    # the interrupted line left stones on the bitboard and candidate changes
+                    self.bitboard.restore(root_lines)
+                    self.rollingHash = root_hash
+                    root_bound.undo(0)
+                    break
+                best = (self.currentI, self.currentJ, self.boardValue, self.nextBound)
+                self.completedDepth = depth
+        finally:
+            self.deadline = None
+
+        if best is None:
+            # not even depth 1 finished: fall back to the best-ordered candidate
+            i, j = next(iter(self.childNodes(root_bound, None, True)))
+            best = (i, j, root_value, root_bound.copy())
+        self.currentI, self.currentJ, self.boardValue, self.nextBound = best
+        return self.currentI, self.currentJ
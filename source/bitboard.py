@@ -0,0 +1,148 @@
+N = 15  # board size 15x15
+
+# The four line axes of the board. Every cell lies on exactly one line of each axis.
+ROW, COL, DIAG, ANTI = 0, 1, 2, 3
+AXES = (ROW, COL, DIAG, ANTI)
+
+
+def _build_line_tables():
+    # LINE_OF[axis][i][j] = (line index, bit position on the line, line length)
+    # LINE_CELLS[axis][line index] = [(i, j) for every bit position]
+    line_of = [[[None] * N for _ in range(N)] for _ in AXES]
+    line_cells = [[], [], [[] for _ in range(2 * N - 1)], [[] for _ in range(2 * N - 1)]]
+    for i in range(N):
+        line_cells[ROW].append([(i, j) for j in range(N)])
+        line_cells[COL].append([(j, i) for j in range(N)])
+    for i in range(N):
+        for j in range(N):
+            line_cells[DIAG][i - j + N - 1].append((i, j))
+            line_cells[ANTI][i + j].append((i, j))
+    for axis in AXES:
+        for index, cells in enumerate(line_cells[axis]):
+            for pos, (i, j) in enumerate(cells):
+                line_of[axis][i][j] = (index, pos, len(cells))
+    return line_of, line_cells
+
+
+LINE_OF, LINE_CELLS = _build_line_tables()
+
+# (xdir, ydir) as used by GomokuAI.countDirection -> (axis, step along the line bits)
+STEP_OF = {
+    (1, 0): (ROW, 1), (-1, 0): (ROW, -1),
+    (0, 1): (COL, 1), (0, -1): (COL, -1),
+    (1, 1): (DIAG, 1), (-1, -1): (DIAG, -1),
+    (-1, 1): (ANTI, 1), (1, -1): (ANTI, -1),
+}
+
+
+def color_index(state):
+    # state 1 -> 0, state -1 -> 1 (same order as the zobrist table)
+    return 0 if state == 1 else 1
+
+
+class BitBoard():
+    """
+    按颜色存储的位棋盘：每种颜色在行、列、主对角线、副对角线上各有一组整数位掩码。
+    lines[axis][color][index] 的第 pos 位表示该线上第 pos 个格子是否有该颜色的棋子。
+    """
+
+    def __init__(self):
+        self.lines = [[[0] * len(LINE_CELLS[axis]) for _ in range(2)] for axis in AXES]
+
+    def place(self, i, j, state):
+        c = color_index(state)
+        lines = self.lines
+        for axis in AXES:
+            index, pos, _ = LINE_OF[axis][i][j]
+            lines[axis][c][index] |= 1 << pos
+
+    def remove(self, i, j, state):
+        c = color_index(state)
+        lines = self.lines
+        for axis in AXES:
+            index, pos, _ = LINE_OF[axis][i][j]
+            lines[axis][c][index] &= ~(1 << pos)
+
+    def snapshot(self):
+        return [[list(masks) for masks in axis_lines] for axis_lines in self.lines]
+
+    def restore(self, snapshot):
+        self.lines = [[list(masks) for masks in axis_lines] for axis_lines in snapshot]
+
+    def get(self, i, j):
+        bit = 1 << j
+        if self.lines[ROW][0][i] & bit:
+            return 1
+        if self.lines[ROW][1][i] & bit:
+            return -1
+        return 0
+
+    def isEmpty(self, i, j):
+        return not ((self.lines[ROW][0][i] | self.lines[ROW][1][i]) >> j) & 1
+
+    def lineIndex(self, axis, i, j):
+        return LINE_OF[axis][i][j][0]
+
+    def line(self, axis, i, j):
+        """返回 (黑子掩码, 白子掩码, 位置, 线长) —— (i, j) 所在的 axis 方向整条线"""
+        index, pos, length = LINE_OF[axis][i][j]
+        return self.lines[axis][0][index], self.lines[axis][1][index], pos, length
+
+    def countDirection(self, i, j, xdir, ydir, state):
+        # number of consecutive `state` stones next to (i, j) along (xdir, ydir), at most 4
+        axis, step = STEP_OF[(xdir, ydir)]
+        index, pos, _ = LINE_OF[axis][i][j]
+        mask = self.lines[axis][color_index(state)][index]
+        if step == 1:
+            # trailing ones of the bits after pos
+            gaps = ~(mask >> (pos + 1))
+            count = (gaps & -gaps).bit_length() - 1
+        else:
+            below = ~mask & ((1 << pos) - 1)
+            count = pos - below.bit_length()
+        return min(count, 4)
+
+    def isFive(self, i, j, state):
+        # (i, j) itself counts as a `state` stone, as in the original neighbour scan
+        c = color_index(state)
+        for axis in AXES:
+            index, pos, _ = LINE_OF[axis][i][j]
+            m = self.lines[axis][c][index] | (1 << pos)
+            five = m & (m >> 1) & (m >> 2) & (m >> 3) & (m >> 4)
+            # starting bits of five-in-a-rows that cover pos
+            if five and (five >> max(0, pos - 4)) & (0x1F >> max(0, 4 - pos)):
+                return True
+        return False
+
+    def matchPattern(self, axis, i, j, pattern_masks, state=None):
+        """
+        在 (i, j) 所在的 axis 线上匹配棋型，只统计覆盖 (i, j) 的出现位置。
+        pattern_masks 为 compilePattern 的结果；state 非空时视 (i, j) 已落该颜色的子。
+        返回匹配的起始位置列表。
+        """
+        length_p, black_p, white_p = pattern_masks
+        index, pos, length = LINE_OF[axis][i][j]
+        black = self.lines[axis][0][index]
+        white = self.lines[axis][1][index]
+        if state == 1:
+            black |= 1 << pos
+        elif state == -1:
+            white |= 1 << pos
+        window = (1 << length_p) - 1
+        starts = []
+        for s in range(max(0, pos - length_p + 1), min(pos, length - length_p) + 1):
+            if (black >> s) & window == black_p and (white >> s) & window == white_p:
+                starts.append(s)
+        return starts
+
+
+def compilePattern(pattern):
+    # pattern tuple of -1/0/1 -> (length, black bits, white bits)
+    black = 0
+    white = 0
+    for k, v in enumerate(pattern):
+        if v == 1:
+            black |= 1 << k
+        elif v == -1:
+            white |= 1 << k
+    return len(pattern), black, white
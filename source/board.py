@@ -0,0 +1,137 @@
+N = 15  # board size 15x15
+
+EMPTY, BLACK, WHITE = 0, 1, 2
+NAMES = ('', 'black', 'white')  # cell value -> websocket / LLM encoding
+STATES = (0, 1, -1)  # cell value -> GomokuAI encoding
+CODES = '.bw'  # cell value -> compact snapshot character
+STAR_POINTS = frozenset((i, j) for i in (3, 7, 11) for j in (3, 7, 11))  # 天元和星位
+CELL_OF = {'': EMPTY, 'black': BLACK, 'white': WHITE, 0: EMPTY, 1: BLACK, -1: WHITE, None: EMPTY}
+
+
+class BoardRow:
+    """棋盘一行的只读视图：按 'black'/'white'/'' 读取，不复制底层数据"""
+
+    __slots__ = ('cells', 'offset')
+
+    def __init__(self, cells, offset):
+        self.cells = cells
+        self.offset = offset
+
+    def __getitem__(self, j):
+        if isinstance(j, slice):
+            return [NAMES[c] for c in self.cells[self.offset:self.offset + N][j]]
+        return NAMES[self.cells[self.offset + j]]
+
+    def __len__(self):
+        return N
+
+    def __iter__(self):
+        return (NAMES[c] for c in self.cells[self.offset:self.offset + N])
+
+
+class Board:
+    """
+    15x15 棋盘：每格一个字节（0 空 / 1 黑 / 2 白），board[i][j] 通过行视图读出 'black'/'white'/''，
+    可以直接交给原来接受列表棋盘的代码。落子只能通过 make/unmake，
+    各种序列化结果（快照字符串、提示词文本等）按局面缓存，落子时清空。
+    """
+
+    __slots__ = ('cells', 'rows', 'history', 'memo')
+
+    def __init__(self, cells=None):
+        self.cells = bytearray(cells) if cells is not None else bytearray(N * N)
+        self.rows = tuple(BoardRow(self.cells, i * N) for i in range(N))
+        self.history = []
+        self.memo = {}
+
+    @classmethod
+    def of(cls, board):
+        """Board 原样返回；'black'/'white'/'' 或 1/-1/0 的二维列表转换为 Board"""
+        if isinstance(board, cls):
+            return board
+        return cls(CELL_OF[cell] for row in board for cell in row)
+
+    @classmethod
+    def fromCompact(cls, text):
+        return cls(CODES.index(c) for c in text)
+
+    def __getitem__(self, i):
+        return self.rows[i]
+
+    def __len__(self):
+        return N
+
+    def __iter__(self):
+        return iter(self.rows)
+
+    def copy(self):
+        return Board(self.cells)
+
+    def get(self, i, j):
+        return NAMES[self.cells[i * N + j]]
+
+    def state(self, i, j):
+        return STATES[self.cells[i * N + j]]
+
+    def isEmpty(self, i, j):
+        return self.cells[i * N + j] == EMPTY
+
+    def make(self, i, j, color):
+        """在空位 (i, j) 落子，color 为 'black'/'white' 或 1/-1"""
+        p = i * N + j
+        if self.cells[p] != EMPTY:
+            raise ValueError(f"position ({i}, {j}) is already occupied")
+        self.cells[p] = CELL_OF[color]
+        self.history.append(p)
+        self.memo = {}
+
+    def unmake(self):
+        """撤销最近一次 make，返回被撤销的 (i, j)"""
+        p = self.history.pop()
+        self.cells[p] = EMPTY
+        self.memo = {}
+        return divmod(p, N)
+
+    def stoneCount(self):
+        return N * N - self.cells.count(EMPTY)
+
+    def cached(self, key, compute):
+        """当前局面下 key 对应的结果只计算一次，下一次落子后失效"""
+        memo = self.memo
+        if key not in memo:
+            memo[key] = compute()
+        return memo[key]
+
+    def key(self):
+        """可哈希的局面键（225 字节）"""
+        return self.cached('key', lambda: bytes(self.cells))
+
+    def compact(self):
+        """225 个字符的快照编码：'.' 空，'b' 黑，'w' 白"""
+        return self.cached('compact', lambda: ''.join(CODES[c] for c in self.cells))
+
+    def intRows(self):
+        """0 空 / 1 黑 / 2 白 的二维列表（LLM 提示词中的棋盘矩阵）"""
+        return self.cached('intRows', lambda: [list(self.cells[i * N:(i + 1) * N]) for i in range(N)])
+
+    def emptyCells(self):
+        """按行列顺序排列的全部空位 [(i, j), ...]"""
+        return self.cached('emptyCells', lambda: [divmod(p, N) for p, c in enumerate(self.cells) if c == EMPTY])
+
+    def text(self, stars=False):
+        """LLM 提示词和日志使用的文本棋盘：B 黑，W 白，空位为 '.'（stars 时天元和星位为 '*'）"""
+        def render():
+            lines = ["   " + " ".join(f"{i:2d}" for i in range(N))]
+            for i in range(N):
+                marks = [' *' if stars and (i, j) in STAR_POINTS else ' .' for j in range(N)]
+                for j in range(N):
+                    c = self.cells[i * N + j]
+                    if c != EMPTY:
+                        marks[j] = ' B' if c == BLACK else ' W'
+                lines.append(f"{i:2d} " + "".join(marks))
+            return "\n".join(lines) + "\n"
+        return self.cached(('text', stars), render)
+
+    def toList(self):
+        """'black'/'white'/'' 的二维列表（新建，可修改）"""
+        return [list(row) for row in self.rows]
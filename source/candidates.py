@@ -0,0 +1,60 @@
+import heapq
+
+_MISSING = object()
+
+
+class CandidateMoves(dict):
+    """
+    候选落子点 (i, j) -> 排序分值。
+    所有修改都通过 add / discard 记录到日志中，搜索时用 mark / undo 撤销子节点的修改，
+    因此 alphaBetaPruning 不再需要在每个节点复制整个字典。
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.journal = []
+
+    def add(self, pos, delta):
+        old = self.get(pos, _MISSING)
+        self.journal.append((pos, old))
+        self[pos] = delta if old is _MISSING else old + delta
+
+    def discard(self, pos):
+        if pos in self:
+            self.journal.append((pos, self[pos]))
+            del self[pos]
+
+    def mark(self):
+        return len(self.journal)
+
+    def undo(self, mark):
+        journal = self.journal
+        while len(journal) > mark:
+            pos, old = journal.pop()
+            if old is _MISSING:
+                del self[pos]
+            else:
+                self[pos] = old
+
+    def commit(self):
+        # changes made so far become permanent and can no longer be undone
+        self.journal = []
+
+    def copy(self):
+        return CandidateMoves(self)
+
+    def ordered(self, first=None):
+        """
+        按分值从高到低产生候选点（分值相同时按坐标），first 若仍是候选点则最先产生。
+        只建堆不全排序：发生剪枝时后面的候选点不会被排序。
+        """
+        heap = [(-score, pos) for pos, score in self.items() if pos != first]
+        heapq.heapify(heap)
+        if first is not None and first in self:
+            yield first
+        while heap:
+            yield heapq.heappop(heap)[1]
+
+    def best(self, first=None):
+        """分值最高的候选点（first 若仍是候选点则为 first），没有候选点时返回 None"""
+        return next(self.ordered(first), None)
@@ -7,7 +7,9 @@ pygame.init()
 
 def ai_move(ai):
     start_time = time.time()
-    ai.alphaBetaPruning(ai.depth, ai.boardValue, ai.nextBound, -math.inf, math.inf, True)
+    if ai.forcedMove() is None:
+        ai.TTable.newSearch()
+        ai.alphaBetaPruning(ai.depth, ai.boardValue, ai.nextBound, -math.inf, math.inf, True)
     end_time = time.time()
     print('Finished ab prune in: ', end_time - start_time)
     
@@ -0,0 +1,118 @@
+N = 15  # board size 15x15
+
+DIRECTIONS = ((0, 1), (1, 0), (1, 1), (1, -1))  # 水平、垂直、主对角线、副对角线
+STEPS = tuple(dx * N + dy for dx, dy in DIRECTIONS)  # flat index offset of one step along each direction
+
+# accepts both board encodings used in the project: 'black'/'white' strings and 1/-1 states
+COLOR_INDEX = {'black': 0, 'white': 1, 1: 0, -1: 1}
+
+
+def _build_neighbours():
+    # PREV[d][p] / NEXT[d][p]: flat index of the cell one step before / after p along direction d, -1 off the board
+    prev = [[-1] * (N * N) for _ in DIRECTIONS]
+    nxt = [[-1] * (N * N) for _ in DIRECTIONS]
+    for d, (dx, dy) in enumerate(DIRECTIONS):
+        for i in range(N):
+            for j in range(N):
+                if 0 <= i - dx < N and 0 <= j - dy < N:
+                    prev[d][i * N + j] = (i - dx) * N + j - dy
+                if 0 <= i + dx < N and 0 <= j + dy < N:
+                    nxt[d][i * N + j] = (i + dx) * N + j + dy
+    return tuple(map(tuple, prev)), tuple(map(tuple, nxt))
+
+
+PREV, NEXT = _build_neighbours()
+
+
+class LineRuns:
+    """
+    增量维护的连子长度表：runs[c][d][p] 为颜色 c 在方向 d 上经过格子 p 的连子长度，
+    只在每段连子的两个端点上保证正确（落子时只会读取与空位相邻的格子，它们必然是端点）。
+    落子时合并左右两段连子并更新新连子的两个端点，每个方向 O(1)，同时得出是否形成五连；
+    undo 按后进先出撤销落子，供搜索使用。
+    """
+
+    __slots__ = ('cells', 'runs', 'history')
+
+    def __init__(self, board=None):
+        self.cells = bytearray(N * N)  # 0 empty, 1 black (state 1), 2 white (state -1)
+        self.runs = [[[0] * (N * N) for _ in DIRECTIONS] for _ in range(2)]
+        self.history = []
+        if board is not None:
+            for i in range(N):
+                for j in range(N):
+                    if board[i][j] in COLOR_INDEX:
+                        self.place(i, j, board[i][j])
+            self.history = []
+
+    def get(self, i, j):
+        return self.cells[i * N + j]
+
+    def lengthIfPlaced(self, i, j, color, d):
+        """空位 (i, j) 落 color 后沿方向 d 的连子数（包括 (i, j) 本身）"""
+        own = COLOR_INDEX[color] + 1
+        run = self.runs[own - 1][d]
+        cells = self.cells
+        p = i * N + j
+        before, after = PREV[d][p], NEXT[d][p]
+        left = run[before] if before >= 0 and cells[before] == own else 0
+        right = run[after] if after >= 0 and cells[after] == own else 0
+        return left + 1 + right
+
+    def longestIfPlaced(self, i, j, color):
+        """空位 (i, j) 落 color 后四个方向中最长的连子数"""
+        return max(self.lengthIfPlaced(i, j, color, d) for d in range(len(DIRECTIONS)))
+
+    def place(self, i, j, color):
+        """在空位 (i, j) 落 color，返回是否形成五连（或更长）"""
+        c = COLOR_INDEX[color]
+        own = c + 1
+        cells = self.cells
+        p = i * N + j
+        cells[p] = own
+        saved = []
+        five = False
+        for d in range(len(DIRECTIONS)):
+            run = self.runs[c][d]
+            before, after = PREV[d][p], NEXT[d][p]
+            left = run[before] if before >= 0 and cells[before] == own else 0
+            right = run[after] if after >= 0 and cells[after] == own else 0
+            total = left + 1 + right
+            start, end = p - left * STEPS[d], p + right * STEPS[d]
+            saved.append((run, start, run[start], end, run[end]))
+            run[start] = run[end] = total
+            if total >= 5:
+                five = True
+        self.history.append((p, saved))
+        return five
+
+    def undo(self):
+        """撤销最近一次 place"""
+        p, saved = self.history.pop()
+        # restore in reverse so that start == end keeps its original value
+        for run, start, start_value, end, end_value in reversed(saved):
+            run[end] = end_value
+            run[start] = start_value
+        self.cells[p] = 0
+
+    def remove(self, i, j):
+        """按任意顺序移除 (i, j) 的棋子：重新计算被断开的两段连子的端点，之前的撤销记录随之作废"""
+        self.history = []
+        p = i * N + j
+        own = self.cells[p]
+        if not own:
+            return
+        self.cells[p] = 0
+        cells = self.cells
+        for d in range(len(DIRECTIONS)):
+            run = self.runs[own - 1][d]
+            for neighbours in (PREV[d], NEXT[d]):
+                # the piece of the old run on this side of p becomes a run of its own
+                end, length = neighbours[p], 0
+                while end >= 0 and cells[end] == own:
+                    length += 1
+                    if neighbours[end] < 0 or cells[neighbours[end]] != own:
+                        break
+                    end = neighbours[end]
+                if length:
+                    run[neighbours[p]] = run[end] = length
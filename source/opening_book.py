@@ -0,0 +1,220 @@
+import json
+import logging
+import os
+import random
+import struct
+
+from source.symmetry import MAPS, INVERSE, N, canonical_hash
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b'GMKB'
+VERSION = 1
+# magic, version, maxPlies, number of records
+HEADER = struct.Struct('<4sHHI')
+# canonical position hash, canonical move (i * 15 + j), weight
+RECORD = struct.Struct('<QBH')
+MAX_WEIGHT = 0xFFFF
+
+# 内置的开局：黑方天元，白方直指 / 斜指，黑方第三手贴近两子
+SEED_LINES = [
+    [(7, 7), (6, 7), (6, 8)],
+    [(7, 7), (6, 8), (6, 7)],
+]
+
+
+def _stones(board, state):
+    """
+    棋盘转换为 [(i, j, 0 黑 / 1 白)]。
+    'black'/'white' 棋盘直接按颜色；1/-1 棋盘中 state 为轮到落子的一方，
+    由于黑方先手，棋子数为偶数时轮到黑方。
+    """
+    cells = [(i, j, cell) for i, row in enumerate(board) for j, cell in enumerate(row) if cell not in ('', 0, None)]
+    if state in ('black', 'white'):
+        return [(i, j, 0 if cell == 'black' else 1) for i, j, cell in cells]
+    black = state if len(cells) % 2 == 0 else -state
+    return [(i, j, 0 if cell == black else 1) for i, j, cell in cells]
+
+
+class OpeningBook():
+    """
+    开局库：规范哈希（8 种对称中的最小 Zobrist 哈希）-> {规范坐标下的着法: 权重}。
+    只在前 maxPlies 手内查询；查询时把库中的着法通过逆变换映射回当前棋盘。
+    """
+
+    def __init__(self, maxPlies=8):
+        self.maxPlies = maxPlies
+        self.entries = {}
+
+    def __len__(self):
+        return sum(len(moves) for moves in self.entries.values())
+
+    def probe(self, board, state):
+        """返回库中权重最高且仍为空位的着法 (i, j)，不在库中时返回 None"""
+        stones = _stones(board, state)
+        if len(stones) >= self.maxPlies:
+            return None
+        key, ts = canonical_hash(stones)
+        moves = self.entries.get(key)
+        if not moves:
+            return None
+        back = MAPS[INVERSE[ts[0]]]
+        for move, _ in sorted(moves.items(), key=lambda el: (-el[1], el[0])):
+            i, j = back[move // N][move % N]
+            if board[i][j] in ('', 0, None):
+                return i, j
+        return None
+
+    def add(self, stones, move, weight=1):
+        # store the move in canonical coordinates; symmetric positions keep only one of the equivalent moves
+        if len(stones) >= self.maxPlies:
+            return
+        key, ts = canonical_hash(stones)
+        canonical = min(MAPS[t][move[0]][move[1]] for t in ts)
+        moves = self.entries.setdefault(key, {})
+        index = canonical[0] * N + canonical[1]
+        moves[index] = min(moves.get(index, 0) + weight, MAX_WEIGHT)
+
+    def addGame(self, moves, winner=None):
+        """
+        加入一局棋：moves 为按顺序的 [(i, j), ...]，黑方先手。
+        winner 为 'black' / 'white' 时只记录胜方的着法，否则（和棋或未知）记录双方的着法。
+        """
+        stones = []
+        for ply, (i, j) in enumerate(moves[:self.maxPlies]):
+            color = ply % 2
+            if winner not in ('black', 'white') or winner == ('black', 'white')[color]:
+                self.add(stones, (i, j))
+            stones.append((i, j, color))
+
+    def merge(self, other):
+        for key, moves in other.entries.items():
+            merged = self.entries.setdefault(key, {})
+            for move, weight in moves.items():
+                merged[move] = min(merged.get(move, 0) + weight, MAX_WEIGHT)
+
+    def save(self, path):
+        records = [(key, move, weight) for key, moves in self.entries.items() for move, weight in moves.items()]
+        records.sort()
+        with open(path, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, VERSION, self.maxPlies, len(records)))
+            for record in records:
+                f.write(RECORD.pack(*record))
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'rb') as f:
+            data = f.read()
+        magic, version, maxPlies, count = HEADER.unpack_from(data, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f'{path} is not an opening book (version {VERSION})')
+        book = cls(maxPlies)
+        for key, move, weight in RECORD.iter_unpack(data[HEADER.size:HEADER.size + count * RECORD.size]):
+            book.entries.setdefault(key, {})[move] = weight
+        return book
+
+
+def seed_book(maxPlies=8):
+    book = OpeningBook(maxPlies)
+    for line in SEED_LINES:
+        book.addGame(line)
+    return book
+
+
+def build_from_records(records, maxPlies=8):
+    """从 game_records 表的记录构建开局库，记录的 moves 字段为 JSON 格式的 [[x, y], ...]"""
+    book = OpeningBook(maxPlies)
+    for record in records:
+        if not record.moves:
+            continue
+        book.addGame([tuple(move) for move in json.loads(record.moves)], record.winner)
+    return book
+
+
+def _play(ai, i, j, state):
+    ai.boardValue = ai.evaluate(i, j, ai.boardValue, state, ai.nextBound)
+    ai.setState(i, j, state)
+    ai.updateBound(i, j, ai.nextBound)
+
+
+def build_from_selfplay(games=16, maxPlies=8, depth=2, maxMoves=80, seed=0):
+    """
+    GomokuAI 自我对弈构建开局库：前两手在中心附近随机落子以产生不同的对局，
+    之后双方各用一个 depth 层的 GomokuAI 下完整盘棋，按胜负记录着法。
+    """
+    from source.AI import GomokuAI
+
+    rng = random.Random(seed)
+    book = seed_book(maxPlies)
+    for _ in range(games):
+        # players[0] plays black, players[1] white; each engine sees its own stones as 1
+        players = [GomokuAI(depth=depth, useBook=False), GomokuAI(depth=depth, useBook=False)]
+        moves = [(7, 7)]
+        while len(moves) < 2:
+            move = (7 + rng.randint(-1, 1), 7 + rng.randint(-1, 1))
+            if move not in moves:
+                moves.append(move)
+        for ply, (i, j) in enumerate(moves):
+            _play(players[ply % 2], i, j, 1)
+            _play(players[1 - ply % 2], i, j, -1)
+        winner = None
+        while len(moves) < maxMoves:
+            ply = len(moves)
+            mover, other = players[ply % 2], players[1 - ply % 2]
+            mover.turn = other.turn = ply
+            move = mover.get_action()
+            if move is None:
+                break
+            i, j = move
+            mover.setState(i, j, 1)
+            _play(other, i, j, -1)
+            moves.append((i, j))
+            if mover.bitboard.isFive(i, j, 1):
+                winner = ('black', 'white')[ply % 2]
+                break
+        for ai in players:
+            ai.close()
+        book.addGame(moves, winner)
+    return book
+
+
+_default = None
+
+
+def default_book():
+    """环境变量 OPENING_BOOK_PATH 指定的开局库文件，未设置或读取失败时使用内置开局"""
+    global _default
+    if _default is None:
+        path = os.getenv('OPENING_BOOK_PATH')
+        if path and os.path.exists(path):
+            try:
+                _default = OpeningBook.load(path)
+            except (OSError, ValueError, struct.error) as e:
+                logger.warning("加载开局库失败: %s，使用内置开局", e)
+        if _default is None:
+            _default = seed_book()
+    return _default
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='构建开局库文件')
+    parser.add_argument('output')
+    parser.add_argument('--selfplay', type=int, default=0, help='自我对弈局数')
+    parser.add_argument('--records', action='store_true', help='从 game_records 表读取对局')
+    parser.add_argument('--plies', type=int, default=8)
+    parser.add_argument('--depth', type=int, default=2)
+    args = parser.parse_args()
+
+    book = seed_book(args.plies)
+    if args.selfplay:
+        book = build_from_selfplay(args.selfplay, args.plies, args.depth)
+    if args.records:
+        from app import create_app
+        from dao.game_record_dao import GameRecordDAO
+
+        with create_app().app_context():
+            book.merge(build_from_records(GameRecordDAO().get_records_with_moves(), args.plies))
+    book.save(args.output)
+    print(f"开局库已保存到 {args.output}，共 {len(book)} 条着法")
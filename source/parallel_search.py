@@ -0,0 +1,240 @@
+import math
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from source.candidates import CandidateMoves
+from source.transposition import EXACT
+
+
+def searchRootMoves(ai, moves, depth, alpha, beta=math.inf):
+    """
+    在 ai 当前局面上按顺序搜索给定的根节点着法 [(序号, (i, j)), ...]（AI 方执 1 落子）。
+    返回 (value, 序号, (i, j), 该着法之后的候选点)，value 只有在大于传入的 alpha 时才是精确值。
+    """
+    bound = ai.nextBound
+    bound.commit()
+    best = (-math.inf, None, None, None)
+    for index, (i, j) in moves:
+        mark = bound.mark()
+        new_val = ai.evaluate(i, j, ai.boardValue, 1, bound)
+        ai.bitboard.place(i, j, 1)
+        ai.rollingHash ^= ai.zobristTable[i][j][0]
+        ai.updateBound(i, j, bound)
+        try:
+            if ai.bitboard.isFive(i, j, 1):
+                value = new_val
+            else:
+                value = ai.alphaBetaPruning(depth - 1, new_val, bound, alpha, beta, False, 1)
+            if value > best[0]:
+                best = (value, index, (i, j), dict(bound))
+        finally:
+            bound.undo(mark)
+            ai.bitboard.remove(i, j, 1)
+            ai.rollingHash ^= ai.zobristTable[i][j][0]
+        alpha = max(alpha, value)
+        if beta <= alpha:
+            break
+    return best
+
+
+def _snapshot(ai):
+    # everything a worker process needs to rebuild the root position
+    return {
+        'depth': ai.depth,
+        'ttSize': len(ai.TTable.slots),
+        'boardMap': [row[:] for row in ai.boardMap],
+        'boardValue': ai.boardValue,
+        'bound': dict(ai.nextBound),
+        'zobristTable': ai.zobristTable,
+        'currentI': ai.currentI,
+        'currentJ': ai.currentJ,
+        'lastPlayed': ai.lastPlayed,
+        'turn': ai.turn,
+        'emptyCells': ai.emptyCells,
+    }
+
+
+def _restore(state):
+    from source.AI import GomokuAI, N
+
+    ai = GomokuAI(depth=state['depth'], ttSize=state['ttSize'])
+    ai.zobristTable = state['zobristTable']
+    for i in range(N):
+        for j in range(N):
+            if state['boardMap'][i][j] != 0:
+                ai.setState(i, j, state['boardMap'][i][j])
+    ai.boardValue = state['boardValue']
+    ai.nextBound = CandidateMoves(state['bound'])
+    ai.currentI, ai.currentJ = state['currentI'], state['currentJ']
+    ai.lastPlayed = state['lastPlayed']
+    ai.turn = state['turn']
+    ai.emptyCells = state['emptyCells']
+    return ai
+
+
+# worker process: the engine kept warm across chunks, iterative-deepening depths and moves of one game
+_worker = None
+
+
+def _warmEngine(state):
+    """worker 进程中与快照同步的引擎：只补上变化的棋子，置换表在各轮、各步之间保留"""
+    global _worker
+    ai = _worker
+    if ai is None or ai.depth != state['depth'] or ai.zobristTable != state['zobristTable']:
+        ai = _worker = _restore(state)
+        ai.TTable.newSearch()
+        return ai
+    root = ai.rollingHash
+    for i, row in enumerate(state['boardMap']):
+        for j, cell in enumerate(row):
+            if ai.boardMap[i][j] != cell:
+                ai.setState(i, j, cell)
+    ai.boardValue = state['boardValue']
+    ai.nextBound = CandidateMoves(state['bound'])
+    ai.currentI, ai.currentJ = state['currentI'], state['currentJ']
+    ai.lastPlayed = state['lastPlayed']
+    ai.turn = state['turn']
+    ai.emptyCells = state['emptyCells']
+    if ai.rollingHash != root:
+        # a new root position: older entries stay usable for ordering but may be replaced
+        ai.TTable.newSearch()
+    return ai
+
+
+def _searchChunk(state, moves, depth, alpha, deadline):
+    from source.AI import SearchTimeout
+
+    start = time.process_time()
+    ai = _warmEngine(state)
+    root_hash, root_lines = ai.rollingHash, ai.bitboard.snapshot()
+    ai.nodes = 0
+    ai.deadline = deadline
+    try:
+        best = searchRootMoves(ai, moves, depth, alpha)
+    except SearchTimeout:
+        # the interrupted line left stones on the bitboard; the transposition table stays valid
+        ai.bitboard.restore(root_lines)
+        ai.rollingHash = root_hash
+        best = None
+    finally:
+        ai.deadline = None
+    return best, ai.nodes, time.process_time() - start
+
+
+class ParallelSearch():
+    """
+    根节点并行搜索（Young Brothers Wait）：先在本进程串行搜索排序第一的着法得到 alpha，
+    再把其余根着法交错分配给各个 worker 进程，以该 alpha 为下界并行搜索。
+    合并时取最大值，分值相同取排序靠前的着法，因此与同深度的串行搜索选出相同的着法。
+    每个 worker 是一个单进程的 ProcessPoolExecutor，第 k 份着法总是交给第 k 个 worker：
+    worker 中的引擎和置换表在迭代加深的各轮、对局的各步之间保留，上一轮的结果为下一轮排序着法。
+    """
+
+    def __init__(self, workers):
+        self.workers = workers
+        self.executors = []
+        self.lastStats = {}
+
+    def _pool(self):
+        if not self.executors:
+            self.executors = [ProcessPoolExecutor(max_workers=1) for _ in range(self.workers)]
+        return self.executors
+
+    def search(self, ai, depth):
+        from source.AI import SearchTimeout
+
+        wall_start = time.time()
+        cpu_start = time.process_time()
+        bound = ai.nextBound
+        bound.commit()
+        entry = ai.TTable.probe(ai.rollingHash)
+        moves = list(enumerate(ai.childNodes(bound, entry.move if entry else None, True)))
+
+        nodes_start = ai.nodes
+        best = searchRootMoves(ai, moves[:1], depth, -math.inf)
+        cpu = time.process_time() - cpu_start
+
+        rest = moves[1:]
+        if rest:
+            state = _snapshot(ai)
+            futures = [executor.submit(_searchChunk, state, rest[k::self.workers], depth, best[0], ai.deadline)
+                       for k, executor in enumerate(self._pool()) if rest[k::self.workers]]
+            results = [future.result() for future in futures]
+            for result, worker_nodes, worker_cpu in results:
+                ai.nodes += worker_nodes
+                cpu += worker_cpu
+                if result is None:
+                    raise SearchTimeout()
+                if result[0] > best[0] or (result[0] == best[0] and result[1] < best[1]):
+                    best = result
+
+        value, _, (i, j), next_bound = best
+        ai.currentI, ai.currentJ = i, j
+        ai.boardValue = value
+        ai.nextBound = CandidateMoves(next_bound)
+        ai.TTable.store(ai.rollingHash, depth, value, EXACT, (i, j))
+
+        wall = time.time() - wall_start
+        self.lastStats = {
+            'workers': self.workers,
+            'depth': depth,
+            'nodes': ai.nodes - nodes_start,
+            'wall': wall,
+            'cpu': cpu,
+            # total search CPU over wall time: how many cores the search kept busy on average;
+            # the speedup over a serial search is measured by measureSpeedup
+            'utilization': cpu / wall if wall > 0 else 1.0,
+        }
+        return value
+
+    def close(self):
+        for executor in self.executors:
+            executor.shutdown(cancel_futures=True)
+        self.executors = []
+
+
+def measureSpeedup(ai, depth, workers):
+    """
+    从 ai 的当前局面分别串行和用 workers 个进程迭代加深到 depth 层（不限时间），返回两者的墙钟时间、节点数、
+    选出的着法和加速比 serial / parallel。worker 进程在计时前启动，进程创建的开销不计入。
+    """
+    state = _snapshot(ai)
+    stats = {'depth': depth, 'workers': workers}
+    for name, count in (('serial', 1), ('parallel', workers)):
+        engine = _restore(state)
+        engine.TTable.newSearch()
+        engine.workers = count
+        if count > 1:
+            engine.parallel = ParallelSearch(count)
+            for executor in engine.parallel._pool():
+                executor.submit(int).result()
+        start = time.time()
+        engine.iterativeDeepening(float('inf'), depth)
+        wall = time.time() - start
+        stats[name] = {'wall': wall, 'nodes': engine.nodes, 'move': (engine.currentI, engine.currentJ)}
+        engine.close()
+    stats['speedup'] = stats['serial']['wall'] / stats['parallel']['wall']
+    return stats
+
+
+if __name__ == '__main__':
+    import argparse
+    from source.AI import GomokuAI
+
+    parser = argparse.ArgumentParser(description='测量根节点并行搜索相对串行搜索的加速比')
+    parser.add_argument('--depth', type=int, default=5)
+    parser.add_argument('--workers', type=int, default=4)
+    args = parser.parse_args()
+
+    ai = GomokuAI(depth=args.depth, threatMs=None, useBook=False)
+    state = 1
+    for i, j in [(7, 7), (7, 8), (8, 8), (6, 6), (8, 6), (8, 7), (9, 7), (6, 9)]:
+        ai.boardValue = ai.evaluate(i, j, ai.boardValue, state, ai.nextBound)
+        ai.setState(i, j, state)
+        ai.updateBound(i, j, ai.nextBound)
+        state = -state
+    ai.turn = 8
+    stats = measureSpeedup(ai, args.depth, args.workers)
+    print(f"深度 {args.depth}: 串行 {stats['serial']['wall']:.2f}s / {stats['serial']['nodes']} 节点，"
+          f"{args.workers} 进程 {stats['parallel']['wall']:.2f}s / {stats['parallel']['nodes']} 节点，"
+          f"加速比 {stats['speedup']:.2f}，着法 {stats['serial']['move']} / {stats['parallel']['move']}")
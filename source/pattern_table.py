@@ -0,0 +1,75 @@
+from source.bitboard import compilePattern
+
+# Every pattern is at most 7 cells long, so the patterns covering a cell all lie
+# inside the 13-cell window centred on it (6 cells either side).
+REACH = 6
+WIDTH = 2 * REACH + 1
+CENTER = 1 << REACH
+WINDOW_MASK = (1 << WIDTH) - 1
+
+
+class PatternTable():
+    """
+    棋型查找表：把落子点所在线段的编码窗口（黑/白/棋盘内 三个 13 位掩码）映射到
+    覆盖中心点的所有棋型得分之和，以及这些棋型涉及的空位（相对窗口的偏移和权重）。
+    窗口第一次出现时由棋型字典计算并缓存，之后每个方向的估值只是一次字典查询。
+    """
+
+    def __init__(self, pattern_dict, max_entries=1 << 18):
+        self.patterns = []
+        for pattern, score in pattern_dict.items():
+            length, black, white = compilePattern(pattern)
+            empties = tuple(k for k, v in enumerate(pattern) if v == 0)
+            self.patterns.append((length, black, white, score, abs(score), empties))
+        self.max_entries = max_entries
+        self.table = {}
+
+    def _compute(self, black, white, valid):
+        total = 0
+        weights = {}
+        for length, black_p, white_p, score, weight, empties in self.patterns:
+            window = (1 << length) - 1
+            for s in range(REACH + 1 - length, REACH + 1):
+                if (valid >> s) & window != window:
+                    continue
+                if (black >> s) & window == black_p and (white >> s) & window == white_p:
+                    total += score
+                    for k in empties:
+                        weights[s + k] = weights.get(s + k, 0) + weight
+        return total, tuple(weights.items())
+
+    def entry(self, black, white, valid):
+        key = black | (white << WIDTH) | (valid << (2 * WIDTH))
+        entry = self.table.get(key)
+        if entry is None:
+            if len(self.table) >= self.max_entries:
+                self.table.clear()
+            entry = self.table[key] = self._compute(black, white, valid)
+        return entry
+
+    def lookup(self, black, white, pos, length, state):
+        """
+        返回落子前后两个窗口的表项 (before, after)。
+        black/white 为整条线的掩码，pos 为落子点在线上的位置，state 为落子颜色。
+        """
+        black_w = ((black << REACH) >> pos) & WINDOW_MASK
+        white_w = ((white << REACH) >> pos) & WINDOW_MASK
+        valid = ((((1 << length) - 1) << REACH) >> pos) & WINDOW_MASK
+        before = self.entry(black_w, white_w, valid)
+        if state == 1:
+            after = self.entry(black_w | CENTER, white_w, valid)
+        else:
+            after = self.entry(black_w, white_w | CENTER, valid)
+        return before, after
+
+
+_shared_tables = {}
+
+
+def shared_table(pattern_dict):
+    # one table per distinct pattern dictionary, shared by every GomokuAI instance
+    key = frozenset(pattern_dict.items())
+    table = _shared_tables.get(key)
+    if table is None:
+        table = _shared_tables[key] = PatternTable(pattern_dict)
+    return table
@@ -0,0 +1,49 @@
+import source.utils as utils
+
+N = 15
+
+# the 8 symmetries of the square board: identity, 3 rotations, 4 reflections
+TRANSFORMS = (
+    lambda i, j: (i, j),
+    lambda i, j: (j, N - 1 - i),
+    lambda i, j: (N - 1 - i, N - 1 - j),
+    lambda i, j: (N - 1 - j, i),
+    lambda i, j: (i, N - 1 - j),
+    lambda i, j: (j, i),
+    lambda i, j: (N - 1 - i, j),
+    lambda i, j: (N - 1 - j, N - 1 - i),
+)
+INVERSE = (0, 3, 2, 1, 4, 5, 6, 7)
+# MAPS[t][i][j] -> (i, j) after transform t
+MAPS = [[[t(i, j) for j in range(N)] for i in range(N)] for t in TRANSFORMS]
+
+ZOBRIST_SEED = 20240601
+# fixed keys so that hashes stay valid across processes and in saved files
+ZOBRIST = utils.init_zobrist(seed=ZOBRIST_SEED)
+
+
+def transform(t, i, j):
+    return MAPS[t][i][j]
+
+
+def inverse(t, i, j):
+    return MAPS[INVERSE[t]][i][j]
+
+
+def canonical_hash(stones, zobrist=ZOBRIST):
+    """
+    stones 为 [(i, j, 颜色序号 0 黑 / 1 白)]，返回 (规范哈希, 达到该哈希的变换列表)。
+    规范哈希取 8 种对称变换下 Zobrist 哈希的最小值，对称的局面得到同一个键。
+    """
+    best, ts = None, []
+    for t in range(8):
+        m = MAPS[t]
+        h = 0
+        for i, j, c in stones:
+            ti, tj = m[i][j]
+            h ^= zobrist[ti][tj][c]
+        if best is None or h < best:
+            best, ts = h, [t]
+        elif h == best:
+            ts.append(t)
+    return best, ts
@@ -0,0 +1,299 @@
+import time
+from collections import namedtuple
+from functools import lru_cache
+
+from source.bitboard import AXES, LINE_CELLS, LINE_OF, BitBoard, color_index
+
+# kind: 'win' 直接成五, 'block' 封堵对方成五点, 'vcf' / 'vct' 己方连续冲四 / 连续活三冲四取胜,
+#       'defend_vcf' 化解对方的 VCF, 'defend_three' 封堵对方活三
+#       'unknown' 节点数/时间/深度用完，没有找到强制着法但也不能断定不存在（move 为 None）
+# defences: 'defend_vcf' / 'defend_three' 时所有可行的防守点（move 是其中首选的一个），由调用方的搜索从中选择
+ThreatResult = namedtuple('ThreatResult', ['move', 'kind', 'line', 'defences'], defaults=(None,))
+
+# vcf / vct 在预算用完、无法下结论时的返回值；None 只表示搜索完整且确实不存在
+UNKNOWN = 'unknown'
+
+
+def board_to_bitboard(board):
+    """把 'black'/'white'/'' 或 1/-1/0 的 15x15 棋盘转换成 BitBoard（黑为 1，白为 -1）"""
+    bb = BitBoard()
+    for i, row in enumerate(board):
+        for j, cell in enumerate(row):
+            if cell == 'black' or cell == 1:
+                bb.place(i, j, 1)
+            elif cell == 'white' or cell == -1:
+                bb.place(i, j, -1)
+    return bb
+
+
+def _bits(mask):
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+def _popcount(mask):
+    return bin(mask).count('1')
+
+
+@lru_cache(maxsize=1 << 16)
+def _line_five_points(own, opp, length):
+    # empty cells of a line that complete five for `own`
+    points = 0
+    empty = ((1 << length) - 1) & ~(own | opp)
+    for s in range(length - 4):
+        window = 0x1F << s
+        if not opp & window and _popcount(own & window) == 4:
+            points |= window & empty
+    return points
+
+
+@lru_cache(maxsize=1 << 16)
+def _line_moves(own, opp, length, stones):
+    # empty cells lying in a stone-free-of-opp 5-window that already holds `stones` own stones
+    moves = 0
+    empty = ((1 << length) - 1) & ~(own | opp)
+    for s in range(length - 4):
+        window = 0x1F << s
+        if not opp & window and _popcount(own & window) == stones:
+            moves |= window & empty
+    return moves
+
+
+class ThreatSearch():
+    """
+    威胁空间搜索：只展开冲四（VCF）和活三/冲四（VCT）着法，在很小的节点数内找出
+    必胜的连续攻击或必须的防守点。所有局面操作都在 BitBoard 上就地进行并撤销。
+    """
+
+    def __init__(self, bitboard, timeMs=50, maxNodes=20000):
+        self.bb = bitboard
+        self.deadline = time.time() + timeMs / 1000.0
+        self.maxNodes = maxNodes
+        self.nodes = 0
+
+    def _exhausted(self):
+        self.nodes += 1
+        return self.nodes > self.maxNodes or time.time() > self.deadline
+
+    def _cells(self, axis, index, mask):
+        cells = LINE_CELLS[axis][index]
+        return [cells[pos] for pos in _bits(mask)]
+
+    def fivePoints(self, state):
+        """state 一方所有的成五点"""
+        c = color_index(state)
+        lines = self.bb.lines
+        points = set()
+        for axis in AXES:
+            own_lines, opp_lines = lines[axis][c], lines[axis][1 - c]
+            for index, own in enumerate(own_lines):
+                if not own:
+                    continue
+                mask = _line_five_points(own, opp_lines[index], len(LINE_CELLS[axis][index]))
+                if mask:
+                    points.update(self._cells(axis, index, mask))
+        return points
+
+    def fivePointsAfter(self, i, j, state):
+        """在 (i, j) 落 state 后，经过 (i, j) 的四条线上的成五点"""
+        c = color_index(state)
+        lines = self.bb.lines
+        points = set()
+        for axis in AXES:
+            index, pos, length = LINE_OF[axis][i][j]
+            own = lines[axis][c][index] | (1 << pos)
+            mask = _line_five_points(own, lines[axis][1 - c][index], length)
+            if mask:
+                points.update(self._cells(axis, index, mask))
+        return points
+
+    def candidateMoves(self, state, stones):
+        """所在的某个无对方棋子的五格窗口中已有 stones 个己方棋子的空位"""
+        c = color_index(state)
+        lines = self.bb.lines
+        moves = set()
+        for axis in AXES:
+            own_lines, opp_lines = lines[axis][c], lines[axis][1 - c]
+            for index, own in enumerate(own_lines):
+                if not own:
+                    continue
+                mask = _line_moves(own, opp_lines[index], len(LINE_CELLS[axis][index]), stones)
+                if mask:
+                    moves.update(self._cells(axis, index, mask))
+        return moves
+
+    def fourMoves(self, state):
+        # every move that creates at least one five point
+        return sorted(self.candidateMoves(state, 3))
+
+    def openFourPoints(self, state):
+        """落子后形成活四（或双冲四）的空位，即对方的活三需要封堵的点"""
+        result = []
+        for i, j in sorted(self.candidateMoves(state, 3)):
+            if len(self.fivePointsAfter(i, j, state)) >= 2:
+                result.append((i, j))
+        return result
+
+    def threeMoves(self, state):
+        # moves after which the side can make an open four (live three) without an immediate five
+        result = []
+        for i, j in sorted(self.candidateMoves(state, 2)):
+            if time.time() > self.deadline:
+                break
+            self.bb.place(i, j, state)
+            if self.openFourPoints(state):
+                result.append((i, j))
+            self.bb.remove(i, j, state)
+        return result
+
+    def vcf(self, state, depth=12):
+        """连续冲四取胜：返回着法序列（攻方和守方交替），确定不存在时返回 None，预算用完时返回 UNKNOWN"""
+        own_fives = self.fivePoints(state)
+        if own_fives:
+            return [min(own_fives)]
+        if self.fivePoints(-state):
+            return None
+        if depth <= 0 or self._exhausted():
+            return UNKNOWN
+        unknown = False
+        for i, j in self.fourMoves(state):
+            points = self.fivePointsAfter(i, j, state)
+            if not points:
+                continue
+            if len(points) >= 2:
+                return [(i, j)]
+            block = points.pop()
+            self.bb.place(i, j, state)
+            self.bb.place(block[0], block[1], -state)
+            line = None
+            if not self.bb.isFive(block[0], block[1], -state):
+                line = self.vcf(state, depth - 1)
+            self.bb.remove(block[0], block[1], -state)
+            self.bb.remove(i, j, state)
+            if line is UNKNOWN:
+                unknown = True
+            elif line is not None:
+                return [(i, j), block] + line
+        return UNKNOWN if unknown else None
+
+    def defences(self, state, i, j):
+        # replies to an attacking three at (i, j): the cells that stop every open four, plus counter fours
+        self.bb.place(i, j, state)
+        replies = set()
+        for point in self.openFourPoints(state):
+            replies.add(point)
+            replies.update(self.fivePointsAfter(point[0], point[1], state))
+        replies.update(self.fourMoves(-state))
+        self.bb.remove(i, j, state)
+        return sorted(replies)
+
+    def vct(self, state, depth=6):
+        """
+        连续活三/冲四取胜：守方的每一种应对（封堵点和反冲四）之后攻方都仍能取胜。
+        与 vcf 相同，确定不存在时返回 None，预算用完时返回 UNKNOWN；
+        只有完整搜索证明无法取胜的应对才算化解，结果未知的应对既不算化解也不算取胜。
+        """
+        line = self.vcf(state)
+        if line is not None and line is not UNKNOWN:
+            return line
+        unknown = line is UNKNOWN
+        if self.fivePoints(-state):
+            return UNKNOWN if unknown else None
+        if depth <= 0 or self._exhausted():
+            return UNKNOWN
+        threes = self.threeMoves(state)
+        if time.time() > self.deadline:
+            # threeMoves 在超时时提前结束，列出的活三不完整
+            unknown = True
+        for i, j in threes:
+            replies = self.defences(state, i, j)
+            self.bb.place(i, j, state)
+            result = 'win'
+            for ri, rj in replies:
+                if self.bb.get(ri, rj) != 0:
+                    continue
+                self.bb.place(ri, rj, -state)
+                if self.bb.isFive(ri, rj, -state):
+                    result = None
+                else:
+                    line = self.vct(state, depth - 1)
+                    if line is None:
+                        result = None
+                    elif line is UNKNOWN:
+                        result = UNKNOWN
+                self.bb.remove(ri, rj, -state)
+                if result is None:
+                    break
+            self.bb.remove(i, j, state)
+            if result == 'win':
+                return [(i, j)]
+            if result is UNKNOWN:
+                unknown = True
+        return UNKNOWN if unknown else None
+
+
+def find_forced_move(board, state, timeMs=50, vctDepth=4):
+    """
+    战术预处理：在完整搜索或 LLM 调用之前找出必须走的棋。
+    board 可以是 BitBoard，也可以是 'black'/'white'/'' 或 1/-1/0 的二维列表；
+    state 为己方颜色（1/-1 或 'black'/'white'）。确定没有强制着法时返回 None；
+    没有找到强制着法但搜索预算用完、无法断定时返回 kind 为 'unknown'、move 为 None 的 ThreatResult。
+    """
+    if state == 'black':
+        state = 1
+    elif state == 'white':
+        state = -1
+    bb = board if isinstance(board, BitBoard) else board_to_bitboard(board)
+    search = ThreatSearch(bb, timeMs=timeMs)
+
+    own_fives = search.fivePoints(state)
+    if own_fives:
+        return ThreatResult(min(own_fives), 'win', None)
+    opp_fives = search.fivePoints(-state)
+    if opp_fives:
+        return ThreatResult(min(opp_fives), 'block', None)
+
+    unknown = False
+    line = search.vcf(state)
+    if line is UNKNOWN:
+        unknown = True
+    elif line is not None:
+        return ThreatResult(line[0], 'vcf', line)
+
+    opp_line = search.vcf(-state)
+    if opp_line is UNKNOWN:
+        unknown = True
+    elif opp_line is not None:
+        # try the attacker's first point, the points where it makes an open four, our own fours and
+        # every other point of the attack; only a point after which the opponent provably has no VCF counts as a defence
+        candidates = [opp_line[0]] + search.openFourPoints(-state) + search.fourMoves(state) + opp_line[1:]
+        defences = []
+        for i, j in candidates:
+            if bb.get(i, j) != 0 or (i, j) in defences:
+                continue
+            bb.place(i, j, state)
+            refuted = search.vcf(-state) is None
+            bb.remove(i, j, state)
+            if refuted:
+                defences.append((i, j))
+        if defences:
+            return ThreatResult(defences[0], 'defend_vcf', opp_line, defences)
+        return ThreatResult(opp_line[0], 'defend_vcf', opp_line, [opp_line[0]])
+
+    line = search.vct(state, vctDepth)
+    if line is UNKNOWN:
+        unknown = True
+    elif line is not None:
+        return ThreatResult(line[0], 'vct', line)
+
+    opp_points = search.openFourPoints(-state)
+    if opp_points:
+        # block the live three where our own stone does the most: prefer points that also make our four;
+        # our own fours answer the three as well, so they are defences too
+        own_fours = search.fourMoves(state)
+        opp_points.sort(key=lambda p: p not in own_fours)
+        defences = opp_points + [p for p in own_fours if p not in opp_points]
+        return ThreatResult(opp_points[0], 'defend_three', None, defences)
+    return ThreatResult(None, 'unknown', None) if unknown else None
@@ -0,0 +1,47 @@
+from collections import namedtuple
+
+# bound type of a stored score
+EXACT, LOWER, UPPER = 0, 1, 2
+
+TTEntry = namedtuple('TTEntry', ['key', 'depth', 'score', 'flag', 'move', 'generation'])
+
+
+class TranspositionTable():
+    """
+    固定容量的置换表：按 Zobrist 哈希的低位直接寻址，每个槽位保存一个 TTEntry。
+    替换策略为深度优先：槽位为空、属于旧的搜索代数、或新结果搜索得不浅于旧结果时才覆盖。
+    """
+
+    def __init__(self, capacity=1 << 16):
+        size = 1
+        while size < capacity:
+            size <<= 1
+        self.mask = size - 1
+        self.slots = [None] * size
+        self.generation = 0
+
+    def newSearch(self):
+        # entries of older searches stay usable but may be replaced by anything
+        self.generation += 1
+
+    def probe(self, key):
+        entry = self.slots[key & self.mask]
+        if entry is not None and entry.key == key:
+            return entry
+        return None
+
+    def store(self, key, depth, score, flag, move):
+        index = key & self.mask
+        old = self.slots[index]
+        if old is None or old.generation != self.generation or depth >= old.depth:
+            self.slots[index] = TTEntry(key, depth, score, flag, move, self.generation)
+        elif old.key == key and old.move is None:
+            # keep the deeper score but remember a move for ordering
+            self.slots[index] = old._replace(move=move)
+
+    def clear(self):
+        self.slots = [None] * len(self.slots)
+        self.generation = 0
+
+    def __len__(self):
+        return sum(1 for entry in self.slots if entry is not None)
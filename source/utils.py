@@ -121,10 +121,11 @@ def create_pattern_dict():
 
 
 ##### Zobrist Hashing #####
-def init_zobrist():
+def init_zobrist(seed=None):
+    if seed is not None:
+        # reproducible 64-bit keys, e.g. for hashes stored in the opening book file
+        rng = random.Random(seed)
+        return [[[rng.getrandbits(64) for _ in range(2)] for j in range(15)] for i in range(15)]
     zTable = [[[uuid.uuid4().int  for _ in range(2)] \
                         for j in range(15)] for i in range(15)] #changed to 32 from 64
     return zTable
-
-def update_TTable(table, hash, score, depth):
-    table[hash] = [score, depth]
@@ -0,0 +1,37 @@
+import unittest
+from source.board import Board
+
+
+class TestBoard(unittest.TestCase):
+
+    def test_views_and_encodings_agree(self):
+        rows = [['' for _ in range(15)] for _ in range(15)]
+        rows[7][7], rows[7][8], rows[0][14] = 'black', 'white', 'black'
+        board = Board.of(rows)
+        self.assertEqual(board[7][7], 'black')
+        self.assertEqual(board[7][8], 'white')
+        self.assertEqual(board.toList(), rows)
+        self.assertEqual(board.state(7, 8), -1)
+        # 1/-1 棋盘得到相同的 Board
+        states = [[{'': 0, 'black': 1, 'white': -1}[cell] for cell in row] for row in rows]
+        self.assertEqual(Board.of(states).key(), board.key())
+        self.assertEqual(Board.fromCompact(board.compact()).key(), board.key())
+        self.assertEqual(len(board.compact()), 225)
+
+    def test_make_unmake_invalidates_cached_serializations(self):
+        board = Board()
+        empty_text = board.text()
+        self.assertIs(board.text(), empty_text)
+        board.make(3, 4, 'black')
+        self.assertNotEqual(board.text(), empty_text)
+        self.assertNotIn((3, 4), board.emptyCells())
+        self.assertEqual(board.intRows()[3][4], 1)
+        with self.assertRaises(ValueError):
+            board.make(3, 4, 'white')
+        self.assertEqual(board.unmake(), (3, 4))
+        self.assertEqual(board.text(), empty_text)
+        self.assertEqual(board.stoneCount(), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
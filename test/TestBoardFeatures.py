@@ -0,0 +1,69 @@
+import random
+import unittest
+import numpy as np
+from ai.board_features import DIRECTIONS, BoardFeatures
+from ai.llama3_ai import Llama3AI
+from ai.position_analysis import PositionAnalysis
+
+
+def naive_line(board, x, y, dx, dy, color):
+    # 逐格扫描：(x, y) 落子后的连子数，以及两端是否没有同时被对手堵住
+    opponent = 'white' if color == 'black' else 'black'
+    count, blocked = 1, 0
+    for sign in (1, -1):
+        nx, ny = x + dx * sign, y + dy * sign
+        while 0 <= nx < 15 and 0 <= ny < 15 and board[nx][ny] == color:
+            count += 1
+            nx, ny = nx + dx * sign, ny + dy * sign
+        if 0 <= nx < 15 and 0 <= ny < 15 and board[nx][ny] == opponent:
+            blocked += 1
+    return count, blocked < 2
+
+
+class TestBoardFeatures(unittest.TestCase):
+
+    def test_features_match_board_scan(self):
+        rng = random.Random(11)
+        for _ in range(15):
+            board = [['' for _ in range(15)] for _ in range(15)]
+            for _ in range(rng.randint(0, 150)):
+                board[rng.randrange(15)][rng.randrange(15)] = rng.choice(('black', 'white'))
+            features = BoardFeatures(board)
+            for c, color in enumerate(('black', 'white')):
+                for d, (dx, dy) in enumerate(DIRECTIONS):
+                    for i in range(15):
+                        for j in range(15):
+                            count, alive = naive_line(board, i, j, dx, dy, color)
+                            self.assertEqual(features.count[c, d, i, j], count)
+                            self.assertEqual(features.alive[c, d, i, j], alive)
+
+    def test_analysis_kept_per_engine(self):
+        # 每个会话的引擎各自保留分析对象，交替分析两盘棋时互不影响
+        boards = [[['' for _ in range(15)] for _ in range(15)] for _ in range(2)]
+        boards[0][7][7] = 'black'
+        boards[1][0][0] = 'black'
+        engines = [Llama3AI(stream=False), Llama3AI(stream=False)]
+        analyses = [engine._get_analysis(board) for engine, board in zip(engines, boards)]
+        boards[0][7][8] = 'white'
+        for engine, board, analysis in zip(engines, boards, analyses):
+            self.assertIs(engine._get_analysis(board), analysis)
+            self.assertTrue(np.array_equal(analysis.features.count, BoardFeatures(board).count))
+
+    def test_incremental_update_matches_full(self):
+        # 逐步落子增量更新的结果必须与整盘重算一致
+        rng = random.Random(5)
+        board = [['' for _ in range(15)] for _ in range(15)]
+        analysis = PositionAnalysis(board)
+        for _ in range(60):
+            i, j = rng.randrange(15), rng.randrange(15)
+            if board[i][j] == '':
+                board[i][j] = rng.choice(('black', 'white'))
+            analysis.sync(board)
+            full = BoardFeatures(board)
+            for name in ('count', 'alive', 'near', 'attack', 'defense', 'live_three'):
+                self.assertTrue(np.array_equal(getattr(analysis.features, name), getattr(full, name)))
+        self.assertIs(analysis.line_points(0), analysis.line_points(0))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,38 @@
+import unittest
+from ai.engine_registry import EngineRegistry
+
+
+class FakeEngine:
+
+    def __init__(self):
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class TestEngineRegistry(unittest.TestCase):
+
+    def test_engines_are_per_session_and_released(self):
+        engines = EngineRegistry({'fake': FakeEngine, 'plain': object})
+        a = engines.get('a@example.com', 'fake')
+        self.assertIs(engines.get('a@example.com', 'fake'), a)
+        self.assertIsNot(engines.get('b@example.com', 'fake'), a)
+        engines.get('a@example.com', 'plain')  # 没有 close 的引擎直接丢弃
+        self.assertEqual(len(engines), 3)
+
+        self.assertEqual(engines.release('a@example.com'), 2)
+        self.assertTrue(a.closed)
+        self.assertEqual(len(engines), 1)
+        self.assertIsNot(engines.get('a@example.com', 'fake'), a)
+        self.assertEqual(engines.release('missing@example.com'), 0)
+
+    def test_unknown_model(self):
+        engines = EngineRegistry({'fake': FakeEngine})
+        self.assertNotIn('gpt', engines)
+        with self.assertRaises(KeyError):
+            engines.get('a@example.com', 'gpt')
+
+
+if __name__ == '__main__':
+    unittest.main()
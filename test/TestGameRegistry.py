@@ -0,0 +1,58 @@
+import threading
+import unittest
+from websocket.game_registry import GameRegistry
+
+
+class TestGameRegistry(unittest.TestCase):
+
+    def test_create_get_remove(self):
+        games = GameRegistry(shards=4)
+        game, created = games.create('a@example.com', {'status': 'ongoing'})
+        self.assertTrue(created)
+        # 已有对局时不覆盖
+        self.assertEqual(games.create('a@example.com', {'status': 'new'}), (game, False))
+        self.assertIs(games.get('a@example.com'), game)
+        self.assertIn('a@example.com', games)
+        self.assertIs(games.remove('a@example.com'), game)
+        self.assertIsNone(games.get('a@example.com'))
+        with games.locked('a@example.com') as missing:
+            self.assertIsNone(missing)
+
+    def test_game_removed_when_last_connection_leaves(self):
+        games = GameRegistry(shards=4)
+        game, created = games.connect('a', 'sid1', {'status': 'ongoing'})
+        self.assertTrue(created)
+        # 同一会话的第二个连接共享这一局
+        self.assertEqual(games.connect('a', 'sid2', {'status': 'new'}), (game, False))
+        self.assertIsNone(games.disconnect('a', 'sid1'))
+        self.assertIs(games.get('a'), game)
+        self.assertIs(games.disconnect('a', 'sid2'), game)
+        self.assertIsNone(games.get('a'))
+        # 登出删除对局后新建的一局不受旧连接断开的影响
+        games.connect('a', 'sid1', {})
+        games.remove('a')
+        new, _ = games.connect('a', 'sid3', {})
+        self.assertIsNone(games.disconnect('a', 'sid1'))
+        self.assertIs(games.get('a'), new)
+
+    def test_sessions_do_not_block_each_other(self):
+        games = GameRegistry()
+        games.create('a', {})
+        games.create('b', {})
+        entered = threading.Event()
+
+        def enter_b():
+            with games.locked('b') as game:
+                if game is not None:
+                    entered.set()
+
+        with games.locked('a'):
+            # 另一局的锁不受这一局影响
+            worker = threading.Thread(target=enter_b)
+            worker.start()
+            worker.join(1)
+            self.assertTrue(entered.is_set())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,223 @@
+import math
+import random
+import time
+import unittest
+from source.AI import GomokuAI, N
+from source.bitboard import AXES, LINE_CELLS, compilePattern
+from source.candidates import CandidateMoves
+from source import parallel_search
+from source.transposition import TranspositionTable, EXACT, LOWER, UPPER
+
+
+def naive_count(board_map, i, j, xdir, ydir, state):
+    count = 0
+    for step in range(1, 5):
+        ii, jj = i + ydir * step, j + xdir * step
+        if 0 <= ii < N and 0 <= jj < N and board_map[ii][jj] == state:
+            count += 1
+        else:
+            break
+    return count
+
+
+def count_pattern(ai, i_0, j_0, pattern, score, bound, flag, state=None):
+    # occurrences of pattern covering (i_0, j_0) in all four directions;
+    # with state given, (i_0, j_0) is matched as if that stone were already played
+    masks = compilePattern(pattern)
+    empties = [k for k, v in enumerate(pattern) if v == 0]
+    count = 0
+    for axis in AXES:
+        starts = ai.bitboard.matchPattern(axis, i_0, j_0, masks, state)
+        if not starts:
+            continue
+        cells = LINE_CELLS[axis][ai.bitboard.lineIndex(axis, i_0, j_0)]
+        for s in starts:
+            count += 1
+            for k in empties:
+                bound.add(cells[s + k], flag * score)
+    return count
+
+
+def evaluate_patterns(ai, new_i, new_j, board_value, turn, bound):
+    # reference evaluation scanning every pattern; GomokuAI.evaluate must agree with it
+    value_before = 0
+    value_after = 0
+    for pattern, score in ai.patternDict.items():
+        value_before += count_pattern(ai, new_i, new_j, pattern, abs(score), bound, -1) * score
+        value_after += count_pattern(ai, new_i, new_j, pattern, abs(score), bound, 1, state=turn) * score
+    return board_value + value_after - value_before
+
+
+def play(ai, moves):
+    # 依次落子（黑 1 / 白 -1 交替），同时维护估值和候选点
+    state = 1
+    for i, j in moves:
+        ai.boardValue = ai.evaluate(i, j, ai.boardValue, state, ai.nextBound)
+        ai.setState(i, j, state)
+        ai.updateBound(i, j, ai.nextBound)
+        state = -state
+    ai.turn = len(moves)
+
+
+class TestGomokuAI(unittest.TestCase):
+
+    def test_bitboard_matches_board_scan(self):
+        # 位棋盘的连子计数必须与逐格扫描的结果一致
+        rng = random.Random(7)
+        directions = [(-1, 0), (1, 0), (0, -1), (0, 1), (-1, 1), (1, -1), (-1, -1), (1, 1)]
+        for _ in range(20):
+            ai = GomokuAI()
+            for _ in range(rng.randint(10, 120)):
+                ai.setState(rng.randrange(N), rng.randrange(N), rng.choice((1, -1)))
+            for i in range(N):
+                for j in range(N):
+                    for state in (1, -1):
+                        for xdir, ydir in directions:
+                            self.assertEqual(ai.countDirection(i, j, xdir, ydir, state),
+                                             naive_count(ai.boardMap, i, j, xdir, ydir, state))
+
+    def test_pattern_table_matches_pattern_scan(self):
+        # 查表估值必须与逐个棋型扫描的估值和候选点权重完全一致
+        rng = random.Random(3)
+        for _ in range(10):
+            ai = GomokuAI()
+            for _ in range(rng.randint(0, 150)):
+                ai.setState(rng.randrange(N), rng.randrange(N), rng.choice((1, -1)))
+            for _ in range(40):
+                i, j = rng.randrange(N), rng.randrange(N)
+                if not ai.isValid(i, j):
+                    continue
+                for state in (1, -1):
+                    bound_table, bound_scan = CandidateMoves(), CandidateMoves()
+                    self.assertEqual(ai.evaluate(i, j, 0, state, bound_table),
+                                     evaluate_patterns(ai, i, j, 0, state, bound_scan))
+                    self.assertEqual(bound_table, bound_scan)
+
+    def test_transposition_table_replacement(self):
+        table = TranspositionTable(capacity=4)
+        table.store(1, 5, 100, EXACT, (7, 7))
+        # 同一代数内，更浅的结果不能覆盖更深的结果
+        table.store(5, 2, 50, LOWER, (1, 1))
+        self.assertEqual(table.probe(1).score, 100)
+        self.assertIsNone(table.probe(5))
+        # 新一轮搜索后，旧条目可以被替换
+        table.newSearch()
+        table.store(5, 2, 50, UPPER, (1, 1))
+        self.assertEqual(table.probe(5).flag, UPPER)
+        self.assertIsNone(table.probe(1))
+        for key in range(100):
+            table.store(key, 1, key, EXACT, None)
+        self.assertLessEqual(len(table), 4)
+
+    def test_search_value_unchanged_by_transposition_table(self):
+        moves = [(7, 7), (7, 8), (8, 8), (6, 6), (8, 6), (8, 7)]
+        values = []
+        for use_table in (True, False):
+            ai = GomokuAI(depth=3)
+            if not use_table:
+                ai.TTable.probe = lambda key: None
+            play(ai, moves)
+            values.append(ai.alphaBetaPruning(ai.depth, ai.boardValue, ai.nextBound, -math.inf, math.inf, True))
+        self.assertEqual(values[0], values[1])
+
+    def test_iterative_deepening_respects_time_budget(self):
+        ai = GomokuAI(depth=8, threatMs=None)
+        play(ai, [(7, 7), (7, 8), (8, 8), (6, 6), (8, 6), (8, 7), (9, 7), (6, 9)])
+        root_hash = ai.rollingHash
+        root_bound = ai.nextBound
+        root_candidates = dict(root_bound)
+        start = time.time()
+        i, j = ai.get_action(timeBudgetMs=200)
+        self.assertLess(time.time() - start, 0.5)
+        self.assertTrue(ai.isValid(i, j))
+        self.assertGreaterEqual(ai.completedDepth, 1)
+        self.assertLess(ai.completedDepth, 8)
+        # 超时中断的搜索不能在棋盘和候选点上留下残留修改
+        self.assertEqual(ai.rollingHash, root_hash)
+        self.assertEqual(dict(root_bound), root_candidates)
+
+    def test_parallel_search_matches_serial(self):
+        moves = [(7, 7), (7, 8), (8, 8), (6, 6), (8, 6), (8, 7), (9, 7), (6, 9)]
+        results = []
+        for workers in (1, 2):
+            ai = GomokuAI(depth=3, workers=workers, threatMs=None)
+            play(ai, moves)
+            results.append((ai.get_action(), ai.boardValue))
+            if workers > 1:
+                self.assertEqual(ai.parallel.lastStats['workers'], 2)
+            ai.close()
+        self.assertEqual(results[0], results[1])
+
+    def test_parallel_worker_engine_stays_warm(self):
+        moves = [(7, 7), (7, 8), (8, 8), (6, 6), (8, 6), (8, 7), (9, 7), (6, 9)]
+        ai = GomokuAI(depth=3, threatMs=None)
+        play(ai, moves)
+        state = parallel_search._snapshot(ai)
+        root = list(enumerate(ai.childNodes(ai.nextBound)))[1::2]
+        parallel_search._worker = None
+        for depth in (1, 2, 3):
+            best, _, _ = parallel_search._searchChunk(state, root, depth, -math.inf, None)
+            self.assertIsNotNone(best)
+        # 同一个 worker 引擎在各轮之间保留，置换表中有前几轮的结果
+        worker = parallel_search._worker
+        self.assertGreater(len(worker.TTable), 0)
+        self.assertEqual(worker.rollingHash, ai.rollingHash)
+        # 下一步棋只同步新增的棋子，引擎和置换表不重建
+        for (i, j), state in (((5, 5), 1), ((9, 9), -1)):
+            ai.boardValue = ai.evaluate(i, j, ai.boardValue, state, ai.nextBound)
+            ai.setState(i, j, state)
+            ai.updateBound(i, j, ai.nextBound)
+        parallel_search._searchChunk(parallel_search._snapshot(ai), root[:1], 2, -math.inf, None)
+        self.assertIs(parallel_search._worker, worker)
+        self.assertEqual(worker.rollingHash, ai.rollingHash)
+        self.assertEqual(worker.bitboard.lines, ai.bitboard.lines)
+
+    def test_measure_speedup(self):
+        ai = GomokuAI(depth=3, threatMs=None)
+        play(ai, [(7, 7), (7, 8), (8, 8), (6, 6), (8, 6), (8, 7)])
+        stats = parallel_search.measureSpeedup(ai, 3, 2)
+        self.assertEqual(stats['serial']['move'], stats['parallel']['move'])
+        self.assertGreater(stats['speedup'], 0)
+
+    def test_candidate_moves_undo(self):
+        bound = CandidateMoves({(7, 7): 10, (7, 8): 3})
+        mark = bound.mark()
+        bound.add((7, 8), 5)
+        bound.add((6, 6), 1)
+        bound.discard((7, 7))
+        self.assertEqual(list(bound.ordered()), [(7, 8), (6, 6)])
+        bound.undo(mark)
+        self.assertEqual(bound, {(7, 7): 10, (7, 8): 3})
+        self.assertEqual(list(bound.ordered(first=(7, 8))), [(7, 8), (7, 7)])
+        self.assertEqual(bound.best(), (7, 7))
+        self.assertIsNone(CandidateMoves().best())
+
+    def test_no_candidates_falls_back_to_centre_or_none(self):
+        # 候选点为空时（这里只落子不更新候选点）不能抛出 StopIteration
+        ai = GomokuAI(depth=2, timeBudgetMs=100, threatMs=None, useBook=False)
+        ai.setState(0, 0, -1)
+        ai.turn = 1
+        self.assertEqual(ai.get_action(), (7, 7))
+        ai = GomokuAI(depth=2, timeBudgetMs=100, threatMs=None, useBook=False)
+        ai.setState(7, 7, -1)
+        ai.turn = 1
+        self.assertIsNone(ai.get_action())
+
+    def test_is_five(self):
+        ai = GomokuAI()
+        for k in range(4):
+            ai.setState(3 + k, 10 - k, 1)
+        self.assertTrue(ai.isFive(7, 6, 1))
+        self.assertTrue(ai.isFive(2, 11, 1))
+        self.assertFalse(ai.isFive(7, 6, -1))
+        self.assertFalse(ai.isFive(8, 5, 1))
+
+    def test_search_completes_five(self):
+        ai = GomokuAI(depth=2)
+        play(ai, [(7, 7), (6, 6), (7, 8), (0, 0), (7, 9), (0, 14), (7, 10), (14, 0)])
+        ai.alphaBetaPruning(ai.depth, ai.boardValue, ai.nextBound, -math.inf, math.inf, True)
+        self.assertIn((ai.currentI, ai.currentJ), [(7, 6), (7, 11)])
+
+
+if __name__ == '__main__':
+    unittest.main()
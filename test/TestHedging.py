@@ -0,0 +1,118 @@
+import threading
+import time
+import unittest
+from ai import hedging
+from ai.fallback import note_fallback
+from ai.hedging import HedgedEngine, LatencyHistogram
+from ai.minimax_ai import MinimaxAI
+from source.board import Board
+
+
+class SlowEngine:
+    """sleep 秒后返回 move；期间 cancel_event 被设置时提前返回"""
+
+    def __init__(self, move, sleep, fallback=False):
+        self.move = move
+        self.sleep = sleep
+        self.fallback = fallback
+        self.fallbacks = 0
+        self.cancelled = threading.Event()
+
+    def get_move(self, board, current_player, cancel_event=None):
+        if cancel_event.wait(self.sleep):
+            self.cancelled.set()
+        if self.fallback:
+            self.fallbacks += 1
+            note_fallback()
+        return self.move
+
+
+class TestHedging(unittest.TestCase):
+
+    def setUp(self):
+        hedging._histograms.clear()
+
+    def hedged(self, primary, secondary, delay=0.05):
+        return HedgedEngine(primary, 'primary', secondary, 'secondary', delay=delay, min_delay=0.01)
+
+    def test_fast_primary_does_not_start_secondary(self):
+        secondary = SlowEngine((0, 0), 0)
+        self.assertEqual(self.hedged(SlowEngine((7, 7), 0), secondary).get_move(Board(), 'black'), (7, 7))
+        self.assertNotIn('secondary', hedging._histograms)
+
+    def test_slow_primary_is_hedged_and_cancelled(self):
+        primary = SlowEngine((7, 7), 5)
+        start = time.monotonic()
+        self.assertEqual(self.hedged(primary, SlowEngine((0, 0), 0)).get_move(Board(), 'black'), (0, 0))
+        self.assertLess(time.monotonic() - start, 1)
+        self.assertTrue(primary.cancelled.wait(1))
+        # 被取消的主引擎没有完成，不记入它的延迟直方图
+        self.assertEqual(hedging.histogram('primary').total, 0)
+        self.assertEqual(hedging.histogram('secondary').total, 1)
+
+    def test_cancelled_minimax_keeps_its_root_position(self):
+        board = Board()
+        for i, j, color in ((7, 7, 'black'), (7, 8, 'white'), (8, 8, 'black')):
+            board.make(i, j, color)
+        minimax = MinimaxAI(depth=8, timeBudgetMs=3000)
+        engine = self.hedged(SlowEngine((9, 9), 0.3), minimax, delay=0.01)
+        self.assertEqual(engine.get_move(board, 'white'), (9, 9))
+        # 输掉的搜索没有把自己的着法记入引擎：主引擎的着法加上对手的应手仍是增量同步，不重建
+        board.make(9, 9, 'white')
+        board.make(6, 6, 'black')
+        root = minimax.engine
+        cancelled = threading.Event()
+        cancelled.set()  # 只同步局面，不搜索
+        i, j = minimax.get_move(board, 'white', cancel_event=cancelled)
+        self.assertIs(minimax.engine, root)
+        self.assertTrue(board.isEmpty(i, j))
+
+    def test_fallback_from_primary_waits_for_secondary(self):
+        engine = self.hedged(SlowEngine((7, 7), 0, fallback=True), SlowEngine((0, 0), 0.05), delay=5)
+        self.assertEqual(engine.get_move(Board(), 'black'), (0, 0))
+        # 两边都只有兜底着法时仍然返回主引擎的着法
+        engine = self.hedged(SlowEngine((7, 7), 0, fallback=True), SlowEngine((0, 0), 0, fallback=True))
+        self.assertEqual(engine.get_move(Board(), 'black'), (7, 7))
+
+    def test_fallback_is_flagged_per_call(self):
+        # 同一引擎上并发的另一次调用兜底时，这次调用的着法仍然有效
+        class Shared:
+            fallbacks = 0
+
+            def get_move(self, board, current_player, cancel_event=None):
+                if current_player == 'white':
+                    time.sleep(0.05)
+                    self.fallbacks += 1
+                    note_fallback()
+                    return 0, 0
+                time.sleep(0.1)
+                return 7, 7
+
+        shared = Shared()
+        other = threading.Thread(target=HedgedEngine._run, args=(shared, Board(), 'white', threading.Event()))
+        other.start()
+        self.assertEqual(HedgedEngine._run(shared, Board(), 'black', threading.Event()), ((7, 7), False))
+        other.join()
+        self.assertEqual(shared.fallbacks, 1)
+
+    def test_hedge_delay_follows_p95(self):
+        engine = self.hedged(SlowEngine((7, 7), 0), SlowEngine((0, 0), 0), delay=8)
+        self.assertEqual(engine.hedge_delay(), 8)
+        latencies = hedging.histogram('primary')
+        for k in range(100):
+            latencies.record(0.5 if k < 95 else 20)
+        self.assertAlmostEqual(engine.hedge_delay(), 0.5, delta=0.15)
+
+    def test_histogram_quantile(self):
+        latencies = LatencyHistogram(window=100)
+        self.assertIsNone(latencies.quantile(0.95))
+        for k in range(1, 101):
+            latencies.record(k / 100)
+        self.assertAlmostEqual(latencies.quantile(0.5), 0.5, delta=0.15)
+        self.assertAlmostEqual(latencies.quantile(0.95), 0.95, delta=0.25)
+        latencies.record(1.0)  # 超过窗口后计数减半
+        self.assertLessEqual(latencies.total, 51)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from ai import http_pool
+
+
+class CountingHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # 保持连接
+    connections = set()
+
+    def do_POST(self):
+        self.connections.add(self.client_address)
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        body = b'{"response": "ok"}'
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestHttpPool(unittest.TestCase):
+
+    def setUp(self):
+        CountingHandler.connections = set()
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), CountingHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = f'http://127.0.0.1:{self.server.server_port}/api/generate'
+
+    def tearDown(self):
+        http_pool.close_all()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_requests_reuse_one_connection(self):
+        http_pool.configure_http_pools({'AI_HTTP_CONNECT_TIMEOUT': 2, 'AI_HTTP_READ_TIMEOUT': 5})
+        self.assertEqual(http_pool.timeout(), (2, 5))
+        session = http_pool.get_session('llama3')
+        self.assertIs(http_pool.get_session('llama3'), session)
+        self.assertIsNot(http_pool.get_session('deepseek'), session)
+        for _ in range(5):
+            self.assertEqual(session.post(self.url, json={}, timeout=http_pool.timeout()).json(), {'response': 'ok'})
+        self.assertEqual(len(CountingHandler.connections), 1)
+
+    def test_threads_share_the_pool(self):
+        http_pool.configure_http_pools({'AI_HTTP_POOL_SIZE': 2})
+        session = http_pool.get_session('llama3')
+        errors = []
+
+        def worker():
+            try:
+                for _ in range(5):
+                    session.post(self.url, json={}, timeout=http_pool.timeout()).raise_for_status()
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=worker) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        self.assertLessEqual(len(CountingHandler.connections), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,44 @@
+import unittest
+from unittest import mock
+from flask import Flask, request
+from utils import jwt_util
+from utils.jwt_util import create_jwt_token, forget_connection_token, get_decoded_token_from_request
+
+
+class TestJwtUtil(unittest.TestCase):
+
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.token = create_jwt_token(1, 'user', 'user@example.com')
+
+    def event_context(self, sid='sid-1'):
+        # 模拟一个 WebSocket 事件的请求上下文
+        context = self.app.test_request_context(f'/?token={self.token}')
+        context.push()
+        request.sid = sid
+        self.addCleanup(context.pop)
+
+    def test_signature_verified_once_per_connection(self):
+        self.event_context()
+        with mock.patch.object(jwt_util, 'decode_jwt_token', wraps=jwt_util.decode_jwt_token) as decode:
+            for _ in range(3):
+                self.assertEqual(get_decoded_token_from_request()['email'], 'user@example.com')
+            self.assertEqual(decode.call_count, 1)
+            # 断开后缓存被清除，重新连接时再次验证
+            forget_connection_token()
+            get_decoded_token_from_request()
+            self.assertEqual(decode.call_count, 2)
+        forget_connection_token()
+
+    def test_cached_token_expires(self):
+        self.event_context()
+        get_decoded_token_from_request()
+        with mock.patch.object(jwt_util.time, 'time', return_value=jwt_util._connection_tokens['sid-1'][1]['exp']):
+            with self.assertRaises(Exception) as context:
+                get_decoded_token_from_request()
+        self.assertIn('expired', str(context.exception))
+        self.assertNotIn('sid-1', jwt_util._connection_tokens)
+
+
+if __name__ == '__main__':
+    unittest.main()
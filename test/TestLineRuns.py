@@ -0,0 +1,69 @@
+import random
+import unittest
+from source.line_runs import DIRECTIONS, LineRuns
+
+
+def naive_length(board, x, y, dx, dy, color):
+    # 逐格扫描：(x, y) 落子后沿 (dx, dy) 的连子数
+    count = 1
+    for sign in (1, -1):
+        i, j = x + dx * sign, y + dy * sign
+        while 0 <= i < 15 and 0 <= j < 15 and board[i][j] == color:
+            count += 1
+            i, j = i + dx * sign, j + dy * sign
+    return count
+
+
+class TestLineRuns(unittest.TestCase):
+
+    def assertMatchesBoard(self, runs, board, rng):
+        for _ in range(40):
+            i, j = rng.randrange(15), rng.randrange(15)
+            if board[i][j]:
+                continue
+            for color in ('black', 'white'):
+                for d, (dx, dy) in enumerate(DIRECTIONS):
+                    self.assertEqual(runs.lengthIfPlaced(i, j, color, d), naive_length(board, i, j, dx, dy, color))
+
+    def test_place_and_undo_match_board_scan(self):
+        rng = random.Random(3)
+        for _ in range(20):
+            board = [['' for _ in range(15)] for _ in range(15)]
+            runs, played = LineRuns(), []
+            for _ in range(150):
+                if played and rng.random() < 0.2:
+                    i, j = played.pop()
+                    board[i][j] = ''
+                    runs.undo()
+                else:
+                    i, j = rng.randrange(15), rng.randrange(15)
+                    if board[i][j]:
+                        continue
+                    color = rng.choice(('black', 'white'))
+                    five = runs.place(i, j, color)
+                    board[i][j] = color
+                    played.append((i, j))
+                    self.assertEqual(five, any(naive_length(board, i, j, dx, dy, color) >= 5 for dx, dy in DIRECTIONS))
+                self.assertMatchesBoard(runs, board, rng)
+
+    def test_remove_out_of_order(self):
+        rng = random.Random(8)
+        board = [[rng.choice(('', '', 'black', 'white')) for _ in range(15)] for _ in range(15)]
+        runs = LineRuns(board)
+        for _ in range(60):
+            i, j = rng.randrange(15), rng.randrange(15)
+            if board[i][j]:
+                board[i][j] = ''
+                runs.remove(i, j)
+                self.assertMatchesBoard(runs, board, rng)
+
+    def test_five_with_state_encoding(self):
+        runs = LineRuns()
+        for j in (3, 4, 6, 7):
+            self.assertFalse(runs.place(7, j, -1))
+        self.assertEqual(runs.longestIfPlaced(7, 5, -1), 5)
+        self.assertTrue(runs.place(7, 5, -1))
+
+
+if __name__ == '__main__':
+    unittest.main()
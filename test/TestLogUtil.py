@@ -0,0 +1,38 @@
+import logging
+import unittest
+from utils.log_util import DebugSampler, lazy, parse_levels
+
+
+class TestLogUtil(unittest.TestCase):
+
+    def test_lazy_argument_not_formatted_when_disabled(self):
+        calls = []
+        logger = logging.getLogger('test.log_util.lazy')
+        logger.setLevel(logging.INFO)
+        logger.debug("棋盘: %s", lazy(calls.append, 'board'))
+        self.assertEqual(calls, [])
+        with self.assertLogs(logger, logging.INFO) as captured:
+            logger.info("棋盘: %s", lazy(lambda: 'board'))
+        self.assertEqual(captured.records[0].getMessage(), "棋盘: board")
+
+    def test_sampler_only_drops_debug_records(self):
+        sampler = DebugSampler(0.0)
+        make = lambda level: logging.LogRecord('test', level, __file__, 0, 'msg', (), None)
+        self.assertFalse(sampler.filter(make(logging.DEBUG)))
+        self.assertTrue(sampler.filter(make(logging.INFO)))
+        self.assertTrue(DebugSampler(1.0).filter(make(logging.DEBUG)))
+
+    def test_parse_component_levels(self):
+        self.assertEqual(parse_levels("ai=debug, websocket=WARNING,,source=15"),
+                         {'ai': logging.DEBUG, 'websocket': logging.WARNING, 'source': 15})
+        self.assertEqual(parse_levels(None), {})
+
+    def test_parse_skips_invalid_entries(self):
+        with self.assertLogs('utils.log_util', logging.WARNING) as captured:
+            levels = parse_levels("ai=DEBG,bad,=INFO,websocket=info")
+        self.assertEqual(levels, {'websocket': logging.INFO})
+        self.assertEqual(len(captured.records), 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,164 @@
+import threading
+import time
+import unittest
+from ai.minimax_ai import MinimaxAI
+from ai.search_pool import SearchPool
+from source.board import Board
+from source.line_runs import LineRuns
+
+
+class TestMinimaxAI(unittest.TestCase):
+
+    def test_incremental_state_matches_rebuild(self):
+        players = {'black': MinimaxAI(depth=2, timeBudgetMs=100), 'white': MinimaxAI(depth=2, timeBudgetMs=100)}
+        board, runs, color = Board(), LineRuns(), 'black'
+        for _ in range(16):
+            i, j = players[color].get_move(board.copy(), color)
+            self.assertTrue(board.isEmpty(i, j))
+            board.make(i, j, color)
+            if runs.place(i, j, color):
+                break
+            color = 'white' if color == 'black' else 'black'
+
+        # 增量同步得到的引擎局面与从头重建的一致
+        ai, fresh = players['black'], MinimaxAI(depth=2)
+        ai._sync(board, 'black')
+        fresh._sync(board, 'black')
+        self.assertEqual(ai.engine.bitboard.lines, fresh.engine.bitboard.lines)
+        self.assertEqual(ai.engine.boardValue, fresh.engine.boardValue)
+        self.assertEqual(ai.board.key(), board.key())
+
+    def test_rebuilds_when_playedis_not_a_continuation(self):
+        ai = MinimaxAI(depth=2, timeBudgetMs=100)
+        board = Board()
+        board.make(7, 7, 'black')
+        i, j = ai.get_move(board, 'white')
+        engine = ai.engine
+        # 换一盘棋（重置后黑棋下在别处）时重建引擎
+        other = Board()
+        other.make(0, 0, 'black')
+        i, j = ai.get_move(other, 'white')
+        self.assertIsNot(ai.engine, engine)
+        self.assertTrue(other.isEmpty(i, j))
+        self.assertEqual(ai.board.stoneCount(), 2)
+
+    def test_search_in_process_pool(self):
+        board = Board()
+        for i, j, color in ((7, 7, 'black'), (7, 8, 'white'), (8, 8, 'black')):
+            board.make(i, j, color)
+        pool = SearchPool(1)
+        try:
+            local, pooled = MinimaxAI(depth=2, timeBudgetMs=5000), MinimaxAI(depth=2, timeBudgetMs=5000, pool=pool)
+            self.assertEqual(pooled.get_move(board, 'white'), local.get_move(board, 'white'))
+            self.assertEqual(pooled.searchStats()['depth'], 2)
+            # 引擎在 worker 进程中
+            self.assertIsNone(pooled.engine)
+            self.assertEqual(pooled.candidates(board, 'white', 3), local.candidates(board, 'white', 3))
+
+            # 取消时 worker 中的搜索在下一个节点结束
+            slow = MinimaxAI(depth=8, timeBudgetMs=3000, pool=pool)
+            cancel = threading.Event()
+            threading.Timer(0.3, cancel.set).start()
+            start = time.monotonic()
+            i, j = slow.get_move(board, 'white', cancel_event=cancel)
+            self.assertLess(time.monotonic() - start, 1)
+            self.assertTrue(board.isEmpty(i, j))
+            slow.close()
+            pooled.close()
+        finally:
+            pool.close()
+
+    def test_tables_persist_between_moves(self):
+        board = Board()
+        for i, j, color in ((7, 7, 'black'), (7, 8, 'white'), (8, 8, 'black')):
+            board.make(i, j, color)
+        pool = SearchPool(1)
+        try:
+            for ai in (MinimaxAI(depth=3, timeBudgetMs=5000), MinimaxAI(depth=3, timeBudgetMs=5000, pool=pool)):
+                played = board.copy()
+                played.make(*ai.get_move(played, 'white'), 'white')
+                first = dict(ai.searchStats())
+                if ai.engine is not None:
+                    engine, table = ai.engine, ai.engine.TTable
+                    self.assertEqual(engine.nextBound.journal, [])
+                played.make(*next(p for p in ((6, 6), (9, 9), (6, 9)) if played.isEmpty(*p)), 'black')
+                self.assertTrue(played.isEmpty(*ai.get_move(played, 'white')))
+                second = ai.searchStats()
+                # 引擎只建一次，第二步沿用第一步的置换表
+                self.assertEqual((first['builds'], second['builds']), (1, 1))
+                self.assertGreater(first['ttEntries'], 0)
+                self.assertGreaterEqual(second['ttEntries'], first['ttEntries'])
+                if ai.engine is not None:
+                    self.assertIs(ai.engine, engine)
+                    self.assertIs(ai.engine.TTable, table)
+                    self.assertEqual(ai.engine.nextBound.journal, [])
+                ai.close()
+        finally:
+            pool.close()
+
+    def test_cancel_stops_in_process_search(self):
+        board = Board()
+        for i, j, color in ((7, 7, 'black'), (7, 8, 'white'), (8, 8, 'black')):
+            board.make(i, j, color)
+        ai = MinimaxAI(depth=8, timeBudgetMs=3000)
+        # 搜索中途取消
+        cancel = threading.Event()
+        threading.Timer(0.1, cancel.set).start()
+        start = time.monotonic()
+        i, j = ai.get_move(board, 'white', cancel_event=cancel)
+        self.assertLess(time.monotonic() - start, 1)
+        self.assertTrue(board.isEmpty(i, j))
+        # 搜索开始之前就被取消：迭代加深一轮也不搜索
+        board.make(i, j, 'white')
+        board.make(9, 9, 'black')
+        engine = ai.engine
+        ai._sync(board, 'white')
+        stop = threading.Event()
+        stop.set()
+        start = time.monotonic()
+        i, j = engine.get_action(stop=stop)
+        self.assertLess(time.monotonic() - start, 0.5)
+        self.assertEqual(engine.completedDepth, 0)
+        self.assertTrue(board.isEmpty(i, j))
+
+    def test_ponder_hit_and_miss(self):
+        ai = MinimaxAI(depth=2, timeBudgetMs=100, ponderMs=300, ponderMoves=3)
+        board = Board()
+        for i, j, color in ((7, 7, 'black'), (7, 8, 'white'), (8, 8, 'black')):
+            board.make(i, j, color)
+        board.make(*ai.get_move(board, 'white'), 'white')
+        ai.ponderer.task.result(timeout=5)
+        futures = dict(ai.ponderer.futures)
+        self.assertEqual(len(futures), 3)
+        # 各个预测的应手都在同一个引擎上搜索，搜索后恢复到 AI 落子后的局面
+        ponder = ai.ponderer.engine
+        self.assertEqual(ponder.board.key(), ai.board.key())
+        fresh = MinimaxAI(depth=2)
+        fresh._sync(ai.board, 'white')
+        self.assertEqual(ponder.engine.bitboard.lines, fresh.engine.bitboard.lines)
+        self.assertEqual(ponder.engine.boardValue, fresh.engine.boardValue)
+        self.assertEqual(dict(ponder.engine.nextBound), dict(fresh.engine.nextBound))
+        # 每个应手按正常的时间预算搜索，预测数受 ponderMs 限制
+        self.assertEqual(ponder.timeBudgetMs, 100)
+        self.assertEqual(MinimaxAI(timeBudgetMs=100, ponderMs=150).ponderer.moves, 1)
+        self.assertIsNone(MinimaxAI(timeBudgetMs=1000, ponderMs=500).ponderer)
+
+        # 对手下了预测中的一步：直接得到 ponder 的回答
+        key, future = next((k, f) for k, f in futures.items() if f.result() is not None)
+        predicted = Board(key)
+        engine = ponder.engine
+        self.assertEqual(ai.get_move(predicted, 'white'), future.result())
+        # 下一轮 ponder 是上一轮根局面的延续，引擎不重建
+        ai.ponderer.task.result(timeout=5)
+        self.assertIs(ponder.engine, engine)
+
+        # 对手下在预测之外：正常搜索
+        predicted.make(*future.result(), 'white')
+        predicted.make(0, 0, 'black')
+        i, j = ai.get_move(predicted, 'white')
+        self.assertTrue(predicted.isEmpty(i, j))
+        ai.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
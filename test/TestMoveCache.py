@@ -0,0 +1,100 @@
+import os
+import tempfile
+import unittest
+from ai.fallback import note_fallback
+from ai.move_cache import CachedEngine, MoveCache
+from source.board import Board
+
+
+def board_of(stones):
+    board = Board()
+    for i, j, color in stones:
+        board.make(i, j, color)
+    return board
+
+
+STONES = [(7, 7, 'black'), (6, 8, 'white'), (8, 7, 'black')]
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeEngine:
+
+    def __init__(self, move, fallback=False):
+        self.move = move
+        self.fallback = fallback
+        self.fallbacks = 0
+        self.calls = 0
+
+    def get_move(self, board, current_player, cancel_event=None):
+        self.calls += 1
+        if self.fallback:
+            self.fallbacks += 1
+            note_fallback()
+        return self.move
+
+
+class TestMoveCache(unittest.TestCase):
+
+    def test_symmetric_positions_share_an_entry(self):
+        cache = MoveCache()
+        cache.put(board_of(STONES), 'white', 'deepseek', (9, 7))
+        # 顺时针旋转 90 度：(i, j) -> (j, 14 - i)
+        rotated = board_of([(j, 14 - i, color) for i, j, color in STONES])
+        self.assertEqual(cache.get(rotated, 'white', 'deepseek'), (7, 5))
+        # 左右翻转
+        mirrored = board_of([(i, 14 - j, color) for i, j, color in STONES])
+        self.assertEqual(cache.get(mirrored, 'white', 'deepseek'), (9, 7))
+        # 执子方和模型不同的局面不命中
+        self.assertIsNone(cache.get(rotated, 'black', 'deepseek'))
+        self.assertIsNone(cache.get(rotated, 'white', 'llama3'))
+        self.assertEqual((cache.hits, cache.misses), (2, 2))
+
+    def test_lru_and_ttl(self):
+        clock = FakeClock()
+        cache = MoveCache(maxsize=2, ttl=60, clock=clock)
+        boards = [board_of([(0, j, 'black')]) for j in range(3)]
+        cache.put(boards[0], 'white', 'm', (7, 7))
+        cache.put(boards[1], 'white', 'm', (7, 7))
+        cache.get(boards[0], 'white', 'm')  # boards[1] 成为最久未使用的一条
+        cache.put(boards[2], 'white', 'm', (7, 7))
+        self.assertEqual(len(cache), 2)
+        self.assertIsNone(cache.get(boards[1], 'white', 'm'))
+        self.assertEqual(cache.get(boards[0], 'white', 'm'), (7, 7))
+        clock.now += 61
+        self.assertIsNone(cache.get(boards[0], 'white', 'm'))
+
+    def test_sqlite_persistence(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'moves.db')
+            cache = MoveCache(path=path)
+            cache.put(board_of(STONES), 'white', 'llama3', (9, 7))
+            cache.close()
+            reopened = MoveCache(path=path)
+            self.assertEqual(reopened.get(board_of(STONES), 'white', 'llama3'), (9, 7))
+            reopened.close()
+
+    def test_cached_engine_skips_fallback_moves(self):
+        cache = MoveCache()
+        engine = FakeEngine((9, 7))
+        cached = CachedEngine(engine, 'deepseek', cache)
+        self.assertEqual(cached.get_move(board_of(STONES), 'white'), (9, 7))
+        self.assertEqual(cached.get_move(board_of(STONES), 'white'), (9, 7))
+        self.assertEqual(engine.calls, 1)
+
+        failing = FakeEngine((0, 0), fallback=True)
+        cached = CachedEngine(failing, 'llama3', cache)
+        cached.get_move(board_of(STONES), 'white')
+        cached.get_move(board_of(STONES), 'white')
+        self.assertEqual(failing.calls, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,64 @@
+import json
+import os
+import tempfile
+import unittest
+from types import SimpleNamespace
+from source.opening_book import OpeningBook, build_from_records, seed_book
+from source.symmetry import TRANSFORMS, canonical_hash
+
+
+def make_board(moves):
+    # 黑方先手依次落子
+    board = [['' for _ in range(15)] for _ in range(15)]
+    for ply, (i, j) in enumerate(moves):
+        board[i][j] = ('black', 'white')[ply % 2]
+    return board
+
+
+class TestOpeningBook(unittest.TestCase):
+
+    def test_symmetric_positions_share_key(self):
+        stones = [(7, 7, 0), (6, 8, 1), (5, 9, 0)]
+        key = canonical_hash(stones)[0]
+        for t in TRANSFORMS:
+            self.assertEqual(canonical_hash([t(i, j) + (c,) for i, j, c in stones])[0], key)
+
+    def test_probe_maps_move_back_through_symmetry(self):
+        book = OpeningBook()
+        book.addGame([(7, 7), (6, 7), (6, 8)])
+        for t in TRANSFORMS:
+            moves = [t(7, 7), t(6, 7)]
+            # (6, 6) 与 (6, 8) 关于第 7 列对称，是等价的着法
+            self.assertIn(book.probe(make_board(moves), 'black'), (t(6, 8), t(6, 6)))
+        # 1/-1 棋盘：state 为轮到落子的一方，棋盘上两子时轮到黑方
+        board = [[0] * 15 for _ in range(15)]
+        board[7][7], board[8][7] = -1, 1
+        self.assertIn(book.probe(board, -1), ((8, 6), (8, 8)))
+
+    def test_save_and_load_round_trip(self):
+        book = seed_book(maxPlies=6)
+        book.addGame([(7, 7), (8, 8), (6, 6), (9, 9)], winner='white')
+        fd, path = tempfile.mkstemp(suffix='.bin')
+        os.close(fd)
+        try:
+            book.save(path)
+            loaded = OpeningBook.load(path)
+        finally:
+            os.remove(path)
+        self.assertEqual(loaded.maxPlies, 6)
+        self.assertEqual(loaded.entries, book.entries)
+        self.assertIsNone(loaded.probe(make_board([(7, 7), (8, 8), (6, 6), (9, 9), (0, 0), (0, 1)]), 'black'))
+
+    def test_build_from_records(self):
+        # game_records 的 moves 列是 JSON 的 [[x, y], ...]，只记录胜方的着法；没有落子的旧记录跳过
+        records = [
+            SimpleNamespace(moves=json.dumps([[7, 7], [6, 7], [6, 8], [5, 9]]), winner='black'),
+            SimpleNamespace(moves=None, winner='white'),
+        ]
+        book = build_from_records(records)
+        self.assertIn(book.probe(make_board([(7, 7), (6, 7)]), 'black'), ((6, 8), (6, 6)))
+        self.assertIsNone(book.probe(make_board([(7, 7)]), 'white'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,89 @@
+import json
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from ai import http_pool
+from ai.deepseek_ai import DeepSeekAI
+from ai.llama3_ai import Llama3AI
+from ai.streaming import extract_move
+from source.board import Board
+
+ANSWER = '{"x": 7, "y": 8, "analysis": "' + '连接两子形成活二' * 20 + '"}'
+
+
+class StreamingHandler(BaseHTTPRequestHandler):
+    """把 ANSWER 拆成小片段慢慢发送，记录客户端断开前发出了多少片"""
+    protocol_version = 'HTTP/1.0'
+    sent = 0
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        assert body['stream'] is True
+        sse = self.path.endswith('/chat/completions')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream' if sse else 'application/x-ndjson')
+        self.end_headers()
+        pieces = [ANSWER[k:k + 4] for k in range(0, len(ANSWER), 4)]
+        try:
+            for piece in pieces:
+                if sse:
+                    chunk = {'choices': [{'delta': {'content': piece}}]}
+                    self.wfile.write(b'data: ' + json.dumps(chunk).encode() + b'\n\n')
+                else:
+                    self.wfile.write(json.dumps({'response': piece, 'done': False}).encode() + b'\n')
+                self.wfile.flush()
+                type(self).sent += 1
+                time.sleep(0.01)
+            self.wfile.write(b'data: [DONE]\n\n' if sse else b'{"response": "", "done": true}\n')
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def log_message(self, *args):
+        pass
+
+
+class TestStreaming(unittest.TestCase):
+
+    def setUp(self):
+        StreamingHandler.sent = 0
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), StreamingHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.base = f'http://127.0.0.1:{self.server.server_port}'
+        self.board = Board()
+        self.board.make(7, 7, 'black')
+
+    def tearDown(self):
+        http_pool.close_all()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_extract_move_waits_for_complete_coordinates(self):
+        self.assertIsNone(extract_move('{"x": 7, "y": 1', self.board))
+        self.assertEqual(extract_move('{"x": 7, "y": 12,', self.board), (7, 12))
+        # 占用的位置跳过，取后面的坐标
+        self.assertEqual(extract_move('{"x": 7, "y": 7} 或 {"x":6,"y":6}', self.board), (6, 6))
+
+    def assertStoppedEarly(self):
+        time.sleep(0.1)
+        self.assertLess(StreamingHandler.sent, len(ANSWER) // 4)
+
+    def test_llama3_stops_reading_after_move(self):
+        ai = Llama3AI(stream=True)
+        ai.api_url = self.base + '/api/generate'
+        text, last, move = ai._generate_stream({'model': 'llama3', 'prompt': '', 'stream': False}, self.board)
+        self.assertEqual(move, (7, 8))
+        self.assertFalse(last['done'])
+        self.assertStoppedEarly()
+
+    def test_deepseek_stops_reading_after_move(self):
+        ai = DeepSeekAI(stream=True)
+        ai.api_url = self.base + '/v1/chat/completions'
+        result, move = ai._chat_stream({'model': 'deepseek-reasoner', 'messages': []}, self.board)
+        self.assertEqual(move, (7, 8))
+        self.assertTrue(result['choices'][0]['message']['content'].startswith('{"x": 7'))
+        self.assertStoppedEarly()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,93 @@
+import time
+import unittest
+from source.AI import GomokuAI
+from source.threat_search import UNKNOWN, ThreatSearch, board_to_bitboard, find_forced_move
+
+# 黑方存在 VCF（连续冲四取胜）但没有现成活三的局面
+VCF_STONES = {
+    (5, 6): 'white', (5, 8): 'white', (5, 10): 'black', (6, 7): 'black', (6, 9): 'black', (8, 4): 'black',
+    (8, 5): 'black', (8, 9): 'black', (9, 5): 'black', (9, 8): 'white', (9, 10): 'black', (10, 4): 'white',
+}
+
+
+def make_board(stones):
+    board = [['' for _ in range(15)] for _ in range(15)]
+    for (i, j), color in stones.items():
+        board[i][j] = color
+    return board
+
+
+class TestThreatSearch(unittest.TestCase):
+
+    def test_win_and_block_five(self):
+        board = make_board({(7, 5): 'black', (7, 6): 'black', (7, 7): 'black', (7, 8): 'black', (7, 9): 'white'})
+        self.assertEqual(find_forced_move(board, 'black'), ((7, 4), 'win', None, None))
+        self.assertEqual(find_forced_move(board, 'white'), ((7, 4), 'block', None, None))
+
+    def test_vcf_line_is_forcing(self):
+        result = find_forced_move(make_board(VCF_STONES), 'black')
+        self.assertEqual(result.kind, 'vcf')
+        self.assertGreater(len(result.line), 1)
+        # 重放着法序列：攻方每一步冲四只留一个成五点，守方必须堵在该点，最后一步成五或双四
+        bb = board_to_bitboard(make_board(VCF_STONES))
+        search = ThreatSearch(bb)
+        line = result.line
+        for k in range(0, len(line) - 1, 2):
+            (i, j), block = line[k], line[k + 1]
+            self.assertEqual(search.fivePointsAfter(i, j, 1), {block})
+            bb.place(i, j, 1)
+            bb.place(block[0], block[1], -1)
+        i, j = line[-1]
+        self.assertTrue(bb.isFive(i, j, 1) or len(search.fivePointsAfter(i, j, 1)) >= 2)
+
+    def test_defend_against_vcf(self):
+        result = find_forced_move(make_board(VCF_STONES), 'white')
+        self.assertEqual(result.kind, 'defend_vcf')
+        bb = board_to_bitboard(make_board(VCF_STONES))
+        bb.place(result.move[0], result.move[1], -1)
+        self.assertIsNone(ThreatSearch(bb, timeMs=500).vcf(1))
+
+    def test_quiet_position_has_no_forced_move(self):
+        board = make_board({(7, 7): 'black', (7, 8): 'white', (8, 8): 'black'})
+        self.assertIsNone(find_forced_move(board, 'white'))
+
+    def test_exhausted_budget_is_unknown(self):
+        # 预算用完时不能当作“没有 VCF”，否则未验证的点会被当成有效防守
+        bb = board_to_bitboard(make_board(VCF_STONES))
+        self.assertIs(ThreatSearch(bb, maxNodes=1).vcf(1), UNKNOWN)
+        self.assertIsNone(ThreatSearch(bb, timeMs=500).vcf(-1))
+        result = find_forced_move(make_board(VCF_STONES), 'white', timeMs=0)
+        self.assertEqual(result, (None, 'unknown', None, None))
+
+    def test_gomoku_ai_skips_search_in_forced_position(self):
+        ai = GomokuAI(depth=8)
+        state = 1
+        for i, j in [(7, 7), (0, 0), (7, 8), (0, 14), (7, 9), (14, 0), (7, 10), (14, 14)]:
+            ai.boardValue = ai.evaluate(i, j, ai.boardValue, state, ai.nextBound)
+            ai.setState(i, j, state)
+            ai.updateBound(i, j, ai.nextBound)
+            state = -state
+        ai.turn = 8
+        start = time.time()
+        self.assertIn(ai.get_action(), [(7, 6), (7, 11)])
+        self.assertLess(time.time() - start, 0.5)
+        self.assertEqual(ai.nodes, 0)
+
+    def test_gomoku_ai_searches_among_defences(self):
+        # 对方活三的两端都能防守：不直接落子，由搜索在防守点中选择
+        ai = GomokuAI(depth=3, timeBudgetMs=2000)
+        for (i, j), state in [((7, 6), -1), ((3, 3), 1), ((7, 7), -1), ((10, 10), 1), ((7, 8), -1), ((11, 2), 1)]:
+            ai.boardValue = ai.evaluate(i, j, ai.boardValue, state, ai.nextBound)
+            ai.setState(i, j, state)
+            ai.updateBound(i, j, ai.nextBound)
+        ai.turn = 6
+        result = find_forced_move(ai.bitboard, 1)
+        self.assertIn((7, 5), result.defences)
+        self.assertIn((7, 9), result.defences)
+        self.assertIn(ai.get_action(), result.defences)
+        self.assertGreater(ai.nodes, 0)
+        self.assertIsNone(ai.rootMoves)
+
+
+if __name__ == '__main__':
+    unittest.main()
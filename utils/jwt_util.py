@@ -1,4 +1,5 @@
 import jwt
+import time
 from datetime import datetime, timedelta
 from functools import wraps
 from flask import request, jsonify
@@ -7,6 +8,10 @@ from jwt import ExpiredSignatureError, InvalidTokenError
 # 密钥用于签名 JWT
 SECRET_KEY = "abc_def_ghi"
 
+# WebSocket 连接已验证的 token：Socket.IO 会话 id (request.sid) -> (token, 解码结果)
+# 同一连接只在第一次（handle_connect）验证签名，之后的事件只检查缓存的 exp
+_connection_tokens = {}
+
 
 def create_jwt_token(user_id, username, email):
     payload = {
@@ -54,12 +59,31 @@ def get_decoded_token_from_request():
         if not token:
             raise Exception("Token is missing in request")
 
+        # WebSocket 事件带有 request.sid，按连接缓存解码结果
+        sid = getattr(request, 'sid', None)
+        cached = _connection_tokens.get(sid) if sid else None
+        if cached is not None and cached[0] == token:
+            decoded_token = cached[1]
+            if decoded_token.get('exp', 0) <= time.time():
+                _connection_tokens.pop(sid, None)
+                raise Exception("Token has expired")
+            return decoded_token
+
         decoded_token = decode_jwt_token(token)
+        if sid:
+            _connection_tokens[sid] = (token, decoded_token)
         return decoded_token
     except Exception as e:
         raise Exception(f"Error decoding token: {str(e)}")
 
 
+# 连接断开或登出时清除该连接缓存的 token
+def forget_connection_token():
+    sid = getattr(request, 'sid', None)
+    if sid:
+        _connection_tokens.pop(sid, None)
+
+
 # 解码 JWT token 并返回解码后的 payload
 def decode_jwt_token(token):
     try:
@@ -0,0 +1,68 @@
+import logging
+import random
+
+logger = logging.getLogger(__name__)
+
+
+class lazy:
+    """
+    延迟求值的日志参数：logger.debug("棋盘:\n%s", lazy(board_to_string, board))
+    只有日志真正输出时才调用 func，级别关闭或被采样丢弃时没有任何格式化开销。
+    """
+
+    __slots__ = ('func', 'args')
+
+    def __init__(self, func, *args):
+        self.func = func
+        self.args = args
+
+    def __str__(self):
+        return str(self.func(*self.args))
+
+
+class DebugSampler(logging.Filter):
+    """按比例采样 DEBUG 日志，INFO 及以上级别全部保留；过滤发生在格式化之前"""
+
+    def __init__(self, rate):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record):
+        return record.levelno > logging.DEBUG or random.random() < self.rate
+
+
+def parse_levels(spec):
+    """解析 "ai=DEBUG,websocket=WARNING" 形式的组件日志级别；格式错误或未知级别的条目记录警告后跳过"""
+    levels = {}
+    for item in (spec or '').split(','):
+        if not item.strip():
+            continue
+        name, _, level = (part.strip() for part in item.partition('='))
+        value = int(level) if level.isdigit() else logging.getLevelName(level.upper())
+        if not name or not isinstance(value, int):
+            logger.warning("Ignoring invalid LOG_LEVELS entry %r", item.strip())
+            continue
+        levels[name] = value
+    return levels
+
+
+def configure_logging(config):
+    """根据应用配置设置根日志级别、各组件级别以及 DEBUG 采样"""
+    logging.basicConfig(
+        filename='app.log',
+        level=config.get('LOG_LEVEL', logging.INFO),
+        format=config.get('LOG_FORMAT', '%(asctime)s %(levelname)s: %(message)s')
+    )
+
+    root = logging.getLogger()
+    console_handler = logging.StreamHandler()
+    console_handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)s %(name)s: %(message)s'))
+    root.addHandler(console_handler)
+
+    rate = config.get('LOG_DEBUG_SAMPLE_RATE', 1.0)
+    if rate < 1.0:
+        for handler in root.handlers:
+            handler.addFilter(DebugSampler(rate))
+
+    for name, level in parse_levels(config.get('LOG_LEVELS')).items():
+        logging.getLogger(name).setLevel(level)
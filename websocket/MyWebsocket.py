@@ -1,11 +1,27 @@
 import math
-from flask_socketio import emit, disconnect
-import threading
-from utils.jwt_util import get_decoded_token_from_request, decode_jwt_token
+from concurrent.futures import ThreadPoolExecutor
+from flask import request
+from flask_socketio import emit, disconnect, join_room
+from websocket import socketio
+from websocket.game_registry import GameRegistry
+from source.line_runs import LineRuns
+from source.board import Board
+from utils.jwt_util import get_decoded_token_from_request, decode_jwt_token, forget_connection_token
 from ai.deepseek_ai import DeepSeekAI
 from ai.llama3_ai import Llama3AI
+from ai.minimax_ai import MinimaxAI
+from ai.search_pool import SearchPool
+from ai.engine_registry import EngineRegistry
+from ai.move_cache import CachedEngine
+from ai.hedging import HedgedEngine
+from ai.ponder import configure_pondering
+from service.game_record_service import game_records
 from dotenv import load_dotenv
+import logging
 import os
+import time
+
+logger = logging.getLogger(__name__)
 
 # 加载环境变量
 load_dotenv()
@@ -13,25 +29,118 @@ load_dotenv()
 # 15x15 棋盘尺寸
 board_size = 15
 
-# 用于存储所有用户对局状态的字典
-games = {}
-games_lock = threading.Lock()
-
-# 初始化 AI 模型
-deepseek_ai = DeepSeekAI()
-llama3_ai = Llama3AI()
-
-# AI 模型选择 - 从 .env 文件或环境变量中读取
-AI_MODEL = os.getenv('AI_MODEL', 'deepseek')  # 默认使用 deepseek，可选 'llama3'
-
-def get_ai_instance():
-    """根据配置返回对应的 AI 实例"""
-    if AI_MODEL.lower() == 'llama3':
-        print("使用本地 Llama3 AI 模型")
-        return llama3_ai
-    else:
-        print("使用 DeepSeek AI 模型")
-        return deepseek_ai
+# 所有用户的对局状态：按 session_id 分片，每局一把锁
+games = GameRegistry()
+
+# 本地 minimax 引擎：最大搜索深度和每步的时间预算（毫秒）
+MINIMAX_DEPTH = int(os.getenv('MINIMAX_DEPTH', 4))
+MINIMAX_TIME_MS = int(os.getenv('MINIMAX_TIME_MS', 1000))
+# minimax 搜索所用的进程数：各会话的引擎常驻在这些 worker 进程中，置换表在各步之间保留，
+# 搜索不在 AI 落子线程上占用 GIL（eventlet 部署下会卡住所有连接）；
+# 0 表示直接在 AI 落子线程上搜索，只适合开发环境或 threading 模式的服务器
+MINIMAX_PROCESSES = int(os.getenv('MINIMAX_PROCESSES', 2))
+minimax_pool = SearchPool(MINIMAX_PROCESSES) if MINIMAX_PROCESSES > 0 else None
+# 对手思考期间预先计算对手最可能的应手（最多 MINIMAX_PONDER_MOVES 个，每个按 MINIMAX_TIME_MS 搜索），
+# 每轮最多 MINIMAX_PONDER_MS 毫秒；默认 0 关闭。所有会话合计同时 ponder 的轮数不超过 MINIMAX_PONDER_SLOTS，
+# 应小于 MINIMAX_PROCESSES，保证正常落子的搜索总有空闲的进程
+MINIMAX_PONDER_MS = int(os.getenv('MINIMAX_PONDER_MS', 0))
+MINIMAX_PONDER_MOVES = int(os.getenv('MINIMAX_PONDER_MOVES', 3))
+MINIMAX_PONDER_SLOTS = int(os.getenv('MINIMAX_PONDER_SLOTS', 1))
+configure_pondering(MINIMAX_PONDER_SLOTS)
+
+# LLM 后端流式接收响应，解析出坐标后立即停止生成
+AI_STREAM = os.getenv('AI_STREAM', 'True').lower() == 'true'
+
+# 对冲请求：LLM 超过其历史 p95 延迟（样本不足时为 AI_HEDGE_DELAY_MS）仍未给出着法时，同时启动本地 minimax 引擎，
+# 先得到的有效着法胜出；等待时间限制在 [AI_HEDGE_MIN_MS, AI_HEDGE_MAX_MS] 之间
+AI_HEDGE = os.getenv('AI_HEDGE', 'True').lower() == 'true'
+AI_HEDGE_DELAY_MS = int(os.getenv('AI_HEDGE_DELAY_MS', 8000))
+AI_HEDGE_MIN_MS = int(os.getenv('AI_HEDGE_MIN_MS', 500))
+AI_HEDGE_MAX_MS = int(os.getenv('AI_HEDGE_MAX_MS', 30000))
+
+def new_minimax(ponder=False):
+    return MinimaxAI(depth=MINIMAX_DEPTH, timeBudgetMs=MINIMAX_TIME_MS, pool=minimax_pool,
+                     ponderMs=MINIMAX_PONDER_MS if ponder else 0, ponderMoves=MINIMAX_PONDER_MOVES)
+
+def new_llm_engine(model, client):
+    """LLM 引擎前面加一层所有会话共用的局面缓存（相同或对称的局面不再重复请求模型），开启对冲时再包一层 HedgedEngine"""
+    engine = CachedEngine(client, model)
+    if not AI_HEDGE:
+        return engine
+    return HedgedEngine(engine, model, new_minimax(), 'minimax',
+                        delay=AI_HEDGE_DELAY_MS / 1000, min_delay=AI_HEDGE_MIN_MS / 1000, max_delay=AI_HEDGE_MAX_MS / 1000)
+
+# 每个会话独立的 AI 引擎，断开连接、登出或重置对局时释放
+engines = EngineRegistry({
+    'deepseek': lambda: new_llm_engine('deepseek', DeepSeekAI(stream=AI_STREAM)),
+    'llama3': lambda: new_llm_engine('llama3', Llama3AI(stream=AI_STREAM)),
+    'minimax': lambda: new_minimax(ponder=True),  # 对冲用的备用引擎只在 LLM 慢时才用到，不 ponder
+})
+
+# 兜底着法用的引擎：只取候选点、不搜索，在本进程中同步局面；所有会话共用，调用由它自己的锁串行
+fallback_engine = MinimaxAI(depth=1)
+
+# 新对局默认使用的 AI 模型 - 从 .env 文件或环境变量中读取，每个会话可以通过 switchAiModel 单独切换
+AI_MODEL = os.getenv('AI_MODEL', 'deepseek').lower()  # 默认使用 deepseek，可选 'llama3'、'minimax'
+if AI_MODEL not in engines:
+    logger.warning("Unknown AI_MODEL %r, using deepseek", AI_MODEL)
+    AI_MODEL = 'deepseek'
+
+# AI 落子线程池：LLM 请求可能阻塞数十秒，放到线程池中计算，事件处理函数和对局锁都不等待它
+AI_WORKERS = int(os.getenv('AI_WORKERS', 4))
+ai_executor = ThreadPoolExecutor(max_workers=AI_WORKERS, thread_name_prefix='ai-move')
+
+def get_ai_instance(session_id, game):
+    """持有该局的锁时调用，返回该会话当前模型的 AI 引擎（第一次使用时创建）"""
+    logger.debug("使用 %s AI 模型 for session ID: %s", game['ai_model'], session_id)
+    return engines.get(session_id, game['ai_model'])
+
+def release_engines(session_id, game):
+    """对局被删除或重置后释放该会话的引擎；持有对局锁，保证不会有 dispatch_ai_move 同时创建新引擎"""
+    with game['lock']:
+        released = engines.release(session_id)
+    if released:
+        logger.debug("Released %s AI engine(s) for session ID: %s", released, session_id)
+
+def new_game_state():
+    """新对局的初始状态"""
+    return {
+        "board": Board(),
+        "current_player": "black",
+        "status": "ongoing",
+        "winner": None,
+        "ai_model": AI_MODEL,  # 该会话使用的 AI 模型
+        "ai_pending": False,  # AI 是否正在计算落子
+        "generation": 0,  # 每次重置加一，用来丢弃重置前提交的 AI 计算结果
+        "seq": 0,  # 本局已落子数，每条 move 消息带上落子后的序号，客户端据此发现丢失的消息
+        "moves": [],  # 按顺序的落子 (x, y)，对局结束时写入 game_records
+        "started_at": time.time(),
+        "runs": LineRuns()  # 增量维护的连子长度，落子时 O(1) 判断五连
+    }
+
+def snapshot_of(game):
+    """对局的完整快照：只在连接（重连）、重置以及客户端发现序号不连续时发送"""
+    return {
+        'board': game['board'].compact(),  # 225 个字符：空 '.'，黑 'b'，白 'w'
+        'seq': game['seq'],
+        'next_turn': game['current_player'],
+        'winner': game['winner']
+    }
+
+def apply_move(game, x, y, color):
+    """
+    持有该局的锁时调用：落子、记录着法、轮换走子方并递增序号；形成五连时结束对局。
+    返回 (要推送的 move 消息, 获胜方或 None)
+    """
+    game['board'].make(x, y, color)
+    game['moves'].append((x, y))
+    game['current_player'] = 'white' if color == 'black' else 'black'
+    game['seq'] += 1
+    winner = None
+    if game['runs'].place(x, y, color):
+        winner = game['winner'] = color
+        game['status'] = 'ended'
+    return {'x': x, 'y': y, 'color': color, 'seq': game['seq'], 'next_turn': game['current_player']}, winner
 
 # 客户端连接时的处理逻辑
 def handle_connect():
@@ -39,23 +148,22 @@ def handle_connect():
         decoded_token = get_decoded_token_from_request()
         session_id = decoded_token.get('email')
 
-        with games_lock:
-            print(f"Client connected with session ID: {session_id}")
-            if session_id not in games:
-                games[session_id] = {
-                    "board": [['' for _ in range(board_size)] for _ in range(board_size)],
-                    "current_player": "black",
-                    "status": "ongoing",
-                    "winner": None,
-                    "ai_model": AI_MODEL  # 记录使用的 AI 模型
-                }
+        logger.info("Client connected with session ID: %s", session_id)
+        # 同一会话的多个连接共享一局，记录连接 id，最后一个连接断开时才删除对局
+        game, _ = games.connect(session_id, request.sid, new_game_state())
+        # 每个会话一个房间（同一用户的多个连接共享对局），对局更新只发给这个房间
+        join_room(session_id)
+        # 新连接（包括重连）先收到一次完整快照，之后只收增量的 move 消息
+        with game['lock']:
+            snapshot = snapshot_of(game)
+        emit('snapshot', snapshot)
     except Exception as e:
-        print(f"Connection error: {str(e)}")
+        logger.warning("Connection error: %s", e)
         if "expired" in str(e).lower():
-            print("Token has expired, disconnecting client")
+            logger.info("Token has expired, disconnecting client")
             emit('error', {'message': 'Token has expired, please login again'})
         else:
-            print(f"Invalid token or other error: {str(e)}")
+            logger.warning("Invalid token or other error: %s", e)
             emit('error', {'message': 'Authentication failed'})
         disconnect()
 
@@ -65,14 +173,16 @@ def handle_disconnect():
         decoded_token = get_decoded_token_from_request()
         session_id = decoded_token.get('email')
 
-        with games_lock:
-            if session_id in games:
-                print(f"Removing game for session ID: {session_id}")
-                del games[session_id]
+        # 同一会话还有其他连接时保留对局和引擎
+        game = games.disconnect(session_id, request.sid)
+        if game is not None:
+            release_engines(session_id, game)
+            logger.info("Removing game for session ID: %s", session_id)
     except Exception as e:
-        print(f"Disconnect error: {str(e)}")
+        logger.warning("Disconnect error: %s", e)
     finally:
-        print("Client disconnected")
+        forget_connection_token()
+        logger.info("Client disconnected")
 
 # 处理 AI 先手的情况
 def handle_ai_first_move():
@@ -80,33 +190,26 @@ def handle_ai_first_move():
         decoded_token = get_decoded_token_from_request()
         session_id = decoded_token.get('email')
 
-        with games_lock:
-            if session_id not in games:
-                print(f"No game found for session ID: {session_id}")
+        with games.locked(session_id) as game:
+            if game is None:
+                logger.warning("No game found for session ID: %s", session_id)
                 return
 
-            print(f"AI starts first move (black) for session ID: {session_id}")
+            if game['ai_pending']:
+                logger.warning("AI is already moving for session ID: %s", session_id)
+                return
 
-            board = games[session_id]['board']
-            
-            # 使用选定的 AI 获取第一步移动
-            ai_instance = get_ai_instance()
-            ai_x, ai_y = ai_instance.get_move(board, 'black')
-            
-            # 更新棋盘状态
-            board[ai_x][ai_y] = 'black'
-            games[session_id]['current_player'] = 'white'
+            if game['status'] != 'ongoing' or game['seq'] != 0:
+                logger.warning("AI first move requested after the game started for session ID: %s", session_id)
+                return
 
-            print(f"AI ({AI_MODEL}) placed black piece at ({ai_x}, {ai_y}) for session ID: {session_id}")
+            logger.debug("AI starts first move (black) for session ID: %s", session_id)
 
-            # 发送更新给客户端
-            emit('updateBoard', {
-                'board': games[session_id]['board'], 
-                'next_turn': 'white'
-            }, broadcast=True)
+            # 在线程池中计算第一步，结果由 run_ai_move 推送给客户端
+            dispatch_ai_move(session_id, game, 'black')
 
     except Exception as e:
-        print(f"Error during AI first move: {str(e)}")
+        logger.error("Error during AI first move: %s", e)
         disconnect()
 
 # 处理玩家的走子动作
@@ -115,63 +218,146 @@ def handle_player_move(data):
         decoded_token = get_decoded_token_from_request()
         session_id = decoded_token.get('email')
 
-        with games_lock:
-            if session_id not in games:
-                print(f"No game found for session ID: {session_id}")
+        with games.locked(session_id) as game:
+            if game is None:
+                logger.warning("No game found for session ID: %s", session_id)
                 return
 
             x, y = data['x'], data['y']
             player = data['player']
 
-            print(f"Player {player} placed piece at ({x}, {y}) for session ID: {session_id}")
+            logger.debug("Player %s placed piece at (%s, %s) for session ID: %s", player, x, y, session_id)
 
-            game = games[session_id]
             board = game['board']
 
+            # 对局已经结束（重置前）不接受落子，也不再让 AI 计算
+            if game['status'] != 'ongoing':
+                logger.warning("Invalid move: game is over for session ID: %s", session_id)
+                return
+
+            # AI 还在计算上一步时不接受新的落子
+            if game['ai_pending']:
+                logger.warning("Invalid move: AI is still moving for session ID: %s", session_id)
+                return
+
             # 验证移动有效性
-            if board[x][y] == '':
-                board[x][y] = player
-                game['current_player'] = 'white' if game['current_player'] == 'black' else 'black'
-
-                # 检查玩家是否获胜
-                if not check_and_emit_winner(session_id, x, y, player):
-                    print(f"AI ({AI_MODEL}) is making its move...")
-                    # AI 响应玩家移动
-                    ai_move(session_id, game['current_player'])
-            else:
-                print(f"Invalid move: Position ({x}, {y}) is already occupied for session ID: {session_id}")
-                
-    except Exception as e:
-        print(f"Error during player move: {str(e)}")
-        disconnect()
+            if player not in ('black', 'white'):
+                logger.warning("Invalid move: unknown player %r for session ID: %s", player, session_id)
+                return
 
-# AI 下棋逻辑
-def ai_move(session_id, ai_player_color):
-    if session_id not in games:
-        print(f"No game found for session ID: {session_id}")
-        return
+            if not (0 <= x < board_size and 0 <= y < board_size):
+                logger.warning("Invalid move: Position (%s, %s) is off the board for session ID: %s", x, y, session_id)
+                return
 
-    print(f"AI ({AI_MODEL}) is calculating its next move ({ai_player_color}) for session ID: {session_id}")
+            if not board.isEmpty(x, y):
+                logger.warning("Invalid move: Position (%s, %s) is already occupied for session ID: %s", x, y, session_id)
+                return
 
-    board = games[session_id]['board']
-    
-    # 使用选定的 AI 获取下一步移动
-    ai_instance = get_ai_instance()
-    move_i, move_j = ai_instance.get_move(board, ai_player_color)
+            # 落子并检查玩家是否获胜
+            move, winner = apply_move(game, x, y, player)
+            record = game_record_of(game) if winner else None
+            if not winner:
+                logger.debug("AI (%s) is making its move...", game['ai_model'])
+                # AI 响应玩家移动：提交到线程池后立即返回，不持锁等待
+                dispatch_ai_move(session_id, game, game['current_player'])
 
-    # 更新棋盘状态
-    board[move_i][move_j] = ai_player_color
-    next_turn = 'black' if ai_player_color == 'white' else 'white'
-    games[session_id]['current_player'] = next_turn
+        # 在锁外推送结果：落子同样发给房间内的所有连接，发起方据此确认序号
+        socketio.emit('move', move, to=session_id)
+        if winner:
+            emit_game_over(session_id, winner, record)
 
-    print(f"AI ({AI_MODEL}) placed {ai_player_color} piece at ({move_i}, {move_j}) for session ID: {session_id}")
+    except Exception as e:
+        logger.error("Error during player move: %s", e)
+        disconnect()
+
+# AI 下棋逻辑
+def dispatch_ai_move(session_id, game, ai_player_color):
+    """持有该局的锁时调用：标记该局正在等待 AI，并把计算提交到线程池"""
+    game['ai_pending'] = True
+    board = game['board'].copy()  # AI 在棋盘副本上计算，不需要持锁
+    ai_instance = get_ai_instance(session_id, game)
+    ai_executor.submit(run_ai_move, session_id, game['generation'], ai_instance, board, ai_player_color)
+
+
+def run_ai_move(session_id, generation, ai_instance, board, ai_player_color):
+    """
+    线程池中执行：不持锁调用 AI，再在锁内更新棋盘，最后在锁外推送结果。
+    无论着法是否被采用、中途是否出错，结束时都清除这一局的 ai_pending（对局已被重置或删除时除外）。
+    """
+    logger.debug("AI (%s) is calculating its next move (%s) for session ID: %s", type(ai_instance).__name__, ai_player_color, session_id)
+
+    pending = True
+    try:
+        try:
+            # 使用选定的 AI 获取下一步移动
+            move = ai_instance.get_move(board, ai_player_color)
+        except Exception as e:
+            logger.error("Error during AI move: %s", e)
+            move = None
+
+        if not is_legal_move(board, move):
+            # AI 出错或给出了无效位置：改用兜底着法，客户端不会一直停在“等待 AI”
+            fallback = fallback_move(board, ai_player_color)
+            logger.error("AI returned invalid move %s for session ID: %s, using fallback %s", move, session_id, fallback)
+            move = fallback
+
+        winner = record = None
+        with games.locked(session_id) as game:
+            # 计算期间对局可能已被重置或删除，此时丢弃结果（重置时已清除 ai_pending，新的一局可能已经在等待新的计算）
+            if game is None or game['generation'] != generation:
+                logger.debug("Discarding AI move for session ID: %s, game changed", session_id)
+                pending = False
+                return
+            game['ai_pending'] = pending = False
+            if game['status'] != 'ongoing':
+                logger.debug("Discarding AI move for session ID: %s, game is over", session_id)
+                return
 
-    # 检查 AI 是否获胜
-    if not check_and_emit_winner(session_id, move_i, move_j, ai_player_color):
-        emit('updateBoard', {
-            'board': games[session_id]['board'], 
-            'next_turn': next_turn
-        }, broadcast=True)
+            if not is_legal_move(game['board'], move):
+                # 棋盘已经下满，没有可下的位置
+                logger.error("No legal AI move for session ID: %s", session_id)
+                move = None
+            else:
+                # 更新棋盘状态
+                move_i, move_j = move
+                move, winner = apply_move(game, move_i, move_j, ai_player_color)
+                record = game_record_of(game) if winner else None
+                logger.debug("AI (%s) placed %s piece at (%s, %s) for session ID: %s", type(ai_instance).__name__, ai_player_color, move_i, move_j, session_id)
+
+        if move is None:
+            socketio.emit('aiError', {'message': 'AI failed to make a move'}, to=session_id)
+            return
+        socketio.emit('move', move, to=session_id)
+        if winner:
+            emit_game_over(session_id, winner, record)
+    except Exception as e:
+        logger.error("Error finishing AI move for session ID: %s: %s", session_id, e)
+    finally:
+        if pending:
+            # 兜底着法或更新对局时出错：清除 ai_pending，客户端可以继续落子或重置
+            with games.locked(session_id) as game:
+                if game is not None and game['generation'] == generation:
+                    game['ai_pending'] = False
+            socketio.emit('aiError', {'message': 'AI failed to make a move'}, to=session_id)
+
+def is_legal_move(board, move):
+    """move 是棋盘内的空位"""
+    try:
+        x, y = move
+        return 0 <= x < board_size and 0 <= y < board_size and board.isEmpty(x, y)
+    except (TypeError, ValueError):
+        return False
+
+def fallback_move(board, color):
+    """兜底着法：本地 minimax 引擎候选分值最高的空位（不搜索），没有候选点时取天元或任一空位，棋盘已满时返回 None"""
+    candidates = fallback_engine.candidates(board, color, 1)
+    if candidates:
+        return candidates[0]
+    center = board_size // 2
+    if board.isEmpty(center, center):
+        return center, center
+    empty = board.emptyCells()
+    return empty[0] if empty else None
 
 # 处理切换 AI 模型
 def handle_switch_ai_model(data):
@@ -181,108 +367,37 @@ def handle_switch_ai_model(data):
         session_id = decoded_token.get('email')
         
         new_model = data.get('model', 'deepseek').lower()
-        if new_model not in ['deepseek', 'llama3']:
-            print(f"Invalid AI model: {new_model}")
+        if new_model not in engines:
+            logger.warning("Invalid AI model: %s", new_model)
             return
         
-        global AI_MODEL
-        AI_MODEL = new_model
-        
-        with games_lock:
-            if session_id in games:
-                games[session_id]['ai_model'] = AI_MODEL
+        # 只切换这个会话的模型，其他用户的对局不受影响
+        with games.locked(session_id) as game:
+            if game is None:
+                logger.warning("No game found for session ID: %s", session_id)
+                return
+            game['ai_model'] = new_model
         
-        print(f"AI model switched to: {AI_MODEL} for session ID: {session_id}")
-        emit('aiModelChanged', {'model': AI_MODEL}, broadcast=True)
+        logger.info("AI model switched to: %s for session ID: %s", new_model, session_id)
+        socketio.emit('aiModelChanged', {'model': new_model}, to=session_id)
         
     except Exception as e:
-        print(f"Error switching AI model: {str(e)}")
-
-# 检查胜负条件
-def check_winner(board, x, y, player):
-    """检查指定玩家在指定位置是否获胜"""
-    print(f"=== 检查获胜者 ===")
-    print(f"检查位置: ({x}, {y}), 玩家: '{player}' (type: {type(player)})")
-    print(f"该位置的实际值: '{board[x][y]}' (type: {type(board[x][y])})")
-    
-    # 打印棋盘周围区域用于调试
-    print("棋盘周围区域:")
-    for i in range(max(0, x-2), min(board_size, x+3)):
-        row_str = ""
-        for j in range(max(0, y-2), min(board_size, y+3)):
-            if i == x and j == y:
-                row_str += f"[{board[i][j] if board[i][j] else '.'}]"
-            else:
-                row_str += f" {board[i][j] if board[i][j] else '.'} "
-        print(f"行{i}: {row_str}")
-    
-    # 确保player参数不为空
-    if not player or player == '':
-        print(f"警告: player参数为空或空字符串")
-        return None
-    
-    # 确保指定位置确实是该玩家的棋子
-    if board[x][y] != player:
-        print(f"警告: 位置({x}, {y})的棋子'{board[x][y]}'与玩家'{player}'不匹配")
-        print(f"棋盘该位置值的repr: {repr(board[x][y])}")
-        print(f"玩家参数的repr: {repr(player)}")
-        return None
-    
-    directions = [
-        (0, 1),   # 水平方向
-        (1, 0),   # 垂直方向
-        (1, 1),   # 主对角线
-        (1, -1)   # 副对角线
-    ]
-
-    for dx, dy in directions:
-        count = 1
-        
-        # 向一个方向计数
-        i, j = x + dx, y + dy
-        while 0 <= i < board_size and 0 <= j < board_size and board[i][j] == player:
-            count += 1
-            i += dx
-            j += dy
-
-        # 向相反方向计数
-        i, j = x - dx, y - dy
-        while 0 <= i < board_size and 0 <= j < board_size and board[i][j] == player:
-            count += 1
-            i -= dx
-            j -= dy
-
-        print(f"方向({dx}, {dy}): 连子数 = {count}")
-        
-        if count >= 5:
-            print(f"找到获胜: {player} 在方向({dx}, {dy})有 {count} 连子!")
-            return player
-
-    print(f"未找到获胜条件")
-    return None
-
-# 检查并发送获胜信息
-def check_and_emit_winner(session_id, x, y, player):
-    """检查是否有玩家获胜，如果有则发送获胜信息"""
-    print(f"=== 检查并发送获胜信息 ===")
-    print(f"会话ID: {session_id}, 位置: ({x}, {y}), 玩家: '{player}'")
-    
-    winner = check_winner(games[session_id]['board'], x, y, player)
-    print(f"检查结果: winner = '{winner}' (type: {type(winner)})")
-    
-    if winner and winner != '':
-        games[session_id]['status'] = 'ended'
-        games[session_id]['winner'] = winner
-        
-        print(f"发送gameOver事件: winner = '{winner}' (type: {type(winner)}, repr: {repr(winner)})")
-        game_over_data = {'winner': winner}
-        print(f"gameOver数据: {game_over_data}")
-        emit('gameOver', game_over_data, broadcast=True)
-        print(f"Game over! Winner: {winner} for session ID: {session_id}")
-        return True
-    
-    print(f"游戏继续，没有获胜者")
-    return False
+        logger.error("Error switching AI model: %s", e)
+
+def game_record_of(game):
+    """持有该局的锁时调用：结束的对局要写入 game_records 的内容"""
+    return {
+        'winner': game['winner'],
+        'moves': list(game['moves']),
+        'game_duration': int(time.time() - game['started_at']),
+        'ai_type': game['ai_model'],
+    }
+
+# 发送获胜信息并保存对局（在锁外调用）
+def emit_game_over(session_id, winner, record):
+    socketio.emit('gameOver', {'winner': winner}, to=session_id)
+    logger.info("Game over! Winner: %s for session ID: %s", winner, session_id)
+    game_records.save_game(session_id, **record)
 
 # 重置游戏
 def handle_reset_game():
@@ -290,22 +405,41 @@ def handle_reset_game():
         decoded_token = get_decoded_token_from_request()
         session_id = decoded_token.get('email')
 
-        with games_lock:
-            if session_id in games:
-                games[session_id] = {
-                    "board": [['' for _ in range(board_size)] for _ in range(board_size)],
-                    "current_player": "black",
-                    "status": "ongoing",
-                    "winner": None,
-                    "ai_model": AI_MODEL  # 保持当前 AI 模型设置
-                }
-                emit('updateBoard', {'board': games[session_id]['board']}, broadcast=True)
-                print(f"Game reset for session ID: {session_id} with AI model: {AI_MODEL}")
+        with games.locked(session_id) as game:
+            if game is not None:
+                # 原地重置（其他线程可能正持有这局的锁），代数加一使重置前提交的 AI 结果失效
+                generation = game['generation'] + 1
+                ai_model = game['ai_model']
+                game.update(new_game_state())
+                game['generation'] = generation
+                game['ai_model'] = ai_model  # 保持当前 AI 模型设置
+                # 引擎的增量状态属于上一局，新的一局重新创建
+                release_engines(session_id, game)
+                emit('snapshot', snapshot_of(game), to=session_id)
+                logger.info("Game reset for session ID: %s with AI model: %s", session_id, ai_model)
             else:
-                print(f"No game found to reset for session ID: {session_id}")
+                logger.warning("No game found to reset for session ID: %s", session_id)
                 
     except Exception as e:
-        print(f"Error during game reset: {str(e)}")
+        logger.error("Error during game reset: %s", e)
+
+# 客户端发现 move 序号不连续时请求完整快照
+def handle_request_snapshot():
+    try:
+        decoded_token = get_decoded_token_from_request()
+        session_id = decoded_token.get('email')
+
+        with games.locked(session_id) as game:
+            if game is None:
+                logger.warning("No game found for session ID: %s", session_id)
+                return
+            snapshot = snapshot_of(game)
+
+        # 只发给请求的连接
+        emit('snapshot', snapshot)
+
+    except Exception as e:
+        logger.error("Error sending snapshot: %s", e)
 
 # 处理用户登出
 def handle_logout():
@@ -313,10 +447,12 @@ def handle_logout():
         decoded_token = get_decoded_token_from_request()
         session_id = decoded_token.get('email')
 
-        with games_lock:
-            if session_id in games:
-                del games[session_id]
-                print(f"Game data cleared for session ID: {session_id}")
+        game = games.remove(session_id)
+        if game is not None:
+            release_engines(session_id, game)
+            logger.info("Game data cleared for session ID: %s", session_id)
                 
     except Exception as e:
-        print(f"Error during logout: {str(e)}")
+        logger.error("Error during logout: %s", e)
+    finally:
+        forget_connection_token()
@@ -0,0 +1,5 @@
+from flask_socketio import SocketIO
+
+# SocketIO 实例放在包内，websocket 模块的后台线程（如 AI 落子线程池）也能直接推送事件；
+# 在 app.create_app 中通过 init_app 初始化
+socketio = SocketIO()
@@ -0,0 +1,83 @@
+import threading
+from contextlib import contextmanager
+
+
+class GameRegistry:
+    """
+    分片的对局表：session_id 按哈希分配到固定数量的分片，每个分片一把锁，只在创建和删除对局时使用；
+    每局对局状态自带一把锁（game['lock']），落子、重置等修改只锁住这一局。
+    同一会话可以有多个连接共享一局（game['connections'] 为这些连接的 id，由 connect / disconnect 维护），最后一个连接断开时才删除。
+    查询直接读字典，不加锁。
+    """
+
+    def __init__(self, shards=16):
+        self._shards = [({}, threading.Lock()) for _ in range(shards)]
+
+    def _shard(self, session_id):
+        return self._shards[hash(session_id) % len(self._shards)]
+
+    def get(self, session_id):
+        """不加锁的查询，返回对局状态或 None"""
+        return self._shard(session_id)[0].get(session_id)
+
+    def __contains__(self, session_id):
+        return self.get(session_id) is not None
+
+    def __len__(self):
+        return sum(len(games) for games, _ in self._shards)
+
+    def create(self, session_id, state):
+        """session_id 没有对局时以 state 创建，返回 (对局, 是否新建)"""
+        games, lock = self._shard(session_id)
+        with lock:
+            game = games.get(session_id)
+            if game is not None:
+                return game, False
+            state['lock'] = threading.RLock()
+            state['connections'] = set()
+            games[session_id] = state
+            return state, True
+
+    def connect(self, session_id, connection, state):
+        """连接 connection 加入 session_id 的对局（没有时以 state 创建），返回 (对局, 是否新建)"""
+        games, lock = self._shard(session_id)
+        with lock:
+            game = games.get(session_id)
+            created = game is None
+            if created:
+                state['lock'] = threading.RLock()
+                state['connections'] = set()
+                game = games[session_id] = state
+            game['connections'].add(connection)
+            return game, created
+
+    def disconnect(self, session_id, connection):
+        """
+        连接 connection 离开 session_id 的对局：最后一个连接离开时删除并返回对局，否则返回 None。
+        不属于这一局的连接（例如登出删除旧对局之前的连接）不影响它。
+        """
+        games, lock = self._shard(session_id)
+        with lock:
+            game = games.get(session_id)
+            if game is None or connection not in game['connections']:
+                return None
+            game['connections'].discard(connection)
+            if game['connections']:
+                return None
+            return games.pop(session_id)
+
+    def remove(self, session_id):
+        """删除并返回对局，不存在时返回 None"""
+        games, lock = self._shard(session_id)
+        with lock:
+            return games.pop(session_id, None)
+
+    @contextmanager
+    def locked(self, session_id):
+        """持有该局的锁访问对局状态；对局不存在（或在等待锁期间被删除）时得到 None"""
+        game = self.get(session_id)
+        if game is None:
+            yield None
+            return
+        with game['lock']:
+            yield game if self.get(session_id) is game else None